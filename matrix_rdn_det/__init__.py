@@ -14,12 +14,90 @@ det_int
     ----------
     matrix : numpy.array
         Numpy array representing a square matrix, which determinant is to be evaluated.
+    method : str, optional
+        One of 'auto', 'expansion', 'bareiss' and 'modular'. With 'auto' the backend is 
+        chosen by the size, the sparsity and the size of the entries of the matrix.
     
     Returns
     -------
     determinant : int
         The determinant of the input matrix.
         
+det_int_batch
+  Calculate the determinants of a stack of square matrices with integer entries.
+  
+    Parameters
+    ----------
+    matrices : numpy.array
+        Integer array with shape [count,n,n].
+    
+    Returns
+    -------
+    determinants : numpy.ndarray
+        Exact determinants with shape [count], as numpy.int64 if they cannot overflow and
+        as Python ints otherwise. Explicit formulas are used for n <= 4 and fraction-free
+        elimination of the whole stack for larger n.
+        
+cofactors_int
+  Calculate the cofactors of the first row of a square matrix given its other rows.
+  
+    Parameters
+    ----------
+    matrix : numpy.array
+        Numpy array with shape [n-1,n] and integer entries.
+    
+    Returns
+    -------
+    cofactors : numpy.ndarray
+        Array with shape [n] of the cofactors, c[j] = (-1)**j * det(matrix without column j).
+        
+solve_int
+  Solve a square system of linear equations with integer coefficients exactly.
+  
+    Parameters
+    ----------
+    matrix : numpy.array
+        Integer matrix with shape [n,n], or a stack of matrices with shape [count,n,n].
+    rhs : numpy.array
+        Right-hand side with shape [n] or [n,k], or [count,n] or [count,n,k] for a stack.
+    
+    Returns
+    -------
+    numerator : numpy.ndarray
+        Integer array with the shape of rhs.
+    denominator : int or numpy.ndarray
+        The smallest positive common denominator, x = numerator / denominator. For a stack
+        an array with shape [count]. Singular matrices raise ValueError.
+        
+inverse_int
+  Calculate the inverse of a square matrix with integer entries exactly.
+  
+    Parameters
+    ----------
+    matrix : numpy.array
+        Integer matrix with shape [n,n], or a stack of matrices with shape [count,n,n].
+    
+    Returns
+    -------
+    numerator, denominator
+        As in solve_int, with inverse = numerator / denominator.
+        
+diophantine_int
+  Solve the linear Diophantine equation coefficients @ x = value in integers.
+  
+    Parameters
+    ----------
+    coefficients : numpy.array
+        Integer array with shape [n] and at least one nonzero entry.
+    value : int
+        Right hand side of the equation.
+    
+    Returns
+    -------
+    out : tuple or None
+        (particular, basis) with shapes [n] and [n-1,n], where basis is an LLL-reduced 
+        basis of the homogeneous solutions, or None if there is no integer solution.
+        
 numpy2latex
   Make numpy array LaTeX friendly.
     
@@ -46,6 +124,88 @@ numpy2latex
         [output]
     \\end{array}
 
+numpy2latex_batch
+  Make a stack of numpy arrays LaTeX friendly, much faster than numpy2latex per matrix.
+  
+    Parameters
+    ----------
+    matrices : numpy.array
+        Array with shape [count,m,n], or a sequence of arrays with shape [m,n].
+    environment : str or None, optional
+        'matrix', 'pmatrix' (default), 'bmatrix', 'vmatrix', 'array', 'augmented' (needs rhs)
+        or None for the rows only.
+    rhs : numpy.array, optional
+        Right-hand sides of augmented systems, with shape [count,m] or [count,m,k].
+    file : str, os.PathLike or writable text buffer, optional
+        Write the output here instead of returning it.
+    separator : str, optional
+        Written between the matrices. Default is an empty line.
+    
+    Returns
+    -------
+    output : str or None
+        The LaTeX code, or None if file is given.
+
+estimate_solutions
+  Estimate the number of first rows that give a matrix the determinant det_value.
+  
+    Parameters
+    ----------
+    cofactors : numpy.array
+        Cofactors of the first row with shape [n], or a stack with shape [count,n].
+    det_value : int
+        Value of the determinant.
+    lower_bound, upper_bound : int, optional
+        Bounds of the entries, as in matrix_gen.
+    
+    Returns
+    -------
+    estimate : float or numpy.ndarray
+        Estimated number of integer vectors a within the bounds with cofactors @ a = det_value.
+        It is 0 if there is certainly no such vector.
+        
+feasibility
+  Estimate how hard it is for matrix_gen to find a matrix, before generating one.
+  
+    Parameters
+    ----------
+    dimension : int
+        Dimension of the matrix, at least 2.
+    det_value, lower_bound, upper_bound : int, optional
+        As in matrix_gen.
+    samples : int, optional
+        Number of random rows 2-n that are analysed.
+    rng : optional
+        Source of the randomness, as in matrix_gen.
+    
+    Returns
+    -------
+    report : dict
+        'hadamard_bound' and 'possible' (whether abs(det_value) is within the bound),
+        'success_rate' (share of random rows 2-n with a first row), 'expected_draws' and
+        'expected_solutions'.
+        
+zero_pattern
+  Build a zero pattern for the zeros argument of matrix_gen.
+  
+    Parameters
+    ----------
+    dimension : int
+        Dimension of the matrix.
+    kind : str, optional
+        'band' (default), 'upper' or 'lower' (block triangular) or 'rows' (random zeros
+        in every row that still allow any determinant).
+    bandwidth, blocks, zeros_per_row : optional
+        Nonzero diagonals on each side for 'band', sizes of the diagonal blocks for
+        'upper' and 'lower', and number of zeros per row for 'rows'.
+    rng : optional
+        Source of the randomness of 'rows', as in matrix_gen.
+    
+    Returns
+    -------
+    zeros : numpy.ndarray
+        Boolean array with shape [dimension,dimension], True for the entries that are 0.
+        
 matrix_gen
   Randomize a matrix with the determinant value as parameter.
     
@@ -67,6 +227,42 @@ matrix_gen
         Sets the number of attempts to randomized parameters in the function. This is used 
         to restart the function if the calculations are taking too long if the determinant
         value is large (e.g. 7 or larger). If not a positive integer, rdn_prm is set to be 200.
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Source of the randomness. A seed or a Generator gives reproducible output. With None
+        every call uses a new Generator with fresh entropy.
+    first_k : int, optional
+        If positive, the search for the first row stops after first_k solutions and one of 
+        them is chosen. Faster for wide bounds, but less random. Default is 0.
+    sampler : str, optional
+        'enumerate' goes through every parameter vector in the box of possible parameters,
+        'rejection' draws parameter vectors uniformly from the box until a solution is found,
+        splitting and shrinking the box when draws keep failing. 'auto' (default) chooses by
+        the size of the box left after the random parameters are set, and enumerates if
+        first_k is set. 'rejection' cannot be combined with first_k.
+    stats : dict or callable, optional
+        If given, a dict is updated with (or a callable is called with) statistics of the
+        generation: 'restarts', 'restart_reasons', 'attempts', 'time' (seconds spent in
+        'part1' to 'part6'), 'sys_of_eq_shape', 'box_volume', 'solutions' and 'partial'.
+    method : str, optional
+        'cofactor' (default) solves for the first row given random rows 2-n. 'unimodular'
+        applies random determinant-preserving row and column operations to a diagonal
+        matrix, which is much faster for large dimensions but gives entries more
+        concentrated around 0. It needs lower_bound <= 0 < upper_bound - 1 and abs(det_value)
+        must be a product of dimension factors below upper_bound.
+    retry : str, optional
+        'full' (default) randomizes all the rows 2-n again when the first row has no
+        solution. 'row' randomizes only one of them and updates the cofactors of the first
+        row in linear time, which makes restarts cheaper but changes the distribution slightly.
+    timeout : float, optional
+        Time budget in seconds. GenerationTimeout (a TimeoutError) is raised when it is used
+        up, unless the search already found solutions; then one of them is used and
+        stats['partial'] is True.
+    cancel : optional
+        Token with an is_set method, e.g. threading.Event. GenerationCancelled is raised
+        once it is set.
+    zeros : numpy.array, optional
+        Boolean array with shape [dimension,dimension], True for the entries that must be 0,
+        e.g. from zero_pattern. Needs lower_bound <= 0 < upper_bound.
     
     Returns
     -------
@@ -82,13 +278,150 @@ matrix_gen
     When the dimension is 2 or 3 the difference between lower_bound and upper_bound has to be at
     least 3 (except if lower_bound <= -1 and upper_bound >=1). This is to ensure that the problem
     is solvable. Otherwise the difference between lower_bound and upper_bound has to be at least 2.
+    abs(det_value) above the Hadamard bound raises ValueError at once.
     
     If the dimension is set to 7 or higher, it is recommended to set a few random parameters to
     speed up the calculcations. However, the randomness of the entries will decrease. The number
     of attemps is only used if there are randomized parameters set.
     
+matrix_gen_batch
+  Randomize a stack of matrices with the determinant value as parameter.
+  
+    Parameters
+    ----------
+    count : int
+        Number of matrices.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, rng, first_k, sampler, method : optional
+        As in matrix_gen.
+    timeout, cancel : optional
+        As in matrix_gen, for the whole stack.
+    zeros : numpy.array, optional
+        Zero pattern as in matrix_gen, the same for every matrix.
+    
+    Returns
+    -------
+    out : numpy.ndarray
+        A numpy array with shape [count,dimension,dimension].
+    
+exercise_gen
+  Randomize systems of linear equations A @ x = b with integer solutions.
+  
+    Parameters
+    ----------
+    count : int
+        Number of exercises.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, rng, first_k, sampler, method : optional
+        As in matrix_gen. They concern the matrices A.
+    x_lower_bound, x_upper_bound : int, optional
+        The entries of x are in [x_lower_bound, x_upper_bound). Default is [-5,6).
+    b_lower_bound, b_upper_bound : int, optional
+        The entries of b are in [b_lower_bound, b_upper_bound). Default is [-20,21).
+        x is drawn uniformly among the vectors that meet both bounds.
+    
+    Returns
+    -------
+    matrices, solutions, rhs : numpy.ndarray
+        Arrays with shapes [count,dimension,dimension], [count,dimension] and [count,dimension].
+    
+matrix_gen_parallel
+  Randomize a stack of matrices with the determinant value as parameter, using several processes.
+  
+    Parameters
+    ----------
+    count : int
+        Number of matrices.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, first_k, sampler : optional
+        As in matrix_gen.
+    seed : int or numpy.random.SeedSequence, optional
+        Seed of the whole run. The output does not depend on the number of workers.
+    workers : int, optional
+        Number of worker processes.
+    chunksize : int, optional
+        Number of matrices sent to a worker at a time.
+    executor : concurrent.futures.Executor, optional
+        Executor to use instead of a new process pool.
+    method : str, optional
+        As in matrix_gen.
+    
+    Returns
+    -------
+    out : numpy.ndarray
+        A numpy array with shape [count,dimension,dimension].
+    
+GenerationTimeout, GenerationCancelled
+  Raised by matrix_gen and matrix_gen_batch when the timeout is used up or the
+  cancellation token is set. GenerationTimeout is a TimeoutError.
+  
+MatrixPool
+  Keep ready-made matrices from matrix_gen for repeated parameter sets.
+  
+    Parameters
+    ----------
+    size : int, optional
+        Number of matrices kept ready per (dimension, det_value, lower_bound, upper_bound).
+    memory_budget : int, optional
+        Upper bound in bytes of the kept matrices. The least recently used parameter sets
+        are dropped first.
+    rdn_prm, attempts, first_k, sampler : optional
+        As in matrix_gen.
+    seed : int or numpy.random.SeedSequence, optional
+        Seed of the matrices of the pool.
+    background : bool, optional
+        Refill the queues in a background thread (default).
+    
+    Methods get(dimension, det_value, lower_bound, upper_bound) and warm(..., wait=False)
+    take a matrix and fill a queue, refill, clear and close manage the pool.
+    
+AsyncMatrixGenerator
+  Generate matrices from asyncio code without blocking the event loop.
+  
+    Parameters
+    ----------
+    workers : int, optional
+        Number of requests run at the same time, in a thread pool by default.
+    max_pending : int, optional
+        Largest number of queued or running jobs. Further requests wait (backpressure).
+    executor : concurrent.futures.Executor, optional
+        Executor to use instead of the thread pool.
+    coalesce : bool, optional
+        Concurrent requests with the same arguments share one job (default).
+    
+    The coroutines matrix_gen(...) and matrix_gen_batch(count, ...) take the arguments of
+    the functions with the same names. Cancelling a request stops its job once no other
+    request waits for it.
+    
+write_bank
+  Generate matrices with matrix_gen and store them in a compact bank file.
+  
+    Parameters
+    ----------
+    path : str or os.PathLike
+        File to write.
+    count : int
+        Number of matrices.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, first_k, sampler : optional
+        As in matrix_gen.
+    seed : int or numpy.random.SeedSequence, optional
+        Seed of the bank, recorded in the header. The matrices are those of matrix_gen_parallel.
+    workers : int, optional
+        Number of worker processes. Default is 1.
+    chunk : int, optional
+        Number of matrices generated and written at a time.
+    
+    Returns
+    -------
+    header : dict
+        The header of the file.
+    
+MatrixBank
+  Read a bank file without loading it. bank[k] is a view of matrix k in the memory-mapped
+  file, bank.matrices the whole stack and bank.header the parameters of the bank.
+  
     https://github.com/andis854/matrix_rdn_det
     Report bugs at https://github.com/andis854/matrix_rdn_det/issues
     Created by Anders Israelsson, 2023
 """
-from matrix_rdn_det.matrix_rdn_det import det_int,matrix_gen,numpy2latex
+from matrix_rdn_det.matrix_rdn_det import GenerationCancelled,GenerationTimeout,cofactors_int,det_int,det_int_batch,diophantine_int,estimate_solutions,exercise_gen,feasibility,inverse_int,matrix_gen,matrix_gen_batch,matrix_gen_parallel,numpy2latex,numpy2latex_batch,solve_int,zero_pattern
+from matrix_rdn_det.aio import AsyncMatrixGenerator
+from matrix_rdn_det.bank import MatrixBank,write_bank
+from matrix_rdn_det.pool import MatrixPool
@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+' '
+# asyncio interface to matrix_gen for event-loop based servers.
+# https://github.com/andis854/matrix_rdn_det
+#
+# The requests are run by worker tasks in an executor, so the event loop is not
+# blocked. At most max_pending requests are queued or running; further requests
+# wait until there is room. Concurrent requests with the same arguments share one
+# job. When every request of a job is cancelled, e.g. because the client
+# disconnected, the job is dropped if it has not started, and otherwise stopped
+# through the cancellation token of matrix_gen.
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import threading
+
+from matrix_rdn_det.matrix_rdn_det import GenerationCancelled, matrix_gen, matrix_gen_batch
+
+
+# A request handed to the worker tasks. waiters is the number of requests that
+# wait for the result, and cancel the token passed on to matrix_gen.
+class _Job:
+    '\b'
+
+    def __init__(self, function, args, options, key, future):
+        self.function = function
+        self.args = args
+        self.options = options
+        self.key = key
+        self.future = future
+        self.waiters = 0
+        self.started = False
+        self.holds_slot = True
+        self.cancel = threading.Event()
+
+
+# A copy of a result, so that requests that share a job do not share arrays.
+def _copy(result):
+    '\b'
+    if isinstance(result, tuple):
+        return tuple(_copy(part) for part in result)
+    return result.copy()
+
+
+class AsyncMatrixGenerator:
+    """Generate matrices from asyncio code without blocking the event loop.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of requests run at the same time. Default is the number of processors.
+    max_pending : int, optional
+        Largest number of jobs that are queued or running. Further requests wait until
+        one of them is done, which applies backpressure to the callers.
+    executor : concurrent.futures.Executor, optional
+        Executor that runs the jobs. By default a thread pool with workers threads is
+        created and shut down by close. With a thread pool the jobs are stopped when they
+        are cancelled; with other executors only jobs that have not started are dropped.
+    coalesce : bool, optional
+        If true (default), concurrent requests with the same arguments share one job and
+        get copies of the same result.
+
+    Notes
+    -----
+    Cancelling a request, e.g. when aiohttp cancels the handler of a disconnected client,
+    drops its job once no other request waits for it. A running job is stopped by the
+    cancel token of matrix_gen, so the worker is free again after at most one block of
+    the search. The generator is used as an async context manager or closed with close.
+
+    Examples
+    --------
+    >>> async with AsyncMatrixGenerator(workers=2) as generator:
+    ...     matrix = await generator.matrix_gen(4, 3, timeout=1.0)"""
+
+    def __init__(self, workers=None, max_pending=64, executor=None, coalesce=True):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if not type(workers) is int or workers <= 0:
+            raise ValueError('workers must be a positive integer')
+        if not type(max_pending) is int or max_pending <= 0:
+            raise ValueError('max_pending must be a positive integer')
+        self.workers = workers
+        self.max_pending = max_pending
+        self.coalesce = coalesce
+        self._executor = executor
+        self._own_executor = executor is None
+        self._stoppable = executor is None or isinstance(executor, concurrent.futures.ThreadPoolExecutor)
+        self._jobs = {} # The jobs that are queued or running, by their arguments.
+        self._queue = None
+        self._slots = None
+        self._tasks = []
+        self._running = set()
+        self._counts = {'submitted': 0, 'coalesced': 0, 'cancelled': 0, 'completed': 0, 'waiting': 0}
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exception):
+        await self.close()
+
+    async def matrix_gen(self, dimension=2, det_value=1, lower_bound=-9, upper_bound=10, **options):
+        """Awaitable counterpart of matrix_gen. The options are passed on to matrix_gen,
+        except cancel, which is managed by the generator. The timeout of matrix_gen counts
+        from the start of the job."""
+        return await self._submit(matrix_gen, (dimension, det_value, lower_bound, upper_bound), options)
+
+    async def matrix_gen_batch(self, count, dimension=2, det_value=1, lower_bound=-9, upper_bound=10, **options):
+        """Awaitable counterpart of matrix_gen_batch, with the options as in matrix_gen."""
+        return await self._submit(matrix_gen_batch, (count, dimension, det_value, lower_bound, upper_bound), options)
+
+    async def close(self):
+        """Stop the worker tasks and the jobs. Requests that still wait raise RuntimeError."""
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in list(self._jobs.values()) + list(self._running):
+            job.cancel.set()
+            if not job.future.done():
+                job.future.set_exception(RuntimeError('The generator is closed'))
+        self._jobs.clear()
+        self._running.clear()
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def stats(self):
+        """Counts of submitted, coalesced, cancelled and completed jobs, the number of
+        requests waiting for room ('waiting'), and the number of queued and running jobs."""
+        stats = dict(self._counts)
+        stats['queued'] = 0 if self._queue is None else self._queue.qsize()
+        stats['running'] = len(self._running)
+        return stats
+
+    # Creates the queue, the worker tasks and the executor on first use, in the
+    # running event loop.
+    def _start(self):
+        '\b'
+        if self._closed:
+            raise RuntimeError('The generator is closed')
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix='AsyncMatrixGenerator')
+        self._tasks = [asyncio.get_running_loop().create_task(self._work()) for _ in range(self.workers)]
+
+    # The job with the given arguments that a request can join, or None.
+    def _joinable(self, key):
+        '\b'
+        job = None if key is None else self._jobs.get(key)
+        if job is None or job.future.done():
+            return None
+        return job
+
+    # Gives back the place in the queue held by a job.
+    def _release(self, job):
+        '\b'
+        if job.holds_slot:
+            job.holds_slot = False
+            self._slots.release()
+
+    # Runs a request as a new job, or joins a job with the same arguments.
+    async def _submit(self, function, args, options):
+        '\b'
+        if 'cancel' in options:
+            raise TypeError('cancel is managed by AsyncMatrixGenerator')
+        self._start()
+        key = None
+        if self.coalesce:
+            key = (function.__name__, args, tuple(sorted(options.items())))
+            try:
+                hash(key)
+            except TypeError: # e.g. a stats dict, which every request needs for itself.
+                key = None
+
+        job = self._joinable(key)
+        if job is None:
+            self._counts['waiting'] += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self._counts['waiting'] -= 1
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError('The generator is closed')
+            # A job with the same arguments may have been queued meanwhile.
+            job = self._joinable(key)
+            if job is None:
+                job = _Job(function, args, options, key, asyncio.get_running_loop().create_future())
+                if key is not None:
+                    self._jobs[key] = job
+                self._counts['submitted'] += 1
+                self._queue.put_nowait(job)
+            else:
+                self._slots.release()
+                self._counts['coalesced'] += 1
+        else:
+            self._counts['coalesced'] += 1
+
+        job.waiters += 1
+        try:
+            result = await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            job.waiters -= 1
+            if job.waiters == 0 and not job.future.done():
+                self._drop(job)
+            raise
+        return _copy(result)
+
+    # Drops a job when its last request is cancelled.
+    def _drop(self, job):
+        '\b'
+        self._counts['cancelled'] += 1
+        job.cancel.set()
+        job.future.cancel()
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        if not job.started:
+            self._release(job)
+
+    # The loop of a worker task.
+    async def _work(self):
+        '\b'
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.future.done(): # Cancelled before it started.
+                continue
+            job.started = True
+            self._running.add(job)
+            options = dict(job.options, cancel=job.cancel) if self._stoppable else job.options
+            try:
+                result = await loop.run_in_executor(self._executor, functools.partial(job.function, *job.args, **options))
+            except GenerationCancelled:
+                pass
+            except Exception as error:
+                if not job.future.done():
+                    job.future.set_exception(error)
+            else:
+                self._counts['completed'] += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._running.discard(job)
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+                self._release(job)
@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+' '
+# Banks of matrices from matrix_gen stored on disk.
+# https://github.com/andis854/matrix_rdn_det
+#
+# A bank file starts with the magic bytes, the length of the header as a 4 byte
+# little-endian integer and the header as JSON (dimension, det_value, bounds, the
+# other parameters of matrix_gen, the seed, count and dtype). The header is padded
+# so that the matrices start at a multiple of 64 bytes. The matrices follow as
+# fixed-width little-endian integers in C order, so matrix k is read from a fixed
+# offset and the bank can be memory-mapped.
+
+import concurrent.futures
+import json
+
+import numpy
+
+from matrix_rdn_det.matrix_rdn_det import matrix_gen_parallel
+
+_MAGIC = b'\x93MRDBANK'
+_VERSION = 1
+_ALIGNMENT = 64
+
+# The smallest of these types that holds [lower_bound, upper_bound) is used.
+_DTYPES = ('<i1', '<i2', '<i4', '<i8')
+
+
+# The smallest integer type that holds the entries in [lower_bound, upper_bound).
+def _bank_dtype(lower_bound, upper_bound):
+    '\b'
+    for dtype in _DTYPES:
+        info = numpy.iinfo(dtype)
+        if info.min <= lower_bound and upper_bound - 1 <= info.max:
+            return dtype
+    raise ValueError('The bounds do not fit in 64 bit integers')
+
+
+def write_bank(path, count, dimension=2, det_value=1, lower_bound=-9, upper_bound=10, rdn_prm=0, attempts=200,
+               first_k=0, sampler='auto', seed=None, workers=1, chunk=4096):
+    """Generate matrices with matrix_gen and store them in a bank file.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        File to write.
+    count : int
+        Number of matrices.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, first_k, sampler : optional
+        As in matrix_gen. The dimension must be positive.
+    seed : None, int or numpy.random.SeedSequence, optional
+        Seed of the bank. The matrices are the same as those of
+        matrix_gen_parallel(count, ..., seed=seed). If None, fresh entropy is used and
+        recorded in the header.
+    workers : int, optional
+        Number of worker processes. Default is 1, i.e. the matrices are generated in this
+        process. If None, the number of processors is used.
+    chunk : int, optional
+        Number of matrices generated and written at a time, which bounds the memory use.
+
+    Returns
+    -------
+    header : dict
+        The header written to the file.
+
+    Examples
+    --------
+    >>> write_bank('bank.mrd', 1000, 4, det_value=2, seed=7)['dtype']
+    '<i1'"""
+    if not type(count) is int or count < 0:
+        raise ValueError('count must be a non-negative integer')
+    if not type(dimension) is int or dimension <= 0:
+        raise ValueError('dimension must be a positive integer')
+    if not type(chunk) is int or chunk <= 0:
+        raise ValueError('chunk must be a positive integer')
+    if not type(lower_bound) is int or not type(upper_bound) is int:
+        raise ValueError('Only integers are allowed for lower_bound and upper_bound')
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    dtype = _bank_dtype(lower_bound, upper_bound)
+    header = {'version': _VERSION, 'count': count, 'dtype': dtype, 'dimension': dimension, 'det_value': det_value,
+              'lower_bound': lower_bound, 'upper_bound': upper_bound, 'rdn_prm': rdn_prm, 'attempts': attempts,
+              'first_k': first_k, 'sampler': sampler, 'seed': seed.entropy, 'spawn_key': list(seed.spawn_key)}
+    encoded = json.dumps(header, sort_keys=True).encode()
+    encoded += b' ' * (-(len(_MAGIC) + 4 + len(encoded)) % _ALIGNMENT)
+
+    executor = None
+    if workers != 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    try:
+        with open(path, 'wb') as file:
+            file.write(_MAGIC + len(encoded).to_bytes(4, 'little') + encoded)
+            written = 0
+            while written < count:
+                # Every call spawns the next children of seed, as one call with count would.
+                size = min(chunk, count - written)
+                matrices = matrix_gen_parallel(size, dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts,
+                                               first_k, sampler, seed=seed, workers=1, executor=executor,
+                                               chunksize=max(1, size // 64))
+                file.write(matrices.astype(dtype).tobytes())
+                written += size
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return header
+
+
+class MatrixBank:
+    """Read a bank file written by write_bank without loading it.
+
+    The matrices are memory-mapped, so indexing returns views into the file and only the
+    pages that are touched are read.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        File to read.
+
+    Attributes
+    ----------
+    header : dict
+        The header of the file, with the keys dimension, det_value, lower_bound,
+        upper_bound, rdn_prm, attempts, first_k, sampler, seed, spawn_key, count and dtype.
+    matrices : numpy.memmap
+        Read-only array with shape [count,dimension,dimension] and the integer type of the
+        file (int8 for the default bounds).
+
+    Examples
+    --------
+    >>> with MatrixBank('bank.mrd') as bank:
+    ...     matrix = bank[123]"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            magic = file.read(len(_MAGIC))
+            if magic != _MAGIC:
+                raise ValueError(str(path) + ' is not a matrix bank')
+            length = int.from_bytes(file.read(4), 'little')
+            header = json.loads(file.read(length).decode())
+            file.seek(0, 2)
+            size = file.tell()
+        if header.get('version') != _VERSION:
+            raise ValueError('Unknown matrix bank version in ' + str(path))
+        offset = len(_MAGIC) + 4 + length
+        shape = (header['count'], header['dimension'], header['dimension'])
+        if size < offset + numpy.dtype(header['dtype']).itemsize * int(numpy.prod(shape)):
+            raise ValueError(str(path) + ' is truncated')
+        self.header = header
+        self.path = path
+        if header['count'] == 0: # numpy.memmap cannot map zero bytes.
+            self.matrices = numpy.zeros(shape, header['dtype'])
+        else:
+            self.matrices = numpy.memmap(path, header['dtype'], 'r', offset, shape)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __len__(self):
+        return self.header['count']
+
+    def __getitem__(self, index):
+        return self.matrices[index]
+
+    def __iter__(self):
+        return iter(self.matrices)
+
+    def close(self):
+        """Drop the memory map. Views taken from the bank stay valid until they are deleted."""
+        self.matrices = None
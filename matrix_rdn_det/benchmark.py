@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+' '
+# Benchmarks for matrix_gen and det_int.
+# https://github.com/andis854/matrix_rdn_det
+#
+# Run from the shell with
+#     python -m matrix_rdn_det.benchmark --save baseline.json
+#     python -m matrix_rdn_det.benchmark --compare baseline.json
+# The second command exits with status 1 if some case is slower, restarts more
+# often or uses more memory than in the baseline.
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from matrix_rdn_det.matrix_rdn_det import det_int, matrix_gen
+
+# Version of the format of the stored baselines.
+_BASELINE_VERSION = 1
+
+# Metrics compared with the baseline. Times below _MIN_SECONDS and peak memory
+# below _MIN_BYTES are too noisy to be flagged.
+_METRICS = ('median', 'p95', 'restarts', 'peak_memory')
+_MIN_SECONDS = 1e-3
+_MIN_BYTES = 2**16
+
+
+def default_cases(quick=False):
+    """Return the benchmark cases swept by run_benchmarks.
+
+    Parameters
+    ----------
+    quick : bool, optional
+        If true, return a small sweep that runs in a few seconds.
+
+    Returns
+    -------
+    cases : list of dict
+        Every case has the key 'function' ('matrix_gen' or 'det_int') and the keyword
+        arguments of the case. det_int cases have the keys dimension, entry_bound and method,
+        where the matrices have entries in [-entry_bound,entry_bound]."""
+    if quick:
+        dimensions = [3, 5]
+        det_values = [1, 30]
+        bounds = [(-9, 10)]
+        random_parameters = [(0, 200)]
+        det_dimensions = [5, 20]
+    else:
+        dimensions = [3, 5, 7, 8, 9, 10]
+        det_values = [1, 30, 1000]
+        bounds = [(-9, 10), (-2, 3), (0, 5)]
+        random_parameters = [(0, 200), (2, 200), (2, 20)]
+        det_dimensions = [5, 10, 20, 40, 80]
+
+    cases = []
+    for dimension in dimensions:
+        for det_value in det_values:
+            for lower_bound, upper_bound in bounds:
+                # Skip the cases where det_value is close to the Hadamard bound, which are 
+                # impossible or take very long.
+                entry_bound = max(abs(lower_bound), abs(upper_bound - 1))
+                if det_value > (dimension**0.5 * entry_bound)**dimension / 8:
+                    continue
+                for rdn_prm, attempts in random_parameters:
+                    cases.append({'function': 'matrix_gen', 'dimension': dimension, 'det_value': det_value,
+                                  'lower_bound': lower_bound, 'upper_bound': upper_bound,
+                                  'rdn_prm': rdn_prm, 'attempts': attempts})
+    for dimension in det_dimensions:
+        for entry_bound in [9, 10**6]:
+            cases.append({'function': 'det_int', 'dimension': dimension, 'entry_bound': entry_bound, 'method': 'auto'})
+    return cases
+
+
+# Name of a case, used as key in the baselines.
+def case_name(case):
+    '\b'
+    parameters = ','.join('{}={}'.format(key, value) for key, value in case.items() if key != 'function')
+    return '{}[{}]'.format(case['function'], parameters)
+
+
+# Calls the function of a case once with the given seed. Returns the number of
+# restarts. The input of det_int is generated by the caller.
+def _call(case, seed, matrix=None):
+    '\b'
+    if case['function'] == 'det_int':
+        det_int(matrix, case['method'])
+        return 0
+    stats = {}
+    parameters = {key: value for key, value in case.items() if key != 'function'}
+    matrix_gen(**parameters, rng=seed, stats=stats)
+    return stats['restarts']
+
+
+def run_case(case, repeat=10, seed=0):
+    """Time one benchmark case.
+
+    Parameters
+    ----------
+    case : dict
+        A case as returned by default_cases.
+    repeat : int, optional
+        Number of timed calls. Every call uses its own seed spawned from seed, so the
+        results are reproducible.
+    seed : int, optional
+        Seed of the case.
+
+    Returns
+    -------
+    result : dict
+        The name and the case, the median and 95th percentile of the time in seconds,
+        the median number of restarts and the peak memory in bytes (from tracemalloc,
+        measured in a separate call so that the timings are not affected)."""
+    seeds = numpy.random.SeedSequence(seed).spawn(repeat)
+    matrices = [None] * repeat
+    if case['function'] == 'det_int':
+        bound = case['entry_bound']
+        matrices = [numpy.array(numpy.random.default_rng(seed_sequence).integers(
+            -bound, bound + 1, [case['dimension'], case['dimension']]).tolist(), dtype=object)
+            for seed_sequence in seeds]
+
+    times = []
+    restarts = []
+    for seed_sequence, matrix in zip(seeds, matrices):
+        start = time.perf_counter()
+        restarts.append(_call(case, seed_sequence, matrix))
+        times.append(time.perf_counter() - start)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline_memory = tracemalloc.get_traced_memory()[0]
+    _call(case, seeds[0], matrices[0])
+    peak_memory = tracemalloc.get_traced_memory()[1] - baseline_memory
+    if not tracing:
+        tracemalloc.stop()
+
+    return {'name': case_name(case), 'case': case, 'repeat': repeat,
+            'median': float(numpy.median(times)), 'p95': float(numpy.percentile(times, 95)),
+            'restarts': float(numpy.median(restarts)), 'peak_memory': int(peak_memory)}
+
+
+def run_benchmarks(cases=None, repeat=10, seed=0, quick=False, progress=None):
+    """Run a sweep of benchmark cases.
+
+    Parameters
+    ----------
+    cases : list of dict, optional
+        Cases to run. Default is default_cases(quick).
+    repeat, seed : int, optional
+        As in run_case.
+    quick : bool, optional
+        Use the small default sweep.
+    progress : callable, optional
+        Called with every result as soon as it is ready.
+
+    Returns
+    -------
+    results : list of dict
+        One result of run_case per case."""
+    if cases is None:
+        cases = default_cases(quick)
+    results = []
+    for case in cases:
+        result = run_case(case, repeat, seed)
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return results
+
+
+def save_baseline(results, path):
+    """Write benchmark results to a JSON file that can be used as a baseline."""
+    with open(path, 'w') as file:
+        json.dump({'version': _BASELINE_VERSION, 'results': {result['name']: result for result in results}},
+                  file, indent=1, sort_keys=True)
+
+
+def load_baseline(path):
+    """Read a baseline written by save_baseline. Returns a dict from case names to results."""
+    with open(path) as file:
+        baseline = json.load(file)
+    if baseline.get('version') != _BASELINE_VERSION:
+        raise ValueError('Unknown baseline version in ' + str(path))
+    return baseline['results']
+
+
+def find_regressions(results, baseline, tolerance=1.5):
+    """Compare benchmark results with a baseline.
+
+    Parameters
+    ----------
+    results : list of dict
+        Results of run_benchmarks.
+    baseline : dict
+        Baseline as returned by load_baseline. Cases missing in the baseline are skipped.
+    tolerance : float, optional
+        A metric is flagged if it is more than tolerance times its baseline value. Times
+        below one millisecond and peak memory below 64 KiB are never flagged.
+
+    Returns
+    -------
+    regressions : list of tuple
+        Tuples (name, metric, baseline value, new value)."""
+    regressions = []
+    for result in results:
+        old = baseline.get(result['name'])
+        if old is None:
+            continue
+        for metric in _METRICS:
+            limit = tolerance * old[metric]
+            if metric in ('median', 'p95'):
+                limit = max(limit, _MIN_SECONDS)
+            elif metric == 'peak_memory':
+                limit = max(limit, _MIN_BYTES)
+            if result[metric] > limit:
+                regressions.append((result['name'], metric, old[metric], result[metric]))
+    return regressions
+
+
+# One line of the printed table.
+def _format_result(result):
+    '\b'
+    return '{:<95} {:>10.4f} {:>10.4f} {:>8.1f} {:>12d}'.format(
+        result['name'], result['median'], result['p95'], result['restarts'], result['peak_memory'])
+
+
+def main(argv=None):
+    """Command line interface. Returns the exit status."""
+    parser = argparse.ArgumentParser(prog='python -m matrix_rdn_det.benchmark',
+                                     description='Benchmark matrix_gen and det_int.')
+    parser.add_argument('--quick', action='store_true', help='run a small sweep')
+    parser.add_argument('--repeat', type=int, default=10, help='number of timed calls per case')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the sweep')
+    parser.add_argument('--save', metavar='PATH', help='store the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='flag regressions against a baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed ratio to the baseline')
+    arguments = parser.parse_args(argv)
+
+    print('{:<95} {:>10} {:>10} {:>8} {:>12}'.format('case', 'median [s]', 'p95 [s]', 'restarts', 'peak [B]'))
+    results = run_benchmarks(repeat=arguments.repeat, seed=arguments.seed, quick=arguments.quick,
+                             progress=lambda result: print(_format_result(result), flush=True))
+    if arguments.save:
+        save_baseline(results, arguments.save)
+    if arguments.compare:
+        regressions = find_regressions(results, load_baseline(arguments.compare), arguments.tolerance)
+        for name, metric, old, new in regressions:
+            print('REGRESSION {} {}: {:g} -> {:g}'.format(name, metric, old, new))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
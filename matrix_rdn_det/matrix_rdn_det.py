@@ -3,63 +3,875 @@
 # Created by: Anders Israelsson, 2023
 # https://github.com/andis854/matrix_rdn_det
 
+import concurrent.futures
+import json
+import math
+import time
+
 import numpy
 
-# det_int calculates the determinant of matrices with interger entries
-# and reduces the number of calculations whenever an entry is 0.
-def det_int(matrix):
+# Thresholds used by det_int to choose a backend when method='auto'. Cofactor
+# expansion is only used for small matrices or for matrices with at most
+# _EXPANSION_MAX_DENSITY nonzero entries. Large matrices, or matrices with a 
+# Hadamard bound above 2**_MODULAR_MIN_BITS, are handled modulo primes.
+_EXPANSION_MAX_DIMENSION = 8
+_EXPANSION_MAX_DENSITY = 0.35
+_MODULAR_MIN_DIMENSION = 20
+_MODULAR_MIN_BITS = 512
+
+# Primes below 2**31 used by the modular determinant. A product of two
+# residues then fits in numpy.int64. The list is extended on demand.
+_PRIMES = []
+
+
+# Deterministic Miller-Rabin test, valid for all numbers below 3215031751.
+def _is_prime(number):
+    '\b'
+    if number < 2:
+        return False
+    for prime in (2, 3, 5, 7):
+        if number % prime == 0:
+            return number == prime
+    d, s = number - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for base in (2, 3, 5, 7):
+        x = pow(base, d, number)
+        if x == 1 or x == number - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % number
+            if x == number - 1:
+                break
+        else:
+            return False
+    return True
+
+
+# Return the first number_of_primes primes below 2**31 (in decreasing order).
+def _primes(number_of_primes):
+    '\b'
+    candidate = _PRIMES[-1] - 2 if _PRIMES else 2**31 - 1
+    while len(_PRIMES) < number_of_primes:
+        if _is_prime(candidate):
+            _PRIMES.append(candidate)
+        candidate -= 2
+    return _PRIMES[:number_of_primes]
+
+
+# Number of bits of the Hadamard bound of a matrix given as a list of rows,
+# i.e. an upper bound of log2(abs(determinant)). Returns -1 for a zero row.
+def _hadamard_bits(rows):
+    '\b'
+    bits = 0.0
+    for row in rows:
+        norm = sum(entry * entry for entry in row)
+        if norm == 0:
+            return -1
+        bits += math.log2(norm) / 2
+    return bits
+
+
+# Fraction-free Gauss elimination (Bareiss). Every division is exact, so the
+# entries stay integers and are bounded by minors of the input matrix.
+def _det_bareiss(rows):
+    '\b'
+    rows = [list(row) for row in rows]
+    dimension = len(rows)
+    sign = 1
+    previous = 1
+    for k in range(dimension - 1):
+        if rows[k][k] == 0:
+            for row in range(k + 1, dimension):
+                if rows[row][k] != 0:
+                    rows[k], rows[row] = rows[row], rows[k]
+                    sign = -sign
+                    break
+            else:
+                return 0
+        pivot = rows[k][k]
+        pivot_tail = rows[k][k + 1:]
+        for row in range(k + 1, dimension):
+            factor = rows[row][k]
+            rows[row][k + 1:] = [(pivot * entry - factor * pivot_entry) // previous
+                                 for entry, pivot_entry in zip(rows[row][k + 1:], pivot_tail)]
+        previous = pivot
+    return sign * rows[-1][-1]
+
+
+# Determinant modulo a prime below 2**31 by Gauss elimination in numpy.int64.
+def _det_mod_prime(matrix, prime):
+    '\b'
+    matrix = numpy.array(matrix % prime, dtype=numpy.int64)
+    dimension = numpy.size(matrix, axis=0)
+    determinant = 1
+    for k in range(0, dimension):
+        nonzero_rows = numpy.nonzero(matrix[k:, k])[0]
+        if numpy.size(nonzero_rows) == 0:
+            return 0
+        if nonzero_rows[0] != 0:
+            matrix[[k, k + nonzero_rows[0]], k:] = matrix[[k + nonzero_rows[0], k], k:]
+            determinant = -determinant
+        pivot = int(matrix[k, k])
+        determinant = determinant * pivot % prime
+        factors = matrix[k + 1:, k] * pow(pivot, prime - 2, prime) % prime
+        matrix[k + 1:, k:] = (matrix[k + 1:, k:] - factors[:, None] * matrix[k, k:]) % prime
+    return determinant
+
+
+# Determinant by reduction modulo several primes, combined with the Chinese
+# remainder theorem. The number of primes is given by the Hadamard bound.
+def _det_modular(rows, hadamard_bits):
+    '\b'
+    matrix = numpy.array(rows, dtype=object)
+    # Every prime is larger than 2**30 and the modulus must exceed twice the bound.
+    number_of_primes = int(hadamard_bits + 1) // 30 + 1
+    determinant = 0
+    modulus = 1
+    for prime in _primes(number_of_primes):
+        residue = _det_mod_prime(matrix, prime)
+        determinant += modulus * ((residue - determinant) * pow(modulus, -1, prime) % prime)
+        modulus *= prime
+    if determinant > modulus // 2:
+        determinant -= modulus
+    return determinant
+
+
+# Recursive cofactor expansion along the row/column with the most zeros. The
+# minors are evaluated by det_int with the given method, so with method='auto'
+# they may use another backend.
+def _det_expansion(matrix, method):
+    '\b'
+    dimension = numpy.size(matrix, axis=0)
+    max_zero = dimension
+
+    row_column_index = 0
+
+    for row in range(0, dimension):
+        if numpy.count_nonzero(matrix[row, :]) < max_zero:
+            max_zero = numpy.count_nonzero(matrix[row, :])
+            row_column_index = row
+    for column in range(0, dimension):
+        if numpy.count_nonzero(matrix[:, column]) < max_zero:
+            max_zero = numpy.count_nonzero(matrix[:, column])
+            row_column_index = column + dimension
+
+    determinant = 0
+    if row_column_index < dimension:
+        for column in range(0, dimension):
+            if matrix[row_column_index, column] != 0:
+                determinant += (-1)**(row_column_index + column) * int(matrix[
+                    row_column_index, column]) * det_int(
+                        numpy.delete(numpy.delete(matrix, row_column_index, axis=0), column, axis=1), method)
+
+    else:
+        row_column_index -= dimension
+        for row in range(0, dimension):
+            if matrix[row, row_column_index] != 0:
+                determinant += (-1)**(
+                    row_column_index + row) * int(matrix[row, row_column_index]) * det_int(
+                        numpy.delete(numpy.delete(matrix, row_column_index, axis=1), row, axis=0), method)
+
+    return int(determinant)
+
+
+# det_int calculates the determinant of matrices with interger entries. Small
+# or sparse matrices are expanded along rows/columns with many zeros, other
+# matrices are reduced by fraction-free or modular elimination.
+def det_int(matrix, method='auto'):
     '''Calculate the determinant of a square matrix with integer entries. 
     
-    The function expands rows and columns recursively and reduces calculation by 
-    finding the rows/columns with the largest number of zeroes.
+    The determinant is calculated exactly and returned as a Python int, so it does not
+    overflow. Three backends are available:
+    
+    'expansion'  expands rows and columns recursively and reduces calculation by 
+                 finding the rows/columns with the largest number of zeroes. With 
+                 method='auto' the expansion is only used for small or sparse matrices,
+                 and the minors are evaluated with the backend suited for them.
+    'bareiss'    fraction-free Gauss elimination (Bareiss algorithm).
+    'modular'    Gauss elimination modulo several primes combined with the Chinese 
+                 remainder theorem. Used for large matrices or large entries.
     
     Parameters
     ----------
     matrix : numpy.array
         Numpy array representing a square matrix, which determinant is to be evaluated.
+    method : str, optional
+        One of 'auto', 'expansion', 'bareiss' and 'modular'. With 'auto' the backend is 
+        chosen by the size, the sparsity and the size of the entries of the matrix.
     
     Returns
     -------
     determinant : int
         The determinant of the input matrix.
          '''
+    if method not in ('auto', 'expansion', 'bareiss', 'modular'):
+        raise ValueError('method must be one of \'auto\', \'expansion\', \'bareiss\' and \'modular\'')
     dimension = numpy.size(matrix, axis=0)
     if dimension != numpy.size(matrix, axis=1):
         raise TypeError('Not a square matrix!')
+    elif dimension == 0: # The determinant of the empty matrix.
+        return 1
     elif dimension == 1:
-        return matrix[0,0]
-    else:
+        return int(matrix[0,0])
+    if method == 'auto':
+        nonzero_entries = numpy.count_nonzero(matrix)
+        min_nonzero = min(numpy.min(numpy.count_nonzero(matrix, axis=0)),
+                          numpy.min(numpy.count_nonzero(matrix, axis=1)))
+        if dimension <= 3 or min_nonzero <= 1 or (
+                dimension <= _EXPANSION_MAX_DIMENSION and nonzero_entries <= dimension**2 * _EXPANSION_MAX_DENSITY):
+            return _det_expansion(matrix, 'auto') # The minors may use another backend.
+    elif method == 'expansion':
+        return _det_expansion(matrix, 'expansion')
+
+    rows = [[int(entry) for entry in row] for row in numpy.asarray(matrix).tolist()]
+    hadamard_bits = _hadamard_bits(rows)
+    if hadamard_bits < 0:
+        return 0
+    if method == 'auto':
+        method = 'modular' if dimension >= _MODULAR_MIN_DIMENSION or hadamard_bits > _MODULAR_MIN_BITS else 'bareiss'
+    if method == 'bareiss':
+        return _det_bareiss(rows)
+    return _det_modular(rows, hadamard_bits)
+
+
+# Convert a (nested) list of Python ints to a numpy.int64 array if every entry
+# fits, otherwise to an array of Python ints (dtype=object).
+def _int_array(values):
+    '\b'
+    try:
+        return numpy.array(values, dtype=numpy.int64)
+    except OverflowError:
+        return numpy.array(values, dtype=object)
 
-        max_zero = dimension
 
-        row_column_index = 0
+# Fraction-free Gauss-Jordan elimination of a matrix given as a list of rows.
+# Returns the reduced rows, the pivot columns and the sign of the row swaps.
+# In the reduced rows the pivot columns form d*I, where d is the last pivot,
+# i.e. d is (up to the sign) the minor of the pivot columns.
+def _gauss_jordan_bareiss(rows):
+    '\b'
+    rows = [list(row) for row in rows]
+    number_of_rows = len(rows)
+    sign = 1
+    previous = 1
+    pivot_columns = []
+    for column in range(0, len(rows[0]) if rows else 0):
+        rank = len(pivot_columns)
+        if rank == number_of_rows:
+            break
+        for row in range(rank, number_of_rows):
+            if rows[row][column] != 0:
+                break
+        else:
+            continue
+        if row != rank:
+            rows[rank], rows[row] = rows[row], rows[rank]
+            sign = -sign
+        pivot = rows[rank][column]
+        pivot_row = rows[rank]
+        for row in range(0, number_of_rows):
+            if row != rank:
+                factor = rows[row][column]
+                rows[row] = [(pivot * entry - factor * pivot_entry) // previous
+                             for entry, pivot_entry in zip(rows[row], pivot_row)]
+        previous = pivot
+        pivot_columns.append(column)
+    return rows, pivot_columns, sign
+
+
+# cofactors_int calculates all cofactors of the missing first row of a square
+# matrix from one elimination of the remaining rows.
+def cofactors_int(matrix):
+    '''Calculate the cofactors of the first row of a square matrix given its other rows.
+    
+    For an integer matrix with shape [n-1,n] the function returns the vector c with
+    c[j] = (-1)**j * det(matrix without column j), i.e. the determinant of a matrix with
+    first row a and the rows of matrix below is a @ c. All cofactors are obtained from 
+    one fraction-free Gauss-Jordan elimination instead of n separate determinants.
+    
+    Parameters
+    ----------
+    matrix : numpy.array
+        Numpy array with shape [n-1,n] and integer entries.
+    
+    Returns
+    -------
+    cofactors : numpy.ndarray
+        Array with shape [n] of the cofactors. The dtype is numpy.int64 unless some 
+        cofactor is too large, in which case the entries are Python ints (dtype=object).
+    
+    Examples
+    --------
+    >>> cofactors_int(numpy.array([[1,2,3],[4,5,6]]))
+    array([-3,  6, -3])'''
+    if numpy.ndim(matrix) != 2 or numpy.size(matrix, axis=0) + 1 != numpy.size(matrix, axis=1):
+        raise TypeError('Not a matrix with shape [n-1,n]!')
+    dimension = numpy.size(matrix, axis=1)
+    rows = [[int(entry) for entry in row] for row in numpy.asarray(matrix).tolist()]
+    if dimension == 1:
+        return numpy.ones(1, int)
+
+    rows, pivot_columns, sign = _gauss_jordan_bareiss(rows)
+    cofactors = [0] * dimension
+    if len(pivot_columns) == dimension - 1: # Otherwise the rows are linearly dependent
+        # and every cofactor is 0. The cofactors span the nullspace of the rows and 
+        # the cofactor of the free column is the minor of the pivot columns.
+        free_column = (set(range(0, dimension)) - set(pivot_columns)).pop()
+        sign *= (-1)**free_column
+        cofactors[free_column] = sign * rows[-1][pivot_columns[-1]]
+        for row, column in enumerate(pivot_columns):
+            cofactors[column] = -sign * rows[row][free_column]
+    return _int_array(cofactors)
+
+
+# Cache for updating the cofactors of the first row when only one row of the
+# other rows is replaced. The cofactors are linear in that row, c = G @ row,
+# where G is skew-symmetric of rank 2: G = factor * (p q^T - q p^T) for the
+# nullspace vectors p and q of the remaining rows, as read off their fraction-free
+# Gauss-Jordan elimination. The factor is found from one set of cofactors.
+# Returns None if the remaining rows are linearly dependent, since every
+# cofactor is then 0.
+def _row_update_cache(matrix, row):
+    '\b'
+    rows = [[int(entry) for entry in other] for index, other in enumerate(numpy.asarray(matrix).tolist()) if index != row]
+    dimension = numpy.size(matrix, axis=1)
+    rows, pivot_columns, _ = _gauss_jordan_bareiss(rows)
+    if len(pivot_columns) < dimension - 2:
+        return None
+    first_free, second_free = sorted(set(range(0, dimension)) - set(pivot_columns))
+    divisor = rows[-1][pivot_columns[-1]] if rows else 1
+    nullspace = []
+    for free_column in (first_free, second_free):
+        vector = [0] * dimension
+        vector[free_column] = divisor
+        for index, column in enumerate(pivot_columns):
+            vector[column] = -rows[index][free_column]
+        nullspace.append(vector)
+    # With the unit vector of second_free as the row, G @ row = factor * divisor * p.
+    unit = numpy.array(matrix, dtype=object)
+    unit[row] = 0
+    unit[row, second_free] = 1
+    numerator = int(cofactors_int(unit)[first_free])
+    return row, nullspace[0], nullspace[1], numerator, divisor**2
+
+
+# Number of times matrix_gen with retry='row' randomizes one row again before it
+# randomizes all the rows, in case the kept rows make the first row unsolvable.
+_RETRY_ROWS = 8
+
+
+# The cofactors of the first row after the row of the cache is replaced by
+# new_row, in O(n) operations.
+def _updated_cofactors(cache, new_row):
+    '\b'
+    _, p, q, numerator, denominator = cache
+    new_row = [int(entry) for entry in new_row]
+    p_product = sum(entry * value for entry, value in zip(p, new_row))
+    q_product = sum(entry * value for entry, value in zip(q, new_row))
+    return _int_array([numerator * (p_entry * q_product - q_entry * p_product) // denominator 
+                       for p_entry, q_entry in zip(p, q)])
+
+
+# Convert a stack of integer matrices to numpy.int64 if fraction-free
+# elimination cannot overflow, i.e. if the square of the Hadamard bound of 
+# every matrix fits. Otherwise the entries are converted to Python ints.
+def _batch_array(matrices):
+    '\b'
+    matrices = numpy.asarray(matrices)
+    row_norms = numpy.sum(numpy.asarray(matrices, dtype=float)**2, axis=-1)
+    bits = numpy.sum(numpy.log2(numpy.maximum(row_norms, 1)), axis=-1) / 2
+    if numpy.size(bits) == 0 or numpy.max(bits) < 30:
+        return numpy.array(matrices, dtype=numpy.int64)
+    return numpy.array(matrices.tolist(), dtype=object).reshape(matrices.shape)
 
-        for row in range(0, dimension):
-            if numpy.count_nonzero(matrix[row, :]) < max_zero:
-                max_zero = numpy.count_nonzero(matrix[row, :])
-                row_column_index = row
-        for column in range(0, dimension):
-            if numpy.count_nonzero(matrix[:, column]) < max_zero:
-                max_zero = numpy.count_nonzero(matrix[:, column])
-                row_column_index = row + dimension
-
-        determinant = 0
-        if row_column_index < dimension:
-            for column in range(0, dimension):
-                if matrix[row_column_index, column] != 0:
-                    determinant += (-1)**(row_column_index + column) * matrix[
-                        row_column_index, column] * det_int(
-                            numpy.delete(numpy.delete(matrix, row_column_index, axis=0), column, axis=1))
 
+# Entries below which a step of the fraction-free elimination cannot overflow
+# numpy.int64, since pivot*entry - factor*pivot_entry is then below 2**63.
+_BAREISS_INT64_MAX_ENTRY = 2**31
+
+
+# Fraction-free Gauss elimination (Bareiss) of a stack of square matrices with
+# shape [number,n,n]. Every step is applied to the whole stack at once. The
+# entries are minors of the input, which are usually far below the Hadamard 
+# bound, so the stack is kept in numpy.int64 until an entry reaches
+# _BAREISS_INT64_MAX_ENTRY and converted to Python ints from that step on.
+def _det_bareiss_batch(matrices):
+    '\b'
+    matrices = numpy.asarray(matrices)
+    number = numpy.size(matrices, axis=0)
+    dimension = numpy.size(matrices, axis=1)
+    if dimension == 0:
+        return numpy.ones(number, int)
+    if matrices.dtype == object:
+        matrices = _int_array(matrices.tolist()).reshape(matrices.shape)
+    else:
+        matrices = matrices.astype(numpy.int64)
+    sign = numpy.ones(number, matrices.dtype)
+    previous = numpy.ones(number, matrices.dtype)
+    singular = numpy.zeros(number, bool)
+    for k in range(0, dimension - 1):
+        if matrices.dtype != object and number > 0 and numpy.max(numpy.abs(matrices[:, k:, k:])) >= _BAREISS_INT64_MAX_ENTRY:
+            matrices = numpy.array(matrices.tolist(), dtype=object).reshape(matrices.shape)
+            sign = sign.astype(object)
+            previous = numpy.array(previous.tolist(), dtype=object)
+        zero_pivot = numpy.nonzero(matrices[:, k, k] == 0)[0]
+        if numpy.size(zero_pivot) > 0: # Swap in a row with a nonzero entry in column k.
+            candidates = matrices[zero_pivot, k + 1:, k] != 0
+            has_pivot = numpy.any(candidates, axis=1)
+            swap = zero_pivot[has_pivot]
+            rows = k + 1 + numpy.argmax(candidates[has_pivot], axis=1)
+            pivot_rows = matrices[swap, k].copy()
+            matrices[swap, k] = matrices[swap, rows]
+            matrices[swap, rows] = pivot_rows
+            sign[swap] *= -1
+            # Matrices without a pivot are singular. Their remaining block is set to
+            # previous*I, which keeps the following divisions exact.
+            dead = zero_pivot[numpy.invert(has_pivot)]
+            singular[dead] = True
+            matrices[dead, k:, k:] = previous[dead, None, None] * numpy.eye(dimension - k, dtype=int)
+        pivot = matrices[:, k, k].copy()
+        matrices[:, k + 1:, k + 1:] = (pivot[:, None, None] * matrices[:, k + 1:, k + 1:]
+            - matrices[:, k + 1:, k, None] * matrices[:, k, None, k + 1:]) // previous[:, None, None]
+        previous = pivot
+    determinants = sign * matrices[:, -1, -1]
+    determinants[singular] = 0
+    return determinants
+
+
+# Largest dimension for which det_int_batch uses the explicit formulas.
+_CLOSED_FORM_MAX_DIMENSION = 4
+
+
+# Determinants of a stack of matrices with shape [number,n,n] and n <= 4 by the
+# explicit formulas. For n = 4 the formula is the Laplace expansion along the
+# first two rows, i.e. a sum of products of 2x2 minors.
+def _det_closed_form(matrices):
+    '\b'
+    dimension = numpy.size(matrices, axis=1)
+    if dimension == 0:
+        return numpy.ones(numpy.size(matrices, axis=0), matrices.dtype)
+    if dimension == 1:
+        return matrices[:, 0, 0].copy()
+    m = [[matrices[:, row, column] for column in range(0, dimension)] for row in range(0, dimension)]
+    if dimension == 2:
+        return m[0][0] * m[1][1] - m[0][1] * m[1][0]
+    if dimension == 3:
+        return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1])
+                - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+                + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+    top = {(i, j): m[0][i] * m[1][j] - m[0][j] * m[1][i] for i in range(0, 4) for j in range(i + 1, 4)}
+    bottom = {(i, j): m[2][i] * m[3][j] - m[2][j] * m[3][i] for i in range(0, 4) for j in range(i + 1, 4)}
+    return (top[0, 1] * bottom[2, 3] - top[0, 2] * bottom[1, 3] + top[0, 3] * bottom[1, 2]
+            + top[1, 2] * bottom[0, 3] - top[1, 3] * bottom[0, 2] + top[2, 3] * bottom[0, 1])
+
+
+# det_int_batch calculates the determinants of a stack of matrices with integer
+# entries, with every step applied to the whole stack at once.
+def det_int_batch(matrices):
+    """Calculate the determinants of a stack of square matrices with integer entries.
+    
+    The determinants are exact. For dimensions up to 4 the explicit formulas are evaluated
+    for the whole stack at once, and for larger dimensions the fraction-free Gauss
+    elimination (Bareiss algorithm) of det_int is applied to the whole stack. This is much
+    faster than calling det_int for every matrix, e.g. to check generated matrices.
+    
+    Parameters
+    ----------
+    matrices : numpy.array
+        Integer array with shape [count,n,n].
+    
+    Returns
+    -------
+    determinants : numpy.ndarray
+        Array with shape [count]. Its type is numpy.int64 if the determinants cannot
+        overflow it, and object (Python ints) otherwise.
+    
+    Examples
+    --------
+    >>> det_int_batch(matrix_gen_batch(3, 4, det_value=5))
+    array([5, 5, 5])"""
+    matrices = numpy.asarray(matrices)
+    if matrices.ndim != 3 or numpy.size(matrices, axis=1) != numpy.size(matrices, axis=2):
+        raise TypeError('Not a stack of square matrices!')
+    if matrices.dtype.kind not in 'biuO':
+        raise TypeError('Only integer entries are allowed')
+    if numpy.size(matrices, axis=1) > _CLOSED_FORM_MAX_DIMENSION:
+        return _det_bareiss_batch(matrices)
+    # Every term and partial sum of the formulas is bounded by the permanent of
+    # abs(matrix), which is at most the product of the row sums of abs(matrix).
+    row_sums = numpy.sum(numpy.abs(numpy.asarray(matrices, dtype=float)), axis=-1)
+    bits = numpy.sum(numpy.log2(numpy.maximum(row_sums, 1)), axis=-1)
+    if numpy.size(bits) == 0 or numpy.max(bits) < _INT64_SAFE_BITS:
+        return _det_closed_form(numpy.array(matrices, dtype=numpy.int64))
+    return _det_closed_form(numpy.array(matrices.tolist(), dtype=object).reshape(matrices.shape))
+
+
+# Cofactors of the missing first row for a stack of matrices with shape 
+# [number,n-1,n]. The fraction-free Gauss-Jordan elimination of cofactors_int is
+# applied to the whole stack at once; the pivot row and the pivot column may
+# differ between the matrices. Matrices of lower rank get zero cofactors.
+def _cofactors_batch(matrices):
+    '\b'
+    matrices = _batch_array(matrices).copy()
+    number, number_of_rows, dimension = numpy.shape(matrices)
+    if dimension == 1:
+        return numpy.ones([number, 1], int)
+    stack_index = numpy.arange(0, number)
+    rank = numpy.zeros(number, int)
+    sign = numpy.ones(number, matrices.dtype)
+    previous = numpy.ones(number, matrices.dtype)
+    pivot_columns = numpy.zeros([number, number_of_rows], int)
+    free_column = numpy.full(number, -1)
+    for column in range(0, dimension):
+        # Rows below the current rank with a nonzero entry in the column.
+        candidates = (matrices[:, :, column] != 0) & (numpy.arange(0, number_of_rows) >= rank[:, None])
+        has_pivot = numpy.any(candidates, axis=1)
+        free_column[(free_column < 0) & numpy.invert(has_pivot) & (rank < number_of_rows)] = column
+        index = stack_index[has_pivot]
+        if numpy.size(index) == 0:
+            continue
+        pivot_row = numpy.argmax(candidates[index], axis=1)
+        row = rank[index]
+        swap = pivot_row != row
+        rows = matrices[index[swap], row[swap]].copy()
+        matrices[index[swap], row[swap]] = matrices[index[swap], pivot_row[swap]]
+        matrices[index[swap], pivot_row[swap]] = rows
+        sign[index[swap]] *= -1
+        pivot_rows = matrices[index, row]
+        pivot = pivot_rows[:, column]
+        reduced = (pivot[:, None, None] * matrices[index] 
+                   - matrices[index, :, column, None] * pivot_rows[:, None, :]) // previous[index, None, None]
+        reduced[numpy.arange(0, numpy.size(index)), row] = pivot_rows
+        matrices[index] = reduced
+        previous[index] = pivot
+        pivot_columns[index, row] = column
+        rank[index] += 1
+
+    # The cofactors span the nullspace of the rows and the cofactor of the free 
+    # column is the minor of the pivot columns, as in cofactors_int.
+    full_rank = rank == number_of_rows
+    free_column[full_rank & (free_column < 0)] = dimension - 1
+    cofactors = numpy.zeros([number, dimension], matrices.dtype)
+    index = stack_index[full_rank]
+    sign = sign[index] * (-1)**free_column[index]
+    cofactors[index, free_column[index]] = sign * previous[index]
+    row_index = numpy.arange(0, number_of_rows)
+    cofactors[index[:, None], pivot_columns[index]] = -sign[:, None] * matrices[index[:, None], row_index, free_column[index, None]]
+    return cofactors
+
+
+# Fraction-free Gauss-Jordan elimination of a stack of systems [A|B] with shape
+# [number,n,n+k], as in _gauss_jordan_bareiss but for the whole stack at once.
+# Returns d*A^-1*B and the last pivots d, which are the determinants of A up to
+# the sign, and a mask of the singular matrices (where d is 0).
+def _solve_bareiss_batch(systems, dimension):
+    '\b'
+    systems = _batch_array(systems).copy()
+    number = numpy.size(systems, axis=0)
+    previous = numpy.ones(number, systems.dtype)
+    singular = numpy.zeros(number, bool)
+    stack_index = numpy.arange(0, number)
+    eye = numpy.eye(dimension, numpy.size(systems, axis=2), dtype=int)
+    for column in range(0, dimension):
+        candidates = systems[:, column:, column] != 0
+        has_pivot = numpy.any(candidates, axis=1)
+        # Singular matrices are replaced by previous*[I|0], which is left unchanged by
+        # the following steps and keeps their divisions exact.
+        dead = stack_index[numpy.invert(has_pivot)]
+        singular[dead] = True
+        systems[dead] = previous[dead, None, None] * eye
+        pivot_row = column + numpy.argmax(candidates, axis=1)
+        pivot_row[dead] = column
+        rows = systems[stack_index, column].copy()
+        systems[stack_index, column] = systems[stack_index, pivot_row]
+        systems[stack_index, pivot_row] = rows
+        pivot_rows = systems[:, column].copy()
+        pivot = pivot_rows[:, column].copy()
+        systems = (pivot[:, None, None] * systems 
+                   - systems[:, :, column, None] * pivot_rows[:, None, :]) // previous[:, None, None]
+        systems[:, column] = pivot_rows
+        previous = pivot
+    previous[singular] = 0
+    return systems[:, :, dimension:], previous, singular
+
+
+# Divides numerators and denominators (with shape [number]) by their greatest
+# common divisors and makes the denominators positive.
+def _reduce_fractions(numerators, denominators):
+    '\b'
+    number = numpy.size(denominators)
+    divisors = numpy.gcd(numpy.gcd.reduce(numerators.reshape(number, -1), axis=1), denominators)
+    divisors[divisors == 0] = 1
+    divisors = divisors * numpy.where(denominators < 0, -1, 1)
+    shape = (number,) + (1,) * (numpy.ndim(numerators) - 1)
+    return numerators // divisors.reshape(shape), denominators // divisors
+
+
+# solve_int solves square systems of linear equations exactly, by fraction-free
+# Gauss-Jordan elimination of the augmented matrix [A|b].
+def solve_int(matrix, rhs):
+    '''Solve a square system of linear equations with integer coefficients exactly.
+    
+    The solution x of matrix @ x = rhs is returned as a numerator and a common denominator,
+    x = numerator / denominator, calculated by fraction-free Gauss-Jordan elimination
+    (as in det_int with method='bareiss'), so there is no rounding.
+    
+    Parameters
+    ----------
+    matrix : numpy.array
+        Integer matrix with shape [n,n], or a stack of matrices with shape [count,n,n].
+    rhs : numpy.array
+        Right-hand side with shape [n] or [n,k], or [count,n] or [count,n,k] for a stack.
+    
+    Returns
+    -------
+    numerator : numpy.ndarray
+        Integer array with the shape of rhs. The dtype is numpy.int64 unless the entries 
+        are too large, in which case they are Python ints (dtype=object).
+    denominator : int or numpy.ndarray
+        The positive common denominator, the smallest possible one. For a stack an array 
+        with shape [count].
+    
+    Raises
+    ------
+    ValueError
+        If a matrix is singular.
+    
+    Examples
+    --------
+    >>> solve_int(numpy.array([[2,1],[1,3]]), numpy.array([1,2]))
+    (array([1, 3]), 5)
+    
+    For a stack, e.g. the answer keys of generated exercises:
+    
+    >>> solve_int(numpy.array([[[2,1],[1,3]],[[1,0],[0,1]]]), numpy.array([[1,2],[4,5]]))
+    (array([[1, 3],
+           [4, 5]]), array([5, 1]))'''
+    matrix = numpy.asarray(matrix)
+    rhs = numpy.asarray(rhs)
+    if numpy.ndim(matrix) not in (2, 3) or numpy.size(matrix, axis=-1) != numpy.size(matrix, axis=-2):
+        raise TypeError('Not a square matrix or a stack of square matrices!')
+    batch = numpy.ndim(matrix) == 3
+    vector = numpy.ndim(rhs) == numpy.ndim(matrix) - 1
+    if vector:
+        rhs = rhs[..., None]
+    if numpy.ndim(rhs) != numpy.ndim(matrix) or numpy.shape(rhs)[:-1] != numpy.shape(matrix)[:-1]:
+        raise TypeError('The shape of rhs does not match the matrix!')
+    if numpy.size(rhs) and not (numpy.issubdtype(rhs.dtype, numpy.integer) or rhs.dtype == object):
+        raise TypeError('rhs must have integer entries')
+    dimension = numpy.size(matrix, axis=-1)
+
+    if batch:
+        numerators, denominators, singular = _solve_bareiss_batch(numpy.concatenate((matrix, rhs), axis=2), dimension)
+        if numpy.any(singular):
+            raise ValueError('Matrix is singular! (index ' + str(numpy.nonzero(singular)[0][0]) + ')')
+        numerators, denominators = _reduce_fractions(numerators, denominators)
+        numerators = _int_array(numerators.tolist()).reshape(numerators.shape)
+        denominators = _int_array(denominators.tolist())
+    else:
+        rows = [[int(entry) for entry in row] for row in numpy.concatenate((matrix.astype(object), rhs.astype(object)), axis=1).tolist()]
+        rows, pivot_columns, _ = _gauss_jordan_bareiss(rows)
+        if len([column for column in pivot_columns if column < dimension]) < dimension:
+            raise ValueError('Matrix is singular!')
+        denominator = rows[-1][dimension - 1] if dimension > 0 else 1
+        numerators = numpy.array([row[dimension:] for row in rows], dtype=object).reshape(1, dimension, numpy.size(rhs, axis=1))
+        numerators, denominators = _reduce_fractions(numerators, numpy.array([denominator], dtype=object))
+        numerators = _int_array(numerators[0].tolist()).reshape(numerators.shape[1:])
+        denominators = int(denominators[0])
+    return (numerators[..., 0] if vector else numerators), denominators
+
+
+# inverse_int inverts square integer matrices exactly.
+def inverse_int(matrix):
+    '''Calculate the inverse of a square matrix with integer entries exactly.
+    
+    The inverse is returned as a numerator and a common denominator, 
+    inverse = numerator / denominator, by solve_int with the identity matrix as rhs. If 
+    det(matrix) is \u00B11, the denominator is 1 and the inverse is an integer matrix.
+    
+    Parameters
+    ----------
+    matrix : numpy.array
+        Integer matrix with shape [n,n], or a stack of matrices with shape [count,n,n].
+    
+    Returns
+    -------
+    numerator : numpy.ndarray
+        Integer array with the shape of matrix.
+    denominator : int or numpy.ndarray
+        The positive common denominator, for a stack an array with shape [count].
+    
+    Raises
+    ------
+    ValueError
+        If a matrix is singular.
+    
+    Examples
+    --------
+    >>> inverse_int(numpy.array([[2,1],[1,3]]))
+    (array([[ 3, -1],
+           [-1,  2]]), 5)'''
+    matrix = numpy.asarray(matrix)
+    if numpy.ndim(matrix) not in (2, 3) or numpy.size(matrix, axis=-1) != numpy.size(matrix, axis=-2):
+        raise TypeError('Not a square matrix or a stack of square matrices!')
+    identity = numpy.broadcast_to(numpy.eye(numpy.size(matrix, axis=-1), dtype=int), numpy.shape(matrix))
+    return solve_int(matrix, identity)
+
+
+# Extended Euclid for Python ints. Returns (g,x,y) with x*a + y*b = g = gcd(a,b) >= 0.
+def _extended_gcd(a, b):
+    '\b'
+    old_r, r = a, b
+    old_x, x = 1, 0
+    old_y, y = 0, 1
+    while r != 0:
+        quotient = old_r // r
+        old_r, r = r, old_r - quotient * r
+        old_x, x = x, old_x - quotient * x
+        old_y, y = y, old_y - quotient * y
+    if old_r < 0:
+        return -old_r, -old_x, -old_y
+    return old_r, old_x, old_y
+
+
+# Integral LLL reduction (Cohen, A Course in Computational Algebraic Number Theory,
+# Algorithm 2.6.7) with delta=3/4 of linearly independent integer vectors given as
+# a list of lists of Python ints. d[i] are the Gram determinants and lam[k][j] the
+# scaled Gram-Schmidt coefficients, so every step is exact integer arithmetic.
+def _lll_reduce(basis):
+    '\b'
+    basis = [list(vector) for vector in basis]
+    size = len(basis)
+    if size < 2:
+        return basis
+    dot = lambda u, v: sum(x * y for x, y in zip(u, v))
+    d = [1] + [0] * size
+    lam = [[0] * size for _ in range(size)]
+
+    def reduce(k, l):
+        if 2 * abs(lam[k][l]) > d[l + 1]:
+            quotient = (2 * lam[k][l] + d[l + 1]) // (2 * d[l + 1])
+            basis[k] = [x - quotient * y for x, y in zip(basis[k], basis[l])]
+            lam[k][l] -= quotient * d[l + 1]
+            for i in range(0, l):
+                lam[k][i] -= quotient * lam[l][i]
+
+    def swap(k):
+        basis[k], basis[k - 1] = basis[k - 1], basis[k]
+        for j in range(0, k - 1):
+            lam[k][j], lam[k - 1][j] = lam[k - 1][j], lam[k][j]
+        mu = lam[k][k - 1]
+        new_d = (d[k - 1] * d[k + 1] + mu * mu) // d[k]
+        for i in range(k + 1, k_max + 1):
+            t = lam[i][k]
+            lam[i][k] = (d[k + 1] * lam[i][k - 1] - mu * t) // d[k]
+            lam[i][k - 1] = (new_d * t + mu * lam[i][k]) // d[k + 1]
+        d[k] = new_d
+
+    d[1] = dot(basis[0], basis[0])
+    k, k_max = 1, 0
+    while k < size:
+        if k > k_max:
+            k_max = k
+            for j in range(0, k + 1):
+                u = dot(basis[k], basis[j])
+                for i in range(0, j):
+                    u = (d[i + 1] * u - lam[k][i] * lam[j][i]) // d[i]
+                if j < k:
+                    lam[k][j] = u
+                else:
+                    d[k + 1] = u
+        reduce(k, k - 1)
+        if 4 * d[k + 1] * d[k - 1] < 3 * d[k] * d[k] - 4 * lam[k][k - 1] * lam[k][k - 1]:
+            swap(k)
+            k = max(1, k - 1)
         else:
-            row_column_index -= dimension
-            for row in range(0, dimension):
-                if matrix[row, row_column_index] != 0:
-                    determinant += (-1)**(
-                        row_column_index + row) * matrix[row, row_column_index] * det_int(
-                            numpy.delete(numpy.delete(matrix, row_column_index, axis=1), row, axis=0))
+            for l in range(k - 2, -1, -1):
+                reduce(k, l)
+            k += 1
+    return basis
+
 
-        return int(determinant)
+# Bits of the particular solution that diophantine_int rounds in floats at a time,
+# and the largest number of rounding rounds.
+_DIOPHANTINE_FLOAT_BITS = 960
+_DIOPHANTINE_MAX_ROUNDS = 100
+
+
+# diophantine_int solves one linear Diophantine equation.
+def diophantine_int(coefficients, value):
+    '''Solve the linear Diophantine equation coefficients @ x = value in integers.
+    
+    A unimodular matrix U with coefficients @ U = [g,0,...,0], g = gcd(coefficients), is 
+    built by extended Euclid on one coefficient at a time. The last columns of U span the 
+    homogeneous solutions and are LLL-reduced, and the particular solution is moved close 
+    to the origin with the reduced basis. Every solution is particular + t @ basis for a 
+    unique integer vector t.
+    
+    Parameters
+    ----------
+    coefficients : numpy.array
+        Integer array with shape [n] and at least one nonzero entry.
+    value : int
+        Right hand side of the equation.
+    
+    Returns
+    -------
+    out : tuple or None
+        (particular, basis) with shapes [n] and [n-1,n], or None if the equation has no 
+        integer solution. The dtype is numpy.int64 unless some entry is too large, in which
+        case the entries are Python ints (dtype=object).
+    
+    Examples
+    --------
+    >>> diophantine_int(numpy.array([5,7,8]), 1)
+    (array([ 0, -1,  1]), array([[-3,  1,  1],
+           [-1,  3, -2]]))'''
+    if numpy.ndim(coefficients) != 1:
+        raise TypeError('coefficients must be a 1-dimensional array')
+    coefficients = [int(coefficient) for coefficient in numpy.asarray(coefficients).tolist()]
+    if not any(coefficients):
+        raise ValueError('At least one coefficient must be nonzero')
+    value = int(value)
+    size = len(coefficients)
+
+    # Columns of the unimodular transform, kept as rows.
+    columns = [[int(row == column) for row in range(0, size)] for column in range(0, size)]
+    divisor = coefficients[0]
+    if divisor < 0:
+        divisor = -divisor
+        columns[0] = [-entry for entry in columns[0]]
+    for column in range(1, size):
+        coefficient = coefficients[column]
+        if coefficient == 0:
+            continue
+        new_divisor, x, y = _extended_gcd(divisor, coefficient)
+        first, other = columns[0], columns[column]
+        columns[0] = [x * u + y * v for u, v in zip(first, other)]
+        columns[column] = [(-coefficient // new_divisor) * u + (divisor // new_divisor) * v for u, v in zip(first, other)]
+        divisor = new_divisor
+    if value % divisor != 0:
+        return None
+
+    particular = [value // divisor * entry for entry in columns[0]]
+    basis = _lll_reduce(columns[1:])
+    if basis:
+        # Round the particular solution to the lattice point closest to the origin. The
+        # least squares problem is solved in floats, so a particular solution beyond
+        # the float range is scaled down by 2**scale and the rounding is repeated until
+        # the shift is 0.
+        float_basis = numpy.array(basis, float).T
+        for _ in range(_DIOPHANTINE_MAX_ROUNDS):
+            scale = max(0, max(abs(entry) for entry in particular).bit_length() - _DIOPHANTINE_FLOAT_BITS)
+            target = numpy.array([-(entry >> scale) for entry in particular], float)
+            shift = [int(t) << scale for t in numpy.rint(numpy.linalg.lstsq(float_basis, target, rcond=None)[0])]
+            if not any(shift):
+                break
+            particular = [entry + sum(t * vector[index] for t, vector in zip(shift, basis)) 
+                          for index, entry in enumerate(particular)]
+    return _int_array(particular), _int_array(basis).reshape(size - 1, size)
 
 
 # divmod_mod calculates the 2-array div_rest such that numerator = 
@@ -91,6 +903,22 @@ def gcd(array):
         return gcd(numpy.array([array[1], array[0] % array[1]]))
 
 
+# Format string of a matrix with the given shape, with the entries separated by
+# ' & ' and the rows by ' \\\\' and newlines. Filling it with the entries of a
+# whole matrix at once is much faster than joining the entries one by one.
+def _latex_template(rows, columns):
+    '\b'
+    if columns == 0:
+        return ''
+    return ' \\\\\n'.join([' & '.join(['{}'] * columns)] * rows)
+
+
+# Escapes the braces of LaTeX code that is part of a format string.
+def _escape_braces(text):
+    '\b'
+    return text.replace('{', '{{').replace('}', '}}')
+
+
 def numpy2latex(matrix,_print=False):
     """Make numpy array LaTeX friendly.
     
@@ -137,15 +965,9 @@ def numpy2latex(matrix,_print=False):
         raise TypeError('Input must be of type numpy.ndarray')
     elif not type(_print) is bool:
         raise TypeError('_print must be of type bool')
-    dimensions = numpy.array([numpy.size(matrix,axis=0),numpy.size(matrix,axis=1)])
-    output = ''
-    for row in range(0,dimensions[0]):
-        for column in range(0,dimensions[1]):
-            output += str(matrix[row,column])
-            if column < dimensions[1] - 1:
-                output += ' & '
-            elif row < dimensions[0] - 1:
-                output += ' \\\\\n'
+    if numpy.ndim(matrix) != 2:
+        raise ValueError('Input must be a 2-dimensional array')
+    output = _latex_template(*matrix.shape).format(*matrix.ravel().tolist())
     if _print: # If true, print output to terminal.
         print(output)
         return
@@ -153,8 +975,598 @@ def numpy2latex(matrix,_print=False):
         return output
 
 
-# matrix_gen outputs a random matrix with requested value of the determinant.
-def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10, rdn_prm = 0, attempts=200):
+# Environments of numpy2latex_batch. 'augmented' is an array environment in
+# parentheses with a vertical line before the right-hand sides.
+_LATEX_ENVIRONMENTS = (None, 'matrix', 'pmatrix', 'bmatrix', 'vmatrix', 'array', 'augmented')
+
+# Number of matrices that are formatted and written at a time by numpy2latex_batch.
+_LATEX_CHUNK = 4096
+
+
+def numpy2latex_batch(matrices, environment='pmatrix', rhs=None, file=None, separator='\n\n'):
+    """Make a stack of numpy arrays LaTeX friendly.
+    
+    A whole chunk of matrices is formatted at once, so this is much faster than calling
+    numpy2latex for every matrix.
+    
+    Parameters
+    ----------
+    matrices : numpy.array
+        Array with shape [count,m,n], or a sequence of arrays with shape [m,n].
+    environment : str or None, optional
+        Environment around every matrix: 'matrix', 'pmatrix' (default), 'bmatrix', 'vmatrix',
+        'array' (with right-aligned columns) or 'augmented'. 'augmented' needs rhs and writes
+        the system of equations as an array in parentheses with a vertical line before
+        the right-hand side. If None, the rows are written as by numpy2latex.
+    rhs : numpy.array, optional
+        Right-hand sides of the systems for 'augmented', with shape [count,m] or [count,m,k].
+    file : str, os.PathLike or writable text buffer, optional
+        If given, the output is written to this file or buffer, chunk by chunk, instead of
+        being returned.
+    separator : str, optional
+        Written between the matrices. Default is an empty line.
+    
+    Returns
+    -------
+    output : str or None
+        The LaTeX code of all matrices, or None if file is given.
+    
+    Examples
+    --------
+    >>> print(numpy2latex_batch(numpy.array([[[1,2],[3,4]],[[5,6],[7,8]]])))
+    \\begin{pmatrix}
+    1 & 2 \\\\
+    3 & 4
+    \\end{pmatrix}
+    <BLANKLINE>
+    \\begin{pmatrix}
+    5 & 6 \\\\
+    7 & 8
+    \\end{pmatrix}
+    
+    >>> print(numpy2latex_batch([numpy.array([[2,1],[1,1]])], 'augmented', rhs=numpy.array([[3,2]])))
+    \\left(\\begin{array}{rr|r}
+    2 & 1 & 3 \\\\
+    1 & 1 & 2
+    \\end{array}\\right)"""
+    
+    if environment not in _LATEX_ENVIRONMENTS:
+        raise ValueError('environment must be one of ' + ', '.join(map(str, _LATEX_ENVIRONMENTS)))
+    if (environment == 'augmented') != (rhs is not None):
+        raise ValueError('rhs must be given with environment=\'augmented\' and only then')
+    if not isinstance(matrices, numpy.ndarray):
+        matrices = numpy.array(list(matrices))
+    if matrices.ndim != 3:
+        raise ValueError('matrices must have shape [count,m,n]')
+    columns = matrices.shape[2]
+    if rhs is not None:
+        rhs = numpy.asarray(rhs)
+        if rhs.ndim == 2:
+            rhs = rhs[:, :, None]
+        if rhs.ndim != 3 or rhs.shape[:2] != matrices.shape[:2]:
+            raise ValueError('rhs must have shape [count,m] or [count,m,k] to match matrices')
+        matrices = numpy.concatenate((matrices.astype(object), rhs.astype(object)), axis=2)
+
+    if environment is None:
+        begin, end = '', ''
+    elif environment == 'array':
+        begin, end = '\\begin{array}{' + 'r' * columns + '}\n', '\n\\end{array}'
+    elif environment == 'augmented':
+        begin = '\\left(\\begin{array}{' + 'r' * columns + '|' + 'r' * (matrices.shape[2] - columns) + '}\n'
+        end = '\n\\end{array}\\right)'
+    else:
+        begin, end = '\\begin{' + environment + '}\n', '\n\\end{' + environment + '}'
+
+    # One format string for a whole chunk, with the environments and separators.
+    template = _latex_template(*matrices.shape[1:])
+    glue = _escape_braces(end + separator + begin)
+
+    opened = None
+    if file is not None and not hasattr(file, 'write'):
+        file = opened = open(file, 'w')
+    parts = []
+    try:
+        for first in range(0, len(matrices), _LATEX_CHUNK):
+            chunk = matrices[first:first + _LATEX_CHUNK]
+            text = begin + glue.join([template] * len(chunk)).format(*chunk.ravel().tolist()) + end
+            if first > 0:
+                text = separator + text
+            if file is None:
+                parts.append(text)
+            else:
+                file.write(text)
+    finally:
+        if opened is not None:
+            opened.close()
+    if file is None:
+        return ''.join(parts)
+
+
+# Return a numpy.random.Generator given None, a seed, a SeedSequence or a
+# Generator (which is returned as it is).
+def _get_rng(rng):
+    '\b'
+    if isinstance(rng, numpy.random.Generator):
+        return rng
+    return numpy.random.default_rng(rng)
+
+
+class GenerationTimeout(TimeoutError):
+    """Raised by matrix_gen when the time given by timeout is used up."""
+
+
+class GenerationCancelled(Exception):
+    """Raised by matrix_gen when its cancellation token is set."""
+
+
+# The deadline of a generation, from the timeout in seconds and a cancellation
+# token with an is_set method (e.g. threading.Event). It is None if neither is
+# given, and otherwise a dict with the end time on the time.monotonic clock, the
+# token and 'partial', which is set to True when a search is cut short by the
+# timeout after it found a solution.
+def _new_deadline(timeout, cancel):
+    '\b'
+    if timeout is not None and (not isinstance(timeout, (int, float)) or not timeout >= 0):
+        raise ValueError('timeout must be a non-negative number of seconds')
+    if cancel is not None and not callable(getattr(cancel, 'is_set', None)):
+        raise TypeError('cancel must have an is_set method, e.g. threading.Event')
+    if timeout is None and cancel is None:
+        return None
+    return {'end': None if timeout is None else time.monotonic() + timeout, 'cancel': cancel, 'partial': False}
+
+
+# Raises GenerationCancelled if the token of the deadline is set and
+# GenerationTimeout if the end time has passed. Called in the restart loops and
+# for every block of Part 5.
+def _check_deadline(deadline):
+    '\b'
+    if deadline is None:
+        return
+    if deadline['cancel'] is not None and deadline['cancel'].is_set():
+        raise GenerationCancelled('The generation was cancelled')
+    if deadline['end'] is not None and time.monotonic() >= deadline['end']:
+        raise GenerationTimeout('The generation took longer than the timeout')
+
+
+# Memory used for the parameter vectors tested at a time in Part 5, and the
+# volume below which a box is enumerated instead of split in two.
+_ENUMERATION_BLOCK_BYTES = 2**23
+_SPLIT_MAX_VOLUME = 2**14
+
+
+# Largest number of rounds of bound propagation for a box.
+_TIGHTEN_MAX_ROUNDS = 64
+
+
+# Part 5 computes in numpy.int64 if every value it may meet is below
+# 2**_INT64_SAFE_BITS in absolute value.
+_INT64_SAFE_BITS = 62
+
+
+# Returns sys_of_eq as numpy.int64 if Part 5 cannot overflow for parameters in
+# the box, otherwise as Python ints (dtype=object), as _batch_array does for the
+# determinants. The largest value is estimated in floats from the terms
+# coefficient*parameter of every row: the propagated bounds of _tighten_boxes are
+# at most twice the sum of the terms plus the bounds of the unknowns, and the
+# float estimate is below 2**63 with a margin for rounding.
+def _checked_sys_of_eq(sys_of_eq, parameters_bounds, lower_bound, upper_bound):
+    '\b'
+    magnitudes = numpy.append(numpy.abs(numpy.array(parameters_bounds, float)).max(axis=1, initial=0), 1)
+    terms = numpy.abs(numpy.array(sys_of_eq, float)) @ magnitudes
+    largest = 2 * numpy.max(terms, initial=0) + abs(lower_bound) + abs(upper_bound)
+    if largest < 2.0**_INT64_SAFE_BITS:
+        return numpy.array(sys_of_eq, dtype=numpy.int64)
+    return numpy.array(numpy.asarray(sys_of_eq).tolist(), dtype=object).reshape(numpy.shape(sys_of_eq))
+
+
+# Part 5 bound propagation for a stack of boxes with shape [count,parameters,2]. 
+# For every control row, lower_bound <= -sys_of_eq[row,:] @ b <= upper_bound-1 gives
+# a bound for each parameter in the row, given the bounds of the other parameters.
+# The bounds of all boxes are updated at once, until no bound changes or at most
+# _TIGHTEN_MAX_ROUNDS times. The shrunk boxes contain every solution. The boxes
+# that become empty are removed.
+def _tighten_boxes(sys_of_eq, boxes, control_rows, lower_bound, upper_bound):
+    '\b'
+    boxes = boxes[numpy.all(boxes[:, :, 0] <= boxes[:, :, 1], axis=1)]
+    if numpy.size(control_rows) == 0 or numpy.size(boxes, axis=1) == 0:
+        return boxes
+    coefficients = -sys_of_eq[control_rows, :-1]
+    constants = -sys_of_eq[control_rows, -1]
+    positive = numpy.maximum(coefficients, 0)
+    negative = numpy.minimum(coefficients, 0)
+    nonzero = coefficients != 0
+    divisors = numpy.where(nonzero, coefficients, 1)
+    chunk_size = max(1, _ENUMERATION_BLOCK_BYTES // (64 * numpy.size(coefficients)))
+
+    tightened = [boxes[0:0]]
+    for start in range(0, numpy.size(boxes, axis=0), chunk_size):
+        lower = boxes[start:start + chunk_size, :, 0].copy()
+        upper = boxes[start:start + chunk_size, :, 1].copy()
+        keep = numpy.ones(numpy.size(lower, axis=0), bool)
+        active = numpy.arange(0, numpy.size(lower, axis=0))
+        for _ in range(_TIGHTEN_MAX_ROUNDS):
+            if numpy.size(active) == 0:
+                break
+            box_lower = lower[active, None, :]
+            box_upper = upper[active, None, :]
+            # Interval of every term and every control row given the current boxes.
+            term_min = box_lower * positive + box_upper * negative
+            term_max = box_upper * positive + box_lower * negative
+            row_min = constants + term_min.sum(axis=2)
+            row_max = constants + term_max.sum(axis=2)
+            # Bounds of coefficient * parameter given the other terms.
+            target_min = lower_bound - (row_max[:, :, None] - term_max)
+            target_max = upper_bound - 1 - (row_min[:, :, None] - term_min)
+            new_lower = -(-numpy.where(coefficients > 0, target_min, target_max) // divisors)
+            new_upper = numpy.where(coefficients > 0, target_max, target_min) // divisors
+            new_lower = numpy.maximum(lower[active], numpy.where(nonzero, new_lower, box_lower).max(axis=1))
+            new_upper = numpy.minimum(upper[active], numpy.where(nonzero, new_upper, box_upper).min(axis=1))
+            empty = numpy.any(new_lower > new_upper, axis=1)
+            changed = numpy.any((new_lower != lower[active]) | (new_upper != upper[active]), axis=1)
+            lower[active] = new_lower
+            upper[active] = new_upper
+            keep[active[empty]] = False
+            active = active[changed & ~empty]
+        tightened.append(numpy.stack([lower[keep], upper[keep]], axis=2))
+    return numpy.concatenate(tightened)
+
+
+# Part 5 bound propagation for one box. Returns the shrunk box, or None if the
+# box becomes empty.
+def _tighten_bounds(sys_of_eq, parameters_bounds, control_rows, lower_bound, upper_bound):
+    '\b'
+    boxes = _tighten_boxes(sys_of_eq, _int_array(parameters_bounds)[None, :, :], control_rows, lower_bound, upper_bound)
+    if numpy.size(boxes, axis=0) == 0:
+        return None
+    return boxes[0]
+
+
+# Number of integer vectors in a box of parameters.
+def _box_volume(parameters_bounds):
+    '\b'
+    return math.prod(max(int(upper) - int(lower) + 1, 0) for lower, upper in parameters_bounds)
+
+
+# Approximate number of integer vectors in every box of a stack of boxes.
+def _box_volumes(boxes):
+    '\b'
+    return (boxes[:, :, 1] - boxes[:, :, 0] + 1).astype(float).prod(axis=1)
+
+
+# Splits every box of a stack of boxes in two halves. The split parameter is the one
+# with the widest range of its terms in the control rows, so that the halves are
+# shrunk as much as possible by _tighten_boxes.
+def _split_boxes(sys_of_eq, boxes, control_rows):
+    '\b'
+    box_index = numpy.arange(0, numpy.size(boxes, axis=0))
+    weights = 1 + numpy.abs(sys_of_eq[control_rows, :-1]).max(axis=0, initial=0)
+    parameter = numpy.argmax((boxes[:, :, 1] - boxes[:, :, 0]) * weights, axis=1)
+    middle = (boxes[box_index, parameter, 0] + boxes[box_index, parameter, 1]) // 2
+    lower_boxes = boxes.copy()
+    lower_boxes[box_index, parameter, 1] = middle
+    upper_boxes = boxes.copy()
+    upper_boxes[box_index, parameter, 0] = middle + 1
+    return lower_boxes, upper_boxes
+
+
+# Part 5 branch and bound. The boxes are split in two by _split_boxes until the
+# volume is at most _SPLIT_MAX_VOLUME, and every part is shrunk by
+# _tighten_boxes. Parts without solutions are dropped early, so the enumeration
+# only visits the boxes that may contain solutions.
+def _feasible_boxes(sys_of_eq, parameters_bounds, control_rows, lower_bound, upper_bound):
+    '\b'
+    stack = [_int_array(parameters_bounds)[None, :, :]]
+    while stack:
+        boxes = _tighten_boxes(sys_of_eq, stack.pop(), control_rows, lower_bound, upper_bound)
+        small = _box_volumes(boxes) <= _SPLIT_MAX_VOLUME
+        yield from boxes[small]
+        if not numpy.all(small):
+            lower_boxes, upper_boxes = _split_boxes(sys_of_eq, boxes[~small], control_rows)
+            stack.append(upper_boxes)
+            stack.append(lower_boxes)
+
+
+# Part 5 enumeration. Goes through all integer parameter vectors b in the given
+# boxes and yields, block by block, the solutions -sys_of_eq @ [b,1] for which
+# every control row is within the bounds. Each block of vectors is tested with
+# one matrix product, so that the memory use is bounded.
+def _feasible_blocks(sys_of_eq, boxes, control_rows, lower_bound, upper_bound, deadline=None):
+    '\b'
+    block_size = max(1, _ENUMERATION_BLOCK_BYTES // (8 * (numpy.size(sys_of_eq, axis=1) + numpy.size(control_rows))))
+    control_equations = sys_of_eq[control_rows, :]
+
+    for box in boxes:
+        lower = box[:, 0]
+        widths = box[:, 1] - lower + 1
+        total = _box_volume(box)
+        for start in range(0, total, block_size):
+            _check_deadline(deadline)
+            flat_index = numpy.arange(start, min(start + block_size, total))
+            parameters = numpy.ones([numpy.size(flat_index), numpy.size(lower) + 1], int)
+            if numpy.size(lower) > 0:
+                parameters[:, :-1] = numpy.array(numpy.unravel_index(flat_index, widths)).T + lower
+            values = -parameters @ control_equations.T
+            feasible = numpy.all((lower_bound <= values) & (values < upper_bound), axis=1)
+            if numpy.any(feasible):
+                yield -parameters[feasible] @ sys_of_eq.T
+
+
+# Part 5 and 6 without storing the solutions. One solution is kept while the 
+# blocks are streamed (reservoir sampling): after a block with k solutions, when
+# sol_counter solutions have been seen in total, a uniformly chosen solution of
+# the block replaces the kept one with probability k/sol_counter. The kept
+# solution is then uniformly distributed over all solutions. If first_k is 
+# positive, the search stops after first_k solutions and one of them is chosen.
+# If the timeout of the deadline passes after a solution was found, the kept
+# solution is returned, which is uniform among the solutions seen so far.
+# Returns the solution (or None) and the number of solutions seen.
+def _pick_solution(sys_of_eq, boxes, control_rows, lower_bound, upper_bound, rng, first_k=0, deadline=None):
+    '\b'
+    solution = None
+    sol_counter = 0
+    try:
+        for solutions in _feasible_blocks(sys_of_eq, boxes, control_rows, lower_bound, upper_bound, deadline):
+            if first_k > 0:
+                solutions = solutions[0:first_k - sol_counter, :]
+            block_counter = numpy.size(solutions, axis=0)
+            sol_counter += block_counter
+            if rng.integers(0, sol_counter) < block_counter:
+                solution = solutions[rng.integers(0, block_counter), :]
+            if 0 < first_k <= sol_counter:
+                break
+    except GenerationTimeout:
+        if solution is None:
+            raise
+        deadline['partial'] = True
+    return solution, sol_counter
+
+
+# Box volume above which the parameters are sampled instead of enumerated. Since
+# a draw costs about as much as an enumerated vector, the rejection sampler draws
+# at most the volume of the boxes divided by _REJECTION_VOLUME_PER_DRAW, and never
+# more than _REJECTION_MAX_DRAWS vectors, before the boxes are split. The first block has _REJECTION_FIRST_BLOCK vectors and the blocks then double.
+# With random parameters, an attempt is given up when there are more than
+# _ATTEMPT_MAX_BOXES boxes, since the next attempt uses other parameters anyway.
+_REJECTION_MIN_VOLUME = 2**20
+_REJECTION_VOLUME_PER_DRAW = 4
+_REJECTION_MAX_DRAWS = 2**18
+_REJECTION_FIRST_BLOCK = 64
+_ATTEMPT_MAX_BOXES = 2**8
+
+
+# Part 5 and 6 by rejection sampling. Parameter vectors are drawn uniformly from
+# the union of the boxes in blocks of growing size, and the first one for which
+# every control row is within the bounds is used. If none is found, the boxes
+# larger than the average are split in two and shrunk by _tighten_boxes, which
+# removes the parts without solutions, and the sampling is repeated. The union
+# always contains every solution and every vector in it is equally likely to be
+# drawn, so the solution is uniformly distributed over all solutions. When the
+# volume is small enough, the boxes are enumerated instead. Returns None if there
+# is no solution, or if there are more than max_boxes boxes.
+def _sample_solution(sys_of_eq, parameters_bounds, control_rows, lower_bound, upper_bound, rng, max_boxes=None,
+                     deadline=None):
+    '\b'
+    max_block_size = max(1, _ENUMERATION_BLOCK_BYTES // (8 * (numpy.size(sys_of_eq, axis=1) + numpy.size(control_rows))))
+    control_equations = sys_of_eq[control_rows, :]
+    boxes = _tighten_boxes(sys_of_eq, _int_array(parameters_bounds)[None, :, :], control_rows, lower_bound, upper_bound)
+    while 0 < numpy.size(boxes, axis=0) and (max_boxes is None or numpy.size(boxes, axis=0) <= max_boxes):
+        volumes = _box_volumes(boxes)
+        volume = volumes.sum()
+        if volume <= _REJECTION_MIN_VOLUME:
+            return _pick_solution(sys_of_eq, boxes, control_rows, lower_bound, upper_bound, rng, 0, deadline)[0]
+        max_draws = int(min(_REJECTION_MAX_DRAWS, volume / _REJECTION_VOLUME_PER_DRAW))
+        block_size = _REJECTION_FIRST_BLOCK
+        draws = 0
+        while draws < max_draws:
+            _check_deadline(deadline)
+            block_size = min(block_size, max_block_size, max_draws - draws)
+            box_index = rng.choice(numpy.size(boxes, axis=0), block_size, p=volumes / volume)
+            parameters = numpy.ones([block_size, numpy.size(boxes, axis=1) + 1], int)
+            parameters[:, :-1] = rng.integers(boxes[box_index, :, 0], boxes[box_index, :, 1] + 1)
+            values = -parameters @ control_equations.T
+            feasible = numpy.nonzero(numpy.all((lower_bound <= values) & (values < upper_bound), axis=1))[0]
+            if numpy.size(feasible) > 0:
+                return -sys_of_eq @ parameters[feasible[0]]
+            draws += block_size
+            block_size *= 2
+        # Split the large boxes and drop the parts without solutions.
+        large = volumes * numpy.size(boxes, axis=0) >= volume
+        lower_boxes, upper_boxes = _split_boxes(sys_of_eq, boxes[large], control_rows)
+        boxes = _tighten_boxes(sys_of_eq, numpy.concatenate([boxes[~large], lower_boxes, upper_boxes]), 
+                               control_rows, lower_bound, upper_bound)
+    return None
+
+
+# Generation statistics of matrix_gen. time holds the seconds spent in each part
+# of the algorithm, restart_reasons why _first_row gave up on the random rows.
+def _new_stats():
+    '\b'
+    return {'restarts': 0, 'attempts': 0, 'solutions': None, 'box_volume': None, 'sys_of_eq_shape': None, 'partial': False,
+            'time': {'part' + str(part): 0.0 for part in range(1, 7)},
+            'restart_reasons': {'unsolvable': 0, 'hopeless': 0, 'empty_box': 0, 'no_solution': 0, 'attempts': 0}}
+
+
+# Adds the time since start to the given part in stats (if stats is not None) and
+# returns the current time.
+def _record_time(stats, part, start):
+    '\b'
+    now = time.perf_counter()
+    if stats is not None:
+        stats['time'][part] += now - start
+    return now
+
+
+# Counts a restart of the given reason in stats (if stats is not None).
+def _record_restart(stats, reason):
+    '\b'
+    if stats is not None:
+        stats['restart_reasons'][reason] += 1
+
+
+# Hands the statistics to the stats argument of matrix_gen, which is a dict to
+# update or a callable.
+def _deliver_stats(stats, record):
+    '\b'
+    if callable(stats):
+        stats(record)
+    elif stats is not None:
+        stats.update(record)
+
+
+# Hadamard's inequality: no matrix with entries in [lower_bound, upper_bound) has
+# a determinant above dimension**(dimension/2) * max_entry**dimension in absolute value.
+def _hadamard_limit(dimension, lower_bound, upper_bound):
+    '\b'
+    max_entry = max(abs(lower_bound), abs(upper_bound - 1))
+    return math.isqrt(dimension**dimension * max_entry**(2 * dimension))
+
+
+# Analysis of cofactors @ a = det_value for integer vectors a in the box
+# [lower_bound, upper_bound)**n, for a stack of cofactors with shape [count,n] and
+# det_values with shape [count]. For a uniform a in the box, the sum cofactors @ a
+# is a multiple of the gcd with mean mu and variance sigma**2, so the number of
+# solutions is estimated as W**n * gcd * normal_pdf(det_value; mu, sigma), where
+# W = upper_bound - lower_bound. By Hoeffding's inequality the number of solutions
+# is at most W**n * exp(-2 t**2 / sum((cofactors * (W-1))**2)), where t is the
+# distance of det_value from mu. As the number is an integer, there is no solution
+# if this bound is below 1. Returns the estimates (at most the bound), where the
+# gcd does not divide det_value (unsolvable) and where det_value is outside the
+# range of the sum or the bound is below 1 (hopeless).
+def _solution_analysis(cofactors, det_values, lower_bound, upper_bound):
+    '\b'
+    divisors = numpy.array([math.gcd(*row) for row in numpy.asarray(cofactors).tolist()], dtype=object)
+    det_values = numpy.array(numpy.asarray(det_values).tolist(), dtype=object)
+    zero = divisors == 0
+    unsolvable = numpy.where(zero, det_values != 0, det_values % numpy.where(zero, 1, divisors) != 0).astype(bool)
+
+    cofactors = numpy.array(cofactors, dtype=float)
+    det_values = det_values.astype(float)
+    dimension = numpy.size(cofactors, axis=1)
+    width = upper_bound - lower_bound
+    mean = (lower_bound + upper_bound - 1) / 2 * cofactors.sum(axis=1)
+    squares = numpy.sum(cofactors**2, axis=1)
+    low = numpy.minimum(cofactors * lower_bound, cofactors * (upper_bound - 1)).sum(axis=1)
+    high = numpy.maximum(cofactors * lower_bound, cofactors * (upper_bound - 1)).sum(axis=1)
+    # Margins for the rounding of the float sums.
+    slack = 1e-9 * numpy.abs(cofactors).sum(axis=1) * max(abs(lower_bound), abs(upper_bound - 1)) + 0.5
+    log_volume = dimension * math.log(width)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        log_bound = log_volume - 2 * (det_values - mean)**2 / (squares * (width - 1)**2)
+        variance = squares * (width**2 - 1) / 12
+        log_estimate = (log_volume + numpy.log(divisors.astype(float)) - 0.5 * numpy.log(2 * math.pi * variance)
+                        - (det_values - mean)**2 / (2 * variance))
+    hopeless = (det_values < low - slack) | (det_values > high + slack) | (log_bound < -1e-9 * (1 + log_volume))
+    hopeless &= ~zero
+    estimates = numpy.exp(numpy.minimum(log_estimate, log_bound))
+    estimates[zero] = width**dimension
+    estimates[unsolvable | hopeless] = 0.0
+    return estimates, unsolvable, hopeless
+
+
+def estimate_solutions(cofactors, det_value, lower_bound=-9, upper_bound=10):
+    """Estimate the number of first rows that give a matrix the determinant det_value.
+
+    The first rows are the integer vectors a with entries in [lower_bound, upper_bound) and
+    cofactors @ a = det_value. The estimate is the normal approximation of the distribution
+    of cofactors @ a, capped by Hoeffding's inequality. It is 0 if there is certainly no
+    solution: if the gcd of the cofactors does not divide det_value, if det_value is
+    outside the range of cofactors @ a, or if Hoeffding's inequality shows that there are
+    fewer than one solution. The estimate is cheap compared with the search of matrix_gen,
+    which skips rows 2-n with an estimate of 0 without searching.
+
+    Parameters
+    ----------
+    cofactors : numpy.array
+        Integer array with shape [n], e.g. from cofactors_int, or a stack with shape [count,n].
+    det_value : int
+        Value of the determinant.
+    lower_bound, upper_bound : int, optional
+        Bounds of the entries, as in matrix_gen.
+
+    Returns
+    -------
+    estimate : float or numpy.ndarray
+        The estimated number of solutions, with shape [count] for a stack.
+
+    Examples
+    --------
+    >>> estimate_solutions(cofactors_int(numpy.array([[1, 2, 3], [4, 5, 6]])), 1)
+    0.0"""
+    cofactors = numpy.asarray(cofactors)
+    if cofactors.ndim not in (1, 2):
+        raise TypeError('cofactors must have shape [n] or [count,n]')
+    if not type(det_value) is int:
+        raise TypeError('det_value is of invalid datatype!')
+    stack = numpy.atleast_2d(cofactors)
+    estimates = _solution_analysis(stack, [det_value] * numpy.size(stack, axis=0), lower_bound, upper_bound)[0]
+    if cofactors.ndim == 1:
+        return float(estimates[0])
+    return estimates
+
+
+def feasibility(dimension, det_value, lower_bound=-9, upper_bound=10, samples=200, rng=None):
+    """Estimate how hard it is for matrix_gen to find a matrix, before generating one.
+
+    Random rows 2-n are drawn as in matrix_gen and estimate_solutions is applied to the
+    cofactors of their first rows. Since matrix_gen randomizes the rows again until a first
+    row exists, the success rate estimates how often it has to do so.
+
+    Parameters
+    ----------
+    dimension : int
+        Dimension of the matrix, at least 2.
+    det_value, lower_bound, upper_bound : int, optional
+        As in matrix_gen.
+    samples : int, optional
+        Number of random rows 2-n that are analysed.
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Source of the randomness.
+
+    Returns
+    -------
+    report : dict
+        'hadamard_bound' is the bound of Hadamard's inequality on abs(det_value), above which
+        matrix_gen raises ValueError at once, and 'possible' whether abs(det_value) is within
+        it. 'success_rate' is the estimated share of random rows 2-n that have a first row,
+        'expected_draws' the expected number of times matrix_gen randomizes the rows (inf if
+        the success rate is 0) and 'expected_solutions' the mean estimated number of first rows.
+
+    Examples
+    --------
+    >>> feasibility(4, 200000)['possible']
+    False"""
+    if not type(dimension) is int or dimension < 2:
+        raise ValueError('dimension must be an integer of at least 2')
+    if not type(det_value) is int:
+        raise TypeError('det_value is of invalid datatype!')
+    if not type(samples) is int or samples <= 0:
+        raise ValueError('samples must be a positive integer')
+    if not type(lower_bound) is int or not type(upper_bound) is int or lower_bound >= upper_bound - 1:
+        raise ValueError('the bounds must be integers with a difference of at least 2')
+    rng = _get_rng(rng)
+    hadamard_bound = _hadamard_limit(dimension, lower_bound, upper_bound)
+    report = {'hadamard_bound': hadamard_bound, 'possible': abs(det_value) <= hadamard_bound,
+              'success_rate': 0.0, 'expected_draws': math.inf, 'expected_solutions': 0.0}
+    if not report['possible']:
+        return report
+    cofactors = _cofactors_batch(rng.integers(lower_bound, upper_bound, [samples, dimension - 1, dimension]))
+    # matrix_gen swaps the first row with a random row, which changes the sign.
+    det_values = [det_value if row == 0 else -det_value for row in rng.integers(0, dimension, samples).tolist()]
+    estimates = _solution_analysis(cofactors, det_values, lower_bound, upper_bound)[0]
+    report['success_rate'] = float(numpy.mean(numpy.minimum(estimates, 1)))
+    report['expected_solutions'] = float(numpy.mean(estimates))
+    if report['success_rate'] > 0:
+        report['expected_draws'] = 1 / report['success_rate']
+    return report
+
+
+# _first_row calculates the first row of the matrix, given the cofactors of the
+# first row, such that the determinant is det_value and the entries are within
+# the bounds. Returns None if there is no solution or if the attempts are used up.
+# If stats is a dict from _new_stats, the time of Part 2-6 and the restarts are recorded.
+# The deadline from _new_deadline is checked for every attempt and block of Part 5.
+def _first_row(cofactors, det_value, lower_bound, upper_bound, rdn_prm, attempts, rng, first_k=0, sampler='auto', stats=None,
+               deadline=None):
 
 # In this function a matrix of specified dimension is requested. First, the rows [2:dimension] are randomized. 
 # Then the possible values first row is calculated by solving the diophantine equation
@@ -162,45 +1574,432 @@ def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10,
     # a_1*c_1+a_2*c_2+...+a_dimension*c_dimension = det_value.
 
 # where c_1,...,c_dimension are the cofactors of the first row of the matrix. 
-# The diophantine equation is solved by substuting the variables with new variables until the 
-# diophantine equation has only two unknown variabes. The program always try to
-# reduce the term with largest cofactor (in absolute value).
+# The diophantine equation is solved by diophantine_int, which gives a particular
+# solution p and an LLL-reduced basis v_1,...,v_(dimension-1) of the solutions of
+# the homogeneous equation. All solutions are then
+
+    # a = p + b_1*v_1 + ... + b_(dimension-1)*v_(dimension-1)
+
+# for integer parameters b_1,...,b_(dimension-1).
 
   # Example: assume that the diophantine equation is calculated as
 
     # 5a_1 + 7a_2 + 8a_3 = 1
 
-  # Then make the following substitutions: (start with reducing 8 in the third term)
-
-    # a_2 = -a_3 + b_1 => 5a_1 +7b_1+a_3 = 1,
-    # a_1 = -b_1 + b_2 => 5b_2 +2b_1 + a_3 = 1,
-    # b_1 = -2b_2 + b_3 => b_2 + 2b_3 + a_3 = 1,
-    # b_2 = -2b_3 + b_4 => b_4 + a_3 = 1,
-    # => b_4 + a_3 = 1.
-  
-  # That is, we have a modified and lot simpler diophantine equation. 
-  # Note that this shows that the original diophantine equation is solvable.
-  # Moving everything to the left hand side we obtain the augmented matrix
-  # [[0,1,1,1,0,0,0,0],
-  #  [1,0,0,1,-1,0,0,0],
-  #  [0,0,0,1,2,-1,0,0],
-  #  [0,0,0,0,1,2,-1,0]
-  #  [0,0,1,0,0,0,1,-1]
-  # where the columns represent the variables
-  # [a_1,a_2,a_3,b_1,b_2,b_3,b_4,constant]
-  # (observe that in this function, every row is implicitly assumed to be equal to 0).
-
-  # Solving for a_1,a_2,a_3 depending on the parameters b_3 and b_4 we obtain
-  # all possible solutions to the diophantine equation.
-
-  
+  # Extended Euclid gives gcd(5,7,8) = 1 and the solutions
+
+    # [a_1,a_2,a_3] = [0,-1,1] + b_1*[-3,1,1] + b_2*[-1,3,-2].
+
+  # Since the basis is short and nearly orthogonal, bounds on a_1,a_2,a_3 give a
+  # small box of possible parameters b_1,b_2.
+
 # Then the function finalizes by calculating possible solutions for
-# a_1,...a_dimension within the given bounds. To speed up the calculation the 
-# function tries to write as many unknowns as possible depending on only one
-# parameter. This is done in Part 4 by column-wise elimination. Also the user can choose to randomize some variable (by assigning
+# a_1,...a_dimension within the given bounds. Also the user can choose to randomize some parameters (by assigning
 # rdn_prm a positive integer), to reduce the number of calculation but to the cost
 # of less randomness of the output matrix.
 
+    '\b'
+    start = time.perf_counter()
+    cofactors = numpy.array(cofactors)
+    sol_attempts = 0
+
+    # We treat the zero cofactors separately and reduce the dimension considered to the
+    # number of non-zero cofactors.
+    dimension = numpy.size(cofactors)
+    zero_cofactor = (cofactors == 0)
+    _dim = numpy.count_nonzero(numpy.invert(zero_cofactor))
+    cofactors = cofactors[numpy.invert(zero_cofactor)] # Set new cofactors to non-zero cofactors
+
+    if _dim == 1: # Treats the case when only one cofactor is non-zero.
+        if det_value % cofactors[0] != 0 or not lower_bound <= det_value // cofactors[0] < upper_bound:
+            _record_restart(stats, 'unsolvable')
+            return None
+        solution = numpy.zeros(dimension, int)
+        solution[numpy.invert(zero_cofactor)] = det_value // cofactors[0]
+        solution[zero_cofactor] = rng.integers(lower_bound, upper_bound, dimension - _dim)
+        return solution
+    elif _dim == 0: # E.g. if one randomized row is zero.
+        return rng.integers(lower_bound, upper_bound, dimension)
+
+    # Skip the search if the analysis shows that there is no solution.
+    _, unsolvable, hopeless = _solution_analysis(cofactors[None, :], [det_value], lower_bound, upper_bound)
+    if unsolvable[0] or hopeless[0]:
+        _record_time(stats, 'part2', start)
+        _record_restart(stats, 'unsolvable' if unsolvable[0] else 'hopeless')
+        return None
+
+    # Part 2 - Solve the diophantine equation generated by cofactor expansion of the
+    # unknown row 1.
+    solved = diophantine_int(cofactors, det_value)
+    start = _record_time(stats, 'part2', start)
+    if solved is None: # The gcd of the cofactors does not divide det_value.
+        _record_restart(stats, 'unsolvable')
+        return None
+    particular, basis = solved
+
+    # Part 3 - Write the solutions as a = -sys_of_eq @ [b_1,...,b_(dimension-1),1]. Every
+    # unknown variable depends on several parameters, so every row is checked against
+    # the bounds.
+    sys_of_eq = -numpy.concatenate((basis.T, particular[:, None]), axis=1)
+    control_rows = numpy.arange(0, _dim)
+    start = _record_time(stats, 'part3', start)
+
+    # Part 4 - Determine bounds for the parameters. Since b = pinv(basis.T) @ (a - p) 
+    # for every solution a, each parameter is bounded by the range of its row of the
+    # pseudo-inverse over the box of a (with a margin for rounding).
+    inverse = numpy.linalg.pinv(numpy.array(basis.T, float))
+    middle = inverse @ ((lower_bound + upper_bound - 1) / 2 - numpy.array(particular, float))
+    radius = numpy.abs(inverse).sum(axis=1) * (upper_bound - 1 - lower_bound) / 2
+    parameters_bounds = _int_array([[int(numpy.floor(low)) - 1, int(numpy.ceil(high)) + 1] 
+                                    for low, high in zip(middle - radius, middle + radius)])
+    # Part 5 uses Python ints only if numpy.int64 may overflow.
+    sys_of_eq = _checked_sys_of_eq(sys_of_eq, parameters_bounds, lower_bound, upper_bound)
+    start = _record_time(stats, 'part4', start)
+
+    # Part 5 - Shrink the box of parameters and search for solutions
+    parameters_bounds = _tighten_bounds(sys_of_eq, parameters_bounds, control_rows, lower_bound, upper_bound)
+    if parameters_bounds is None: # There is no solution within the bounds.
+        _record_time(stats, 'part5', start)
+        _record_restart(stats, 'empty_box')
+        return None
+    if stats is not None:
+        stats['sys_of_eq_shape'] = sys_of_eq.shape
+        stats['box_volume'] = _box_volume(parameters_bounds)
+        stats['solutions'] = None
+
+    sol_counter = 0
+    
+    while sol_counter == 0:
+        _check_deadline(deadline)
+
+        # Try random parameters
+        b = numpy.append(parameters_bounds[:,0], [1])
+        rdn_prm = min(rdn_prm,_dim - 2) # At least one parameter is left to search.
+        if rdn_prm == 0:
+            randomised_parameters = numpy.array([], int)
+        else:
+            randomised_parameters = rng.choice(numpy.arange(0,_dim-1),rdn_prm,replace=False)
+            # The values are the rounded parameters of a random point of the box of the
+            # unknowns, so that solutions are likely to be left.
+            point = inverse @ (rng.uniform(lower_bound, upper_bound - 1, _dim) - numpy.array(particular, float))
+            b[randomised_parameters] = numpy.clip(numpy.rint(point[randomised_parameters]).astype(int), 
+                                                  parameters_bounds[randomised_parameters, 0], parameters_bounds[randomised_parameters, 1])
+
+        sol_attempts += 1
+        if stats is not None:
+            stats['attempts'] += 1
+
+        if sol_attempts >= attempts: # Restart function and generate new random rows if too
+            # many attemps are done.
+            _record_time(stats, 'part5', start)
+            _record_restart(stats, 'attempts')
+            return None
+
+        # The box of the remaining parameters when the randomised parameters are fixed.
+        attempt_bounds = parameters_bounds.copy()
+        attempt_bounds[randomised_parameters, :] = b[randomised_parameters, None]
+        attempt_bounds = _tighten_bounds(sys_of_eq, attempt_bounds, control_rows, lower_bound, upper_bound)
+        first_solution = None
+        if attempt_bounds is not None:
+            attempt_sampler = sampler
+            if sampler == 'auto':
+                attempt_sampler = 'rejection' if first_k == 0 and _box_volume(attempt_bounds) > _REJECTION_MIN_VOLUME else 'enumerate'
+            if attempt_sampler == 'rejection':
+                first_solution = _sample_solution(sys_of_eq, attempt_bounds, control_rows, lower_bound, upper_bound, rng,
+                                                  None if rdn_prm == 0 else _ATTEMPT_MAX_BOXES, deadline)
+                sol_counter = 0 if first_solution is None else 1
+            else:
+                first_solution, sol_counter = _pick_solution(sys_of_eq, _feasible_boxes(sys_of_eq, attempt_bounds, control_rows, lower_bound, upper_bound),
+                                                             control_rows, lower_bound, upper_bound, rng, first_k, deadline)
+                if stats is not None:
+                    stats['solutions'] = sol_counter
+        if sol_counter == 0 and rdn_prm == 0: # The search would be repeated
+            # without any randomised parameter, so restart immediately.
+            _record_time(stats, 'part5', start)
+            _record_restart(stats, 'no_solution')
+            return None
+    start = _record_time(stats, 'part5', start)
+
+
+    # Part 6 - Choose one solution and concatenate it with the rest of the randomized
+    # matrix rows.
+
+    # The solution was chosen uniformly while the solutions were enumerated in Part 5.
+    solution = numpy.zeros(dimension,int)
+    solution[zero_cofactor] = rng.integers(lower_bound, upper_bound, dimension - _dim)
+    solution[numpy.invert(zero_cofactor)] = first_solution
+    _record_time(stats, 'part6', start)
+    return solution
+
+
+# Number of steps per dimension of the unimodular method. Every step applies up
+# to dimension/2 row (or column) operations at once.
+_UNIMODULAR_STEPS = 8
+
+
+# The prime factors of a positive integer with multiplicity, by trial division.
+def _prime_factors(number):
+    '\b'
+    primes = []
+    prime = 2
+    while prime * prime <= number:
+        while number % prime == 0:
+            primes.append(prime)
+            number //= prime
+        prime += 1
+    if number > 1:
+        primes.append(number)
+    return primes
+
+
+# Splits abs_det into dimension factors that are at most high, by putting the
+# prime factors from the largest into the first factor where they fit. Returns
+# None if this fails.
+def _diagonal_factors(abs_det, dimension, high):
+    '\b'
+    factors = [1] * dimension
+    for prime in sorted(_prime_factors(abs_det), reverse=True):
+        for index in range(dimension):
+            if factors[index] * prime <= high:
+                factors[index] *= prime
+                break
+        else:
+            return None
+    return factors
+
+
+# The sign of a permutation, from the number of its cycles.
+def _permutation_sign(permutation):
+    '\b'
+    seen = numpy.zeros(len(permutation), bool)
+    cycles = 0
+    for start in range(len(permutation)):
+        if not seen[start]:
+            cycles += 1
+            index = start
+            while not seen[index]:
+                seen[index] = True
+                index = permutation[index]
+    return -1 if (len(permutation) - cycles) % 2 else 1
+
+
+# _unimodular_matrix generates a matrix by random elementary operations, which
+# keep the determinant. It starts from a diagonal matrix with determinant
+# abs(det_value). In every step the rows (or, in every second step, the columns)
+# are paired at random, and row i += k * row j is applied for all pairs at once,
+# with k in {-2,-1,1,2}. Operations that would leave the bounds are skipped. In
+# the end the rows and columns are permuted at random, with one more swap if
+# the sign of the determinant is wrong.
+def _unimodular_matrix(dimension, det_value, lower_bound, upper_bound, rng):
+    '\b'
+    if lower_bound > 0 or upper_bound < 2:
+        raise ValueError('method=\'unimodular\' needs bounds that contain 0 and 1')
+    if det_value == 0:
+        factors = [0] + [1] * (dimension - 1)
+    else:
+        factors = _diagonal_factors(abs(det_value), dimension, upper_bound - 1)
+        if factors is None:
+            raise ValueError('method=\'unimodular\' needs det_value to be a product of dimension factors below upper_bound')
+    matrix = numpy.diag(numpy.array(factors, int))
+
+    half = dimension // 2
+    for step in range(_UNIMODULAR_STEPS * (dimension + 2)):
+        view = matrix.T if step % 2 else matrix # The columns are the rows of the transpose.
+        order = rng.permutation(dimension)
+        targets, sources = order[:half], order[half:2 * half]
+        changed = view[targets] + rng.choice([-2, -1, 1, 2], [half, 1]) * view[sources]
+        inside = (changed.min(axis=1) >= lower_bound) & (changed.max(axis=1) < upper_bound)
+        view[targets[inside]] = changed[inside]
+
+    rows = rng.permutation(dimension)
+    columns = rng.permutation(dimension)
+    matrix = matrix[rows][:, columns]
+    if det_value != 0 and _permutation_sign(rows) * _permutation_sign(columns) != (1 if det_value > 0 else -1):
+        matrix[[0, 1]] = matrix[[1, 0]]
+    return matrix
+
+
+def zero_pattern(dimension, kind='band', bandwidth=1, blocks=None, zeros_per_row=1, rng=None):
+    """Build a zero pattern for the zeros argument of matrix_gen.
+    
+    Parameters
+    ----------
+    dimension : int
+        Dimension of the matrix.
+    kind : str, optional
+        'band' (default) sets the entries more than bandwidth places from the diagonal to 0.
+        'upper' and 'lower' give a block upper or lower triangular matrix, with the sizes
+        of the diagonal blocks given by blocks. 'rows' puts zeros_per_row zeros at random
+        places in every row, but never on all the places of a permutation, so that the
+        matrix can have any determinant.
+    bandwidth : int, optional
+        Number of nonzero diagonals on each side of the diagonal for 'band'.
+    blocks : list of int, optional
+        Sizes of the diagonal blocks for 'upper' and 'lower', with the sum dimension.
+        Default is blocks of size 1, i.e. a triangular matrix.
+    zeros_per_row : int, optional
+        Number of zeros in every row for 'rows', at most dimension-1.
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Source of the randomness of 'rows'.
+    
+    Returns
+    -------
+    zeros : numpy.ndarray
+        Boolean array with shape [dimension,dimension] that is True for the entries that are 0.
+    
+    Examples
+    --------
+    >>> matrix_gen(4, 3, zeros=zero_pattern(4, 'band'))
+    array([[ 3, -4,  0,  0],
+           [-5,  7,  2,  0],
+           [ 0, -8,  3, -7],
+           [ 0,  0,  4, -9]])"""
+    if not type(dimension) is int or dimension < 0:
+        raise ValueError('dimension must be a non-negative integer')
+    rows, columns = numpy.indices([dimension, dimension])
+    if kind == 'band':
+        if not type(bandwidth) is int or bandwidth < 0:
+            raise ValueError('bandwidth must be a non-negative integer')
+        return numpy.abs(rows - columns) > bandwidth
+    if kind in ('upper', 'lower'):
+        if blocks is None:
+            blocks = [1] * dimension
+        if any(not type(size) is int or size <= 0 for size in blocks) or sum(blocks) != dimension:
+            raise ValueError('blocks must be positive integers with the sum dimension')
+        block_index = numpy.repeat(numpy.arange(0, len(blocks)), blocks)
+        if kind == 'upper':
+            return block_index[:, None] > block_index[None, :]
+        return block_index[:, None] < block_index[None, :]
+    if kind == 'rows':
+        if not type(zeros_per_row) is int or not 0 <= zeros_per_row < max(dimension, 1):
+            raise ValueError('zeros_per_row must be an integer between 0 and dimension-1')
+        rng = _get_rng(rng)
+        permutation = rng.permutation(dimension)
+        zeros = numpy.zeros([dimension, dimension], bool)
+        for row in range(0, dimension):
+            candidates = numpy.delete(numpy.arange(0, dimension), permutation[row])
+            zeros[row, rng.choice(candidates, zeros_per_row, replace=False)] = True
+        return zeros
+    raise ValueError('kind must be one of \'band\', \'upper\', \'lower\' and \'rows\'')
+
+
+# Hadamard's inequality for matrices with the zeros of a pattern. A row with k
+# entries that are not forced to 0 has a norm of at most sqrt(k)*max_entry.
+def _pattern_hadamard_limit(zeros, lower_bound, upper_bound):
+    '\b'
+    max_entry = max(abs(lower_bound), abs(upper_bound - 1))
+    nonzero_entries = math.prod(int(count) for count in numpy.count_nonzero(~zeros, axis=1))
+    return math.isqrt(nonzero_entries * max_entry**(2 * numpy.size(zeros, axis=0)))
+
+
+# Whether the entries that are not forced to 0 by the pattern contain the places
+# of a permutation, i.e. a perfect matching of the rows and the columns, found by
+# augmenting paths. Otherwise every matrix with the pattern is singular.
+def _has_perfect_matching(zeros):
+    '\b'
+    dimension = numpy.size(zeros, axis=0)
+    allowed = [numpy.flatnonzero(~row).tolist() for row in zeros]
+    column_rows = [-1] * dimension
+
+    def augment(row, visited):
+        for column in allowed[row]:
+            if not visited[column]:
+                visited[column] = True
+                if column_rows[column] < 0 or augment(column_rows[column], visited):
+                    column_rows[column] = row
+                    return True
+        return False
+
+    return all(augment(row, [False] * dimension) for row in range(0, dimension))
+
+
+# Checks the zeros argument of matrix_gen and returns it as a boolean array.
+def _check_zeros(zeros, dimension, det_value, lower_bound, upper_bound):
+    '\b'
+    zeros = numpy.asarray(zeros)
+    if zeros.shape != (dimension, dimension) or zeros.dtype != bool:
+        raise ValueError('zeros must be a boolean array with shape [dimension,dimension]')
+    if not lower_bound <= 0 < upper_bound:
+        raise ValueError('zeros needs 0 within the bounds!')
+    if det_value != 0 and not _has_perfect_matching(zeros):
+        raise ValueError('the zero pattern forces the determinant to be 0!')
+    return zeros
+
+
+# The diagonal blocks [start,end) of a zero pattern that is block upper (or block
+# lower) triangular with at least two blocks, otherwise None. There is a block
+# boundary at k if every entry below and to the left of (k,k) (or above and to the
+# right of it) is forced to 0.
+def _triangular_blocks(zeros):
+    '\b'
+    dimension = numpy.size(zeros, axis=0)
+    for upper in (True, False):
+        cuts = [k for k in range(1, dimension) if (zeros[k:, :k] if upper else zeros[:k, k:]).all()]
+        if cuts:
+            boundaries = [0] + cuts + [dimension]
+            return list(zip(boundaries[:-1], boundaries[1:]))
+    return None
+
+
+# Number of random splits of det_value over the diagonal blocks that are tried.
+_BLOCK_SPLIT_TRIES = 100
+
+
+# Splits det_value into the determinants of the diagonal blocks. The prime factors
+# of abs(det_value) and the sign are given to random blocks until every block of
+# size 1 is within the bounds and no other block exceeds its Hadamard bound. For 
+# det_value = 0 the blocks that the pattern makes singular, or else a random block,
+# get 0 and the others 1 or -1. Returns None if no split is found.
+def _block_determinants(det_value, blocks, zeros, lower_bound, upper_bound, rng):
+    '\b'
+    limits = [_pattern_hadamard_limit(zeros[start:end, start:end], lower_bound, upper_bound) for start, end in blocks]
+    singular = [index for index, (start, end) in enumerate(blocks)
+                if not _has_perfect_matching(zeros[start:end, start:end])]
+    primes = _prime_factors(abs(det_value))
+    for _ in range(0, _BLOCK_SPLIT_TRIES):
+        if det_value == 0:
+            values = [int(value) for value in rng.choice([-1, 1], len(blocks))]
+            for index in singular or [rng.integers(0, len(blocks))]:
+                values[index] = 0
+        else:
+            values = [1] * len(blocks)
+            for prime in primes:
+                values[rng.integers(0, len(blocks))] *= prime
+            if det_value < 0:
+                values[rng.integers(0, len(blocks))] *= -1
+        if all(lower_bound <= value < upper_bound if end - start == 1 else abs(value) <= limit
+               for value, (start, end), limit in zip(values, blocks, limits)):
+            return values
+    return None
+
+
+# Generates a matrix with a block triangular zero pattern. Its determinant is the
+# product of the determinants of the diagonal blocks, so every diagonal block is
+# generated by matrix_gen with its part of det_value (and its part of the pattern),
+# and the other entries that are not forced to 0 are random. Returns the matrix and 
+# the number of restarts of the blocks.
+def _block_triangular_matrix(zeros, blocks, det_value, lower_bound, upper_bound, rng, options, deadline):
+    '\b'
+    values = _block_determinants(det_value, blocks, zeros, lower_bound, upper_bound, rng)
+    if values is None:
+        raise ValueError('det_value cannot be split over the diagonal blocks of the zero pattern!')
+    matrix = rng.integers(lower_bound, upper_bound, zeros.shape)
+    restarts = 0
+    for (start, end), value in zip(blocks, values):
+        if deadline is not None:
+            options['timeout'] = None if deadline['end'] is None else max(0.0, deadline['end'] - time.monotonic())
+            options['cancel'] = deadline['cancel']
+        stats = {}
+        matrix[start:end, start:end] = matrix_gen(end - start, value, lower_bound, upper_bound, rng=rng, stats=stats,
+                                                  zeros=zeros[start:end, start:end], **options)
+        restarts += stats['restarts']
+    matrix[zeros] = 0
+    return matrix, restarts
+
+
+# matrix_gen outputs a random matrix with requested value of the determinant.
+def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10, rdn_prm = 0, attempts=200, rng=None, first_k=0,
+               sampler='auto', stats=None, method='cofactor', retry='full', timeout=None, cancel=None, zeros=None):
     """Randomize a matrix with the determinant value as parameter.
     
     Parameters
@@ -221,6 +2020,73 @@ def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10,
         Sets the number of attempts to randomized parameters in the function. This is used 
         to restart the function if the calculations are taking too long if the determinant
         value is large (e.g. 7 or larger). If not a positive integer, rdn_prm is set to be 200.
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Source of the randomness. A seed or a Generator gives reproducible output. With None
+        every call uses a new Generator with fresh entropy, so concurrent calls (e.g. from a
+        thread pool) share no random state.
+    first_k : int, optional
+        If positive, the search for the first row stops after first_k solutions and one of 
+        them is chosen. This is faster for wide bounds, but the randomness of the first row
+        decreases, since the solutions are found in a fixed order. Default is 0, i.e. the 
+        first row is chosen uniformly among all solutions. The solutions are never stored,
+        so the memory use does not depend on their number.
+    sampler : str, optional
+        How the first row is chosen among the solutions. 'enumerate' goes through every
+        parameter vector in the box of possible parameters. 'rejection' draws parameter vectors
+        uniformly from the box until a solution is found, so the cost does not grow with the
+        number of solutions; rdn_prm is then rarely needed. While no solution is drawn, the
+        box is split and shrunk to the parts that may contain solutions, and once these are
+        small they are enumerated. 'auto' (default) uses
+        'rejection' for large boxes and 'enumerate' otherwise, where the box is the one left
+        after the random parameters are set. Both choose uniformly among the solutions.
+        'rejection' cannot be combined with first_k; 'auto' enumerates if first_k is set.
+    stats : dict or callable, optional
+        If given, statistics of the generation are collected. A dict is updated with them and
+        a callable is called with a dict of them when the matrix is ready. The keys are
+        'restarts' (the number of times the rows 2-n were randomized again because the
+        first row had no solution), 'restart_reasons' (the restarts counted by reason:
+        'unsolvable', 'hopeless' (rejected by estimate_solutions before the search),
+        'empty_box', 'no_solution' and 'attempts'), 'attempts' (the
+        number of searches in Part 5 over all restarts), 'time' (the seconds spent in
+        'part1' to 'part6' of the algorithm), and for the search that succeeded
+        'sys_of_eq_shape', 'box_volume' (the number of parameter vectors in the box
+        after it is shrunk) and 'solutions' (the number of solutions enumerated, or None
+        if the solution was drawn by rejection) and 'partial' (True if the timeout cut the
+        enumeration short). The timing adds little overhead and nothing is recorded if
+        stats is None.
+    method : str, optional
+        'cofactor' (default) randomizes the rows 2-n and solves for the first row, as
+        described below. 'unimodular' starts from a diagonal matrix with the determinant
+        abs(det_value) and applies random row and column operations row_i += k*row_j that
+        stay inside the bounds, then permutes the rows and columns. Its cost is linear in
+        the number of operations, so it is much faster for large dimensions, but the
+        entries are more concentrated around 0. It needs lower_bound <= 0 < upper_bound - 1
+        and abs(det_value) must be a product of dimension factors below upper_bound.
+        rdn_prm, attempts, first_k and sampler are not used by it.
+    retry : str, optional
+        What is randomized again when the first row has no solution. 'full' (default)
+        randomizes all the rows 2-n. 'row' randomizes only one of them and updates the
+        cofactors of the first row in O(dimension) operations instead of eliminating the
+        rows again, which makes restarts cheap for large dimensions. After a few such
+        retries all the rows are randomized again. Since the other rows are kept after a
+        failure, the distribution of the matrices differs slightly from that of 'full'.
+    timeout : float, optional
+        Time budget in seconds. It is checked between restarts and between the blocks of
+        the search for the first row, so it is exceeded by at most the time of one block.
+        When it is used up, GenerationTimeout (a TimeoutError) is raised, unless the
+        enumeration already found solutions: then the first row is chosen among those,
+        and stats reports 'partial' as True. Default is None, i.e. no limit.
+    cancel : optional
+        Cancellation token with an is_set method, e.g. a threading.Event. It is checked
+        like the timeout, and GenerationCancelled is raised once it is set.
+    zeros : numpy.array, optional
+        Boolean array with shape [dimension,dimension] that is True for the entries that must
+        be 0, e.g. from zero_pattern. The zeros are set in the random rows 2-n, and the
+        first row is solved for its other entries only, uniformly among the solutions.
+        Block triangular patterns are generated block by block, with det_value split into
+        the determinants of the diagonal blocks. Needs lower_bound <= 0 < upper_bound and
+        cannot be combined with method='unimodular'. ValueError is raised if every matrix
+        with the pattern is singular and det_value is not 0.
     
     Returns
     -------
@@ -237,10 +2103,19 @@ def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10,
     When the dimension is 2 or 3 the difference between lower_bound and upper_bound has to be at
     least 3 (except if lower_bound <= -1 and upper_bound >=1). This is to ensure that the problem
     is solvable. Otherwise the difference between lower_bound and upper_bound has to be at least 2.
+    abs(det_value) cannot exceed the Hadamard bound dimension**(dimension/2)*max_entry**dimension,
+    where max_entry = max(abs(lower_bound), abs(upper_bound-1)), and ValueError is raised at once
+    if it does. feasibility estimates how many times the rows 2-n have to be randomized for other
+    values. Rows 2-n for which estimate_solutions shows that there is no first row are
+    randomized again without a search.
     
     If the dimension is set to 7 or higher, it is recommended to set a few random parameters to
     speed up the calculcations. However, the randomness of the entries will decrease. The number
     of attemps is only used if there are randomized parameters set.
+    
+    The bounds may be as wide as numpy.int64 allows. The cofactors and the solutions of the
+    Diophantine equation are exact Python ints when they are large, and the search for the
+    first row is done in numpy.int64 only if a cheap estimate shows that it cannot overflow.
 
     Examples
     --------
@@ -312,9 +2187,15 @@ def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10,
 
     if not type(dimension) is int:
         raise TypeError('Only integers are allowed for dimension')
+    deadline = _new_deadline(timeout, cancel)
+    record = None if stats is None else _new_stats()
     if dimension <= 0: # Take care of the special cases
+        _deliver_stats(stats, record)
         return numpy.array([[]])
+    elif dimension == 1 and zeros is not None and numpy.any(zeros) and det_value != 0:
+        raise ValueError('the zero pattern forces the determinant to be 0!')
     elif dimension == 1 and lower_bound <= det_value and det_value < upper_bound:
+        _deliver_stats(stats, record)
         return numpy.array([[det_value]])
     elif dimension == 1: 
         raise ValueError('det_value is outside the bounds!')
@@ -324,6 +2205,16 @@ def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10,
         rdn_prm = 0
     if not type(attempts) is int or attempts <= 0:
         attempts = 200
+    if not type(first_k) is int or first_k < 0:
+        first_k = 0
+    if sampler not in ('auto', 'enumerate', 'rejection'):
+        raise ValueError('sampler must be one of \'auto\', \'enumerate\' and \'rejection\'')
+    if sampler == 'rejection' and first_k > 0:
+        raise ValueError('first_k cannot be used with sampler=\'rejection\'')
+    if method not in ('cofactor', 'unimodular'):
+        raise ValueError('method must be one of \'cofactor\' and \'unimodular\'')
+    if retry not in ('full', 'row'):
+        raise ValueError('retry must be one of \'full\' and \'row\'')
     if not type(lower_bound) is int:
         raise ValueError('Only integers are allowed for lower_bound')
     if not type(upper_bound) is int:
@@ -334,337 +2225,446 @@ def matrix_gen(dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10,
         raise ValueError('the difference between lower_bound and upper_bound must be at least 2!')
     elif dimension <= 3 and lower_bound >= upper_bound-2 and (lower_bound >= 2 or upper_bound <=-1):
         raise ValueError('the values of lower_bound and upper_bound are too narrowly chosen!')
+    if zeros is not None:
+        if method == 'unimodular':
+            raise ValueError('zeros cannot be used with method=\'unimodular\'')
+        zeros = _check_zeros(zeros, dimension, det_value, lower_bound, upper_bound)
+        hadamard_limit = _pattern_hadamard_limit(zeros, lower_bound, upper_bound)
+    else:
+        hadamard_limit = _hadamard_limit(dimension, lower_bound, upper_bound)
+    if abs(det_value) > hadamard_limit:
+        raise ValueError('det_value is larger than the Hadamard bound of matrices with entries within the bounds!')
+
+    rng = _get_rng(rng)
+    blocks = None if zeros is None else _triangular_blocks(zeros)
+    if blocks is not None:
+        start = time.perf_counter()
+        options = {'rdn_prm': rdn_prm, 'attempts': attempts, 'first_k': first_k, 'sampler': sampler, 'retry': retry}
+        matrix, restarts = _block_triangular_matrix(zeros, blocks, det_value, lower_bound, upper_bound, rng, options,
+                                                    deadline)
+        if record is not None:
+            _record_time(record, 'part1', start)
+            record['restarts'] = restarts
+            _deliver_stats(stats, record)
+        return matrix
+    if method == 'unimodular':
+        start = time.perf_counter()
+        matrix = _unimodular_matrix(dimension, det_value, lower_bound, upper_bound, rng)
+        if record is not None:
+            _record_time(record, 'part1', start)
+            _deliver_stats(stats, record)
+        return matrix
 
     # If rows are swapped in the end, the sign of the determinant changes.
-    rdn_row = numpy.random.randint(0,dimension) 
+    rdn_row = rng.integers(0,dimension)
     if rdn_row != 0:
         det_value = -det_value
-
-
-    # If parameters is randomized below, choose how many attempts before restarting the function.
-    sol_attempts = attempts
-    while attempts <= sol_attempts:
-        sol_attempts = 0
-        sol_exists = False
-        # sol_exists sets to true if the diophantine equation is solvable
-        while sol_exists == False:
-            
-
-            # Part 1 - Generate row 2-n and calculate cofactors of row 1
-            
-            
-
-            cofactors = numpy.zeros(dimension,int) # cofactors of row 1
-            matrix_generation_attempts = 0
-            while matrix_generation_attempts <= 10 and numpy.count_nonzero(cofactors) == 0: 
-                # Make sure not all cofactors are 0.
-                matrix_red = numpy.random.randint(lower_bound, upper_bound, [dimension - 1, dimension]) 
-                # Randomizes rows [2: dimension]
-    
-                for column in range(0, dimension):
-            
-                    # Calculate the cofactors of the first row
-                   
-                    submatrix = numpy.delete(matrix_red, column, axis=1)
-                    cofactors[column] = numpy.round((-1)**column * det_int(submatrix))
-
-                if det_value == 0:
-                    break
-                matrix_generation_attempts += 1
-                
+    if zeros is not None:
+        # The zeros of the rows before the swap. The first row is solved for the
+        # entries that are not forced to 0, which is the same as giving them zero cofactors.
+        order = numpy.arange(0, dimension)
+        order[[0, rdn_row]] = order[[rdn_row, 0]]
+        row_zeros = zeros[rdn_row]
+        red_zeros = zeros[order[1:]]
+
+    solution = None
+    restarts = -1
+    cache = None # Cache of _row_update_cache if only one row is randomized again.
+    row_retries = 0
+    while solution is None: # Restart with new random rows if there is no solution.
+        _check_deadline(deadline)
+        restarts += 1
+        start = time.perf_counter()
+        
+        # Part 1 - Generate row 2-n and calculate cofactors of row 1
+        
+        cofactors = numpy.zeros(dimension,int) # cofactors of row 1
+        if cache is not None:
+            # Randomize only the row of the cache again and update the cofactors.
+            matrix_red[cache[0]] = rng.integers(lower_bound, upper_bound, dimension)
+            if zeros is not None:
+                matrix_red[cache[0], red_zeros[cache[0]]] = 0
+            cofactors = _updated_cofactors(cache, matrix_red[cache[0]])
+            if zeros is not None:
+                cofactors[row_zeros] = 0
+            row_retries += 1
             if numpy.count_nonzero(cofactors) == 0 and det_value != 0:
-                # Check so that there is a solution to the diophantine equation.
-                raise ValueError('You were extremely unlucky! Try again!')
-            
+                cache = None
+        matrix_generation_attempts = 0
+        while cache is None and matrix_generation_attempts <= 10 and numpy.count_nonzero(cofactors) == 0: 
+            # Make sure not all cofactors are 0.
+            matrix_red = rng.integers(lower_bound, upper_bound, [dimension - 1, dimension]) 
+            # Randomizes rows [2: dimension]
+            if zeros is not None:
+                matrix_red[red_zeros] = 0
+
+            cofactors = cofactors_int(matrix_red) # Calculate the cofactors of the first row
+            if zeros is not None:
+                cofactors[row_zeros] = 0
+
+            if det_value == 0:
+                break
+            matrix_generation_attempts += 1
             
-
-            # Part 2 - Generate a system of equations describing the diophantine equation 
-            # generated by cofactor expansion of the unknown row 1
-
-            # We treat the zero cofactors separately and reduce the dimension considered to the
-            # number of non-zero cofactors.
-            zero_cofactor = (cofactors == 0)
-            _dim = numpy.count_nonzero(numpy.invert(zero_cofactor))
-
+        if numpy.count_nonzero(cofactors) == 0 and det_value != 0:
+            # Check so that there is a solution to the diophantine equation.
+            raise ValueError('You were extremely unlucky! Try again!')
+
+        _record_time(record, 'part1', start)
+
+        # Part 2 to Part 6
+        solution = _first_row(cofactors, det_value, lower_bound, upper_bound, rdn_prm, attempts, rng, first_k, sampler,
+                              record, deadline)
+        if solution is not None and zeros is not None:
+            solution[row_zeros] = 0
+
+        if solution is None and retry == 'row':
+            if cache is not None and row_retries >= _RETRY_ROWS:
+                cache = None # Randomize all the rows again.
+            elif cache is None:
+                cache = _row_update_cache(matrix_red, rng.integers(0, dimension - 1))
+                row_retries = 0
+
+    start = time.perf_counter()
+    matrix = numpy.concatenate(([solution], matrix_red))
+    matrix[[0,rdn_row],:] = matrix[[rdn_row,0],:]
+    if record is not None:
+        _record_time(record, 'part6', start)
+        record['restarts'] = restarts
+        record['partial'] = deadline is not None and deadline['partial']
+        _deliver_stats(stats, record)
     
-            
-            nonzero_variables = numpy.count_nonzero(cofactors)
-        
-            cofactors = cofactors[numpy.invert(zero_cofactor)] # Set new cofactors to non-zero cofactors
-            abs_cofactors = numpy.abs(cofactors) # To compare the size of the cofactors
+    return matrix
 
-            if _dim > 1:
-        
-                order = numpy.flip(numpy.argsort(abs_cofactors), axis=0)
+# matrix_gen_batch outputs a stack of random matrices with requested value of
+# the determinant. The random rows and their cofactors are calculated for all
+# matrices at once, and only the matrices that need a restart are redrawn.
+def matrix_gen_batch(count, dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10, rdn_prm = 0, attempts=200, rng=None, first_k=0,
+                     sampler='auto', method='cofactor', timeout=None, cancel=None, zeros=None):
+    """Randomize a stack of matrices with the determinant value as parameter.
     
-        
-                tot_rows = 10
-                sys_of_eq = numpy.zeros([tot_rows, tot_rows+_dim+1], int)
-        
-                row_counter = 0
+    The result is the same as calling matrix_gen count times, but the arguments are checked
+    once and the random rows and the cofactors of the first rows are calculated for the 
+    whole stack at once.
     
-        
-                coeff_enumeration = numpy.arange(_dim) # Keep track of the unknowns and the
-                # defined parameters
-        
-                coeff_geq_2 = numpy.size(cofactors[numpy.abs(cofactors) > 1]) # Calculates which
-                # cofactors that are >= 2.
-                while coeff_geq_2 > 1 or nonzero_variables > 2: # Reduce diophantine equation 
-                    # there is at most one cofactor and the number of cofactors (with the 
-                    # modified diophantine equation) is at most 2.
-                    
-    
-                    if row_counter >= tot_rows - 3:
-                        tot_rows += 10
-                        sys_of_eq_new = numpy.zeros([tot_rows, tot_rows+_dim+1], int)
-                        sys_of_eq_new[0:tot_rows - 10, 0:tot_rows+_dim-9] = sys_of_eq
-                        sys_of_eq = sys_of_eq_new 
-                      
-                    div_rest = divmod_mod(cofactors[order[0]],cofactors[order[1]])
-        
-                    sys_of_eq[row_counter, coeff_enumeration[order[1]]] = 1    
-                    sys_of_eq[row_counter, row_counter + _dim] = -1
-                    sys_of_eq[row_counter, coeff_enumeration[order[0]]] = div_rest[0]
-        
-                    cofactors[order[0]] = div_rest[1]
-                    abs_cofactors = numpy.abs(cofactors)
-                    coeff_enumeration[order[1]] = _dim + row_counter
-
-        
-                    order = numpy.flip(numpy.argsort(abs_cofactors), axis=0)
-                    nonzero_variables = numpy.count_nonzero(cofactors)
-        
-                    coeff_geq_2 = numpy.size(cofactors[numpy.abs(cofactors) > 1])
-                    row_counter += 1
-
-                
-                final_equation = numpy.concatenate((cofactors, numpy.array([-det_value])))
-                final_equation = numpy.array(final_equation/gcd(final_equation),int)
-
-                if numpy.count_nonzero(final_equation) >= 3 or final_equation[-1] % final_equation[order[0]] == 0: # check if solution exists. This can happen if there are 
-                    # either >= 2 cofactors left (since only one cofactors can have absolute 
-                    # value > 1, gcd of the coefficients has to be 1) or if there is 1 
-                    # coefficients which divides the right hand side.
-                    sol_exists = True
-            elif _dim == 1 and det_value % cofactors[0] == 0: # Treats the case when only one 
-                # cofactor is non-zero.
-                solution = numpy.zeros(dimension, int)
-                solution[numpy.invert(zero_cofactor)] = int(det_value / cofactors[0])    
-                solution[zero_cofactor] = numpy.random.randint(lower_bound, upper_bound, dimension - _dim)
-        
-                matrix = numpy.concatenate(([solution], matrix_red))
-                matrix[[0,rdn_row],:] = matrix[[rdn_row,0],:]
-                return matrix
-            elif _dim == 0: # E.g. if one randomized row is zero.
-        
-                solution = numpy.random.randint(lower_bound, upper_bound, dimension - _dim)
-        
-                matrix = numpy.concatenate(([solution], matrix_red))
-                return matrix
-        
+    Parameters
+    ----------
+    count : int
+        Number of matrices.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, rng, first_k, sampler, method : optional
+        As in matrix_gen.
+    timeout, cancel : optional
+        As in matrix_gen, for the whole stack.
+    zeros : numpy.array, optional
+        Zero pattern as in matrix_gen. The matrices are then generated one at a time by
+        matrix_gen.
+    
+    Returns
+    -------
+    out : numpy.ndarray
+        A numpy array with shape [count,dimension,dimension].
+    
+    Examples
+    --------
+    >>> matrix_gen_batch(2, 3)
+    array([[[ 5,  3,  8],
+            [-6, -7, -9],
+            [-2, -4, -3]],
+    <BLANKLINE>
+           [[-2, -9, -4],
+            [ 1,  7,  2],
+            [-4,  1, -4]]])"""
+
+    if not type(count) is int or count < 0:
+        raise ValueError('count must be a non-negative integer')
+    if not type(dimension) is int:
+        raise TypeError('Only integers are allowed for dimension')
+    deadline = _new_deadline(timeout, cancel)
+    if dimension <= 1 or count == 0:
+        return numpy.array([matrix_gen(dimension, det_value, lower_bound, upper_bound, zeros=zeros) for _ in range(count)]).reshape(
+            count, max(dimension, 0), max(dimension, 0))
+    if not type(det_value) is int:
+        raise TypeError('det_value is of invalid datatype!')
+    if not type(rdn_prm) is int or rdn_prm < 0:
+        rdn_prm = 0
+    if not type(attempts) is int or attempts <= 0:
+        attempts = 200
+    if not type(first_k) is int or first_k < 0:
+        first_k = 0
+    if sampler not in ('auto', 'enumerate', 'rejection'):
+        raise ValueError('sampler must be one of \'auto\', \'enumerate\' and \'rejection\'')
+    if sampler == 'rejection' and first_k > 0:
+        raise ValueError('first_k cannot be used with sampler=\'rejection\'')
+    if method not in ('cofactor', 'unimodular'):
+        raise ValueError('method must be one of \'cofactor\' and \'unimodular\'')
+    if not type(lower_bound) is int:
+        raise ValueError('Only integers are allowed for lower_bound')
+    if not type(upper_bound) is int:
+        raise ValueError('Only integers are allowed for upper_bound')
+    if lower_bound >= upper_bound - 1:
+        raise ValueError('the difference between lower_bound and upper_bound must be at least 2!')
+    elif dimension <= 3 and lower_bound >= upper_bound-2 and (lower_bound >= 2 or upper_bound <=-1):
+        raise ValueError('the values of lower_bound and upper_bound are too narrowly chosen!')
+    if abs(det_value) > _hadamard_limit(dimension, lower_bound, upper_bound):
+        raise ValueError('det_value is larger than the Hadamard bound of matrices with entries within the bounds!')
+
+    rng = _get_rng(rng)
+    if zeros is not None:
+        options = {'rdn_prm': rdn_prm, 'attempts': attempts, 'first_k': first_k, 'sampler': sampler, 'method': method}
+        matrices = numpy.zeros([count, dimension, dimension], int)
+        for index in range(count):
+            if deadline is not None:
+                options['timeout'] = None if deadline['end'] is None else max(0.0, deadline['end'] - time.monotonic())
+                options['cancel'] = deadline['cancel']
+            matrices[index] = matrix_gen(dimension, det_value, lower_bound, upper_bound, rng=rng, zeros=zeros, **options)
+        return matrices
+    if method == 'unimodular':
+        return numpy.array([_unimodular_matrix(dimension, det_value, lower_bound, upper_bound, rng) for _ in range(count)])
+    # If rows are swapped in the end, the sign of the determinant changes.
+    rdn_rows = rng.integers(0, dimension, count)
+    det_values = numpy.where(rdn_rows != 0, -det_value, det_value)
 
-        while row_counter < _dim - 1: # Makes sure every unknown variable is written as function 
-            # of a parameter, in case the system of equation contains too few rows.
-            sys_of_eq[row_counter, row_counter] = 1
-            sys_of_eq[row_counter, row_counter + _dim] = -1
-            row_counter += 1
+    matrices = numpy.zeros([count, dimension, dimension], int)
+    generation_attempts = numpy.zeros(count, int)
+    pending = numpy.arange(0, count)
+    while numpy.size(pending) > 0:
+        _check_deadline(deadline)
 
-        # Adding final equation the system of equations
-        row_counter += 1
-        
-        sys_of_eq[row_counter - 1, row_counter + _dim - 1] = final_equation[-1]
-        sys_of_eq[row_counter - 1, coeff_enumeration] = final_equation[:-1]
+        # Part 1 - Generate row 2-n and calculate cofactors of row 1 for all pending matrices
         
+        matrices[pending, 1:, :] = rng.integers(lower_bound, upper_bound, [numpy.size(pending), dimension - 1, dimension])
+        cofactors = _cofactors_batch(matrices[pending, 1:, :])
+
+        failed = []
+        for index, matrix_index in enumerate(pending):
+            if numpy.count_nonzero(cofactors[index]) == 0 and det_value != 0:
+                generation_attempts[matrix_index] += 1
+                if generation_attempts[matrix_index] > 10:
+                    raise ValueError('You were extremely unlucky! Try again!')
+                failed.append(matrix_index)
+                continue
+            generation_attempts[matrix_index] = 0
+
+            # Part 2 to Part 6
+            solution = _first_row(_int_array(cofactors[index].tolist()), int(det_values[matrix_index]), 
+                                  lower_bound, upper_bound, rdn_prm, attempts, rng, first_k, sampler, None, deadline)
+            if solution is None:
+                failed.append(matrix_index)
+            else:
+                matrices[matrix_index, 0, :] = solution
+        pending = numpy.array(failed, int)
 
+    swapped = numpy.arange(0, count)
+    matrices[swapped, 0], matrices[swapped, rdn_rows] = matrices[swapped, rdn_rows], matrices[swapped, 0].copy()
+    return matrices
 
-        # Part 3 - Solve for the unknown variables as functions of appropriate parameters. 
-        # This is done by Gauss elimination. If the number of unknown variables is n, 
-        # then the number of parameters should be n-1. Observe that row_counter may increase.
-        column = 0
-        while column < row_counter: # Go through all columns for all unknown variables.
-            row = column
-    
-        
-            while row < row_counter:
-                # Set a 1 in the position [row,row] if possible and use this to eliminate
-                # the other entries in the row.
-                if sys_of_eq[row, column] == 1: 
-                    sys_of_eq[[column, row], :] = sys_of_eq[[row, column], :]
-                    break
-                elif sys_of_eq[row, column] == -1:
-                    sys_of_eq[row, :] = -sys_of_eq[row, :]
-                    sys_of_eq[[column, row], :] = sys_of_eq[[row, column], :]
-                    break
-                elif row == row_counter - 1: # In case there is no 1 or -1 in use in the column, 
-                    # add a row and a parameter in the system of equations.
-                    if row_counter >= tot_rows - 4:
-                        tot_rows += 10
-                        sys_of_eq_new = numpy.zeros([tot_rows, tot_rows+_dim+1], int)
-                        sys_of_eq_new[0:tot_rows - 10, 0:tot_rows+_dim - 9] = sys_of_eq
-                        sys_of_eq = sys_of_eq_new
-        
-                    sys_of_eq[:, [row_counter + _dim - 1, row_counter + _dim ]] = sys_of_eq[:,[row_counter + _dim , row_counter + _dim - 1]]
-
-                    sys_of_eq[[column, row_counter],:] = sys_of_eq[[row_counter, column],:]
-                    sys_of_eq[column, column] = 1
-                    sys_of_eq[column, _dim + row_counter - 1] = -1
-        
-                    row_counter += 1
-                    break
-                row += 1
-        
-            for row in numpy.delete(numpy.arange(0, row_counter), column): # Use the 1 in 
-                # [row,row] to eliminate the other entries in the column.
-                sys_of_eq[row, :] = sys_of_eq[row, :] - sys_of_eq[row, column] * sys_of_eq[column, :]
 
-            column += 1
-       
+# Number of matrices exercise_gen tries in a row for one exercise before it gives
+# up, if no solution vector keeps the right-hand side within its bounds.
+_EXERCISE_MAX_MATRICES = 100
 
-        tot_rows = row_counter 
-        sys_of_eq = sys_of_eq[0:_dim,row_counter:row_counter + _dim] # Remove unneccesary rows and
-        # column with 0 now that the system of equations will not be expanded any further.
-
-        # Part 4 - Try to make the unknown variables dependent on one parameter
-        # only (if possible).
-        # This is done by column elimination in the parameter columns.
-        # Observe that no multiplication of a an interger with a column is allowed,
-        # since the system of equations might loose interger solutions.
-      
-        row_order = numpy.argsort(numpy.count_nonzero(sys_of_eq[:, _dim: _dim-1], axis=1))
-
-        for counter in numpy.arange(0, _dim-1): 
-            row = row_order[counter] # Goes through rows in the correct order.
-            non_zero_entries = (sys_of_eq[row,counter: _dim-1 ] != 0)
-        
-            non_zero_entries_count = numpy.count_nonzero(non_zero_entries)
-        
-            while non_zero_entries_count > 1:
-                column_order = numpy.argsort(numpy.abs(sys_of_eq[row,counter: _dim-1 ]))+counter
-                column_order = column_order[non_zero_entries[column_order-counter]]
 
-        
-                div_rest = divmod_mod(sys_of_eq[row,column_order[non_zero_entries_count - 1]],sys_of_eq[row,column_order[non_zero_entries_count - 2]])
-        
-                sys_of_eq[:,column_order[non_zero_entries_count - 1]] = sys_of_eq[:,column_order[non_zero_entries_count - 1]] - div_rest[0] * sys_of_eq[:,column_order[non_zero_entries_count - 2]]
-                 
-                non_zero_entries = (sys_of_eq[row,counter: _dim-1 ] != 0)
-                non_zero_entries_count = numpy.count_nonzero(non_zero_entries)
-        
-            sys_of_eq[:,[counter,int(numpy.nonzero(non_zero_entries)[0])+counter]] = sys_of_eq[:,[int(numpy.nonzero(non_zero_entries)[0])+counter,counter]]
+# exercise_gen outputs systems of equations A @ x = b with integer solutions. The
+# solution x is drawn by the Part 5 samplers of matrix_gen: the parameters are x,
+# with the box given by the bounds of x, and the control rows are the rows of
+# A @ x, which must be within the bounds of b. The unknowns -sys_of_eq @ [x,1]
+# are [A @ x, x], so the sampler returns both. Matrices without any such x are
+# replaced by new ones.
+def exercise_gen(count, dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10, x_lower_bound = -5, x_upper_bound = 6,
+                 b_lower_bound = -20, b_upper_bound = 21, rdn_prm = 0, attempts=200, rng=None, first_k=0, sampler='auto', method='cofactor'):
+    """Randomize systems of linear equations A @ x = b with integer solutions.
+    
+    The matrices A are generated by matrix_gen_batch. For every matrix, x is drawn uniformly
+    among the integer vectors with entries in [x_lower_bound, x_upper_bound) for which every
+    entry of b = A @ x is in [b_lower_bound, b_upper_bound). The bounds of b are part of the
+    search, so no exercise is generated and thrown away afterwards. Since x is an integer 
+    vector, the solution has no fractions for any det_value.
+    
+    Parameters
+    ----------
+    count : int
+        Number of exercises.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, rng, first_k, sampler, method : optional
+        As in matrix_gen. They concern the matrices A.
+    x_lower_bound, x_upper_bound : int, optional
+        The entries of x are in [x_lower_bound, x_upper_bound). Default is [-5,6).
+    b_lower_bound, b_upper_bound : int, optional
+        The entries of b are in [b_lower_bound, b_upper_bound). Default is [-20,21).
+    
+    Returns
+    -------
+    matrices : numpy.ndarray
+        Array with shape [count,dimension,dimension] of the matrices A.
+    solutions : numpy.ndarray
+        Array with shape [count,dimension] of the solutions x.
+    rhs : numpy.ndarray
+        Array with shape [count,dimension] of the right-hand sides b.
+    
+    Raises
+    ------
+    ValueError
+        If the bounds of b cannot be met by _EXERCISE_MAX_MATRICES matrices in a row.
+    
+    Examples
+    --------
+    >>> matrices, solutions, rhs = exercise_gen(10, 3, rng=1)
+    >>> (numpy.einsum('aij,aj->ai', matrices, solutions) == rhs).all()
+    True
+    
+    The exercises and the answer key in LaTeX:
+    
+    >>> exercises = numpy2latex_batch(matrices, 'augmented', rhs)
+    >>> answers = numpy2latex_batch(solutions[:, :, None], 'pmatrix')"""
+    
+    if not type(count) is int or count < 0:
+        raise ValueError('count must be a non-negative integer')
+    if not type(dimension) is int:
+        raise TypeError('Only integers are allowed for dimension')
+    for bound in (x_lower_bound, x_upper_bound, b_lower_bound, b_upper_bound):
+        if not type(bound) is int:
+            raise ValueError('Only integers are allowed for the bounds of x and b')
+    if x_lower_bound >= x_upper_bound or b_lower_bound >= b_upper_bound:
+        raise ValueError('The bounds of x and b must contain at least one integer')
+    rng = _get_rng(rng)
+    size = max(dimension, 0)
+    parameters_bounds = numpy.array([[x_lower_bound, x_upper_bound - 1]] * size, int).reshape(size, 2)
+    control_rows = numpy.arange(0, size)
+
+    matrices = numpy.zeros([count, size, size], int)
+    unknowns = numpy.zeros([count, 2 * size], int)
+    failures = numpy.zeros(count, int)
+    pending = numpy.arange(0, count)
+    while numpy.size(pending) > 0:
+        matrices[pending] = matrix_gen_batch(numpy.size(pending), dimension, det_value, lower_bound, upper_bound, rdn_prm, 
+                                             attempts, rng, first_k, sampler, method)
+        failed = []
+        for index in pending:
+            sys_of_eq = -numpy.concatenate((numpy.concatenate((matrices[index], numpy.eye(size, dtype=int))), 
+                                            numpy.zeros([2 * size, 1], int)), axis=1)
+            sys_of_eq = _checked_sys_of_eq(sys_of_eq, parameters_bounds, b_lower_bound, b_upper_bound)
+            if sampler == 'enumerate' or first_k > 0:
+                solution = _pick_solution(sys_of_eq, parameters_bounds[None, :, :], control_rows, b_lower_bound, b_upper_bound,
+                                          rng, first_k)[0]
+            else:
+                solution = _sample_solution(sys_of_eq, parameters_bounds, control_rows, b_lower_bound, b_upper_bound, rng)
+            if solution is None:
+                failures[index] += 1
+                if failures[index] >= _EXERCISE_MAX_MATRICES:
+                    raise ValueError('No solution keeps b within its bounds! Widen the bounds of x or b.')
+                failed.append(index)
+            else:
+                unknowns[index] = solution
+        pending = numpy.array(failed, int)
+    return matrices, unknowns[:, size:], unknowns[:, :size]
 
-            
-            if 0 < counter and counter < _dim-1:
-                for column in numpy.arange(0,counter):
 
-                    div_rest = divmod_mod(sys_of_eq[row, column],sys_of_eq[row, counter])
-                    sys_of_eq[:,column] = sys_of_eq[:,column] - div_rest[0] * sys_of_eq[:,counter]
+# Generate one matrix in a worker process with a Generator built from the
+# SeedSequence spawned for this matrix, so the result does not depend on which
+# worker runs the task.
+def _parallel_task(task):
+    '\b'
+    seed_sequence, parameters = task
+    *parameters, first_k, sampler, method = parameters
+    return matrix_gen(*parameters, rng=numpy.random.default_rng(seed_sequence), first_k=first_k, sampler=sampler, method=method)
 
-        
-        # Part 5 - Determine bounds for the parameters
-        
-        parameters_bounds = numpy.zeros([_dim-1,2],int)
-        control_rows=numpy.array([_dim-1]) # Keeps track of the unknown variables
-        # that are dependent 
-        # of more than one parameter
-        for parameter_counter in range(0,_dim-1):
-            previous_parameter_sum = numpy.zeros(2,int)
-            if numpy.count_nonzero(sys_of_eq[row_order[parameter_counter],:parameter_counter]) != 0:
-                control_rows = numpy.append(control_rows,row_order[parameter_counter])
-                for previous_parameter in range(0,parameter_counter): # Calculates neccesary 
-                    # bounds for the parameters
-                    
-                    if sys_of_eq[row_order[parameter_counter],previous_parameter] < 0:
-                        previous_parameter_sum[0] += sys_of_eq[row_order[parameter_counter],previous_parameter]*parameters_bounds[previous_parameter,0]
-                        previous_parameter_sum[1] += sys_of_eq[row_order[parameter_counter],previous_parameter]*parameters_bounds[previous_parameter,1]
-                    elif sys_of_eq[row_order[parameter_counter],previous_parameter] > 0:
-                        previous_parameter_sum[0] += sys_of_eq[row_order[parameter_counter],previous_parameter]*parameters_bounds[previous_parameter,1]
-                        previous_parameter_sum[1] += sys_of_eq[row_order[parameter_counter],previous_parameter]*parameters_bounds[previous_parameter,0]
-                
-            if sys_of_eq[row_order[parameter_counter],parameter_counter] > 0:
-                parameters_bounds[parameter_counter,0] = numpy.ceil((-upper_bound+1 - sys_of_eq[row_order[parameter_counter],-1]-previous_parameter_sum[0])/sys_of_eq[row_order[parameter_counter],parameter_counter])
-                parameters_bounds[parameter_counter,1] = numpy.floor((-lower_bound - sys_of_eq[row_order[parameter_counter],-1]-previous_parameter_sum[1])/sys_of_eq[row_order[parameter_counter],parameter_counter]) 
-            elif sys_of_eq[row_order[parameter_counter],parameter_counter] < 0:
-                parameters_bounds[parameter_counter,0] = numpy.ceil((-lower_bound - sys_of_eq[row_order[parameter_counter],-1]-previous_parameter_sum[1])/sys_of_eq[row_order[parameter_counter],parameter_counter])
-                parameters_bounds[parameter_counter,1] = numpy.floor((-upper_bound+1 - sys_of_eq[row_order[parameter_counter],-1]-previous_parameter_sum[0])/sys_of_eq[row_order[parameter_counter],parameter_counter]) 
-        control_rows = numpy.sort(control_rows)
-        
-        
-        solutions_size = 100
-        solutions = numpy.zeros([solutions_size, _dim], int)
-        sol_counter = 0
-        
-        while sol_counter == 0:
-
-            # Try random parameters
-            b = numpy.append(parameters_bounds[:,0], [1])
-            rdn_prm = min(rdn_prm,_dim - numpy.size(control_rows))
-            if rdn_prm == 0:
-                randomised_parameters = numpy.array([])
-                non_randomised_parameters = numpy.arange(0,_dim-1)
-            else:
-                randomised_parameters = numpy.random.choice(numpy.delete(numpy.arange(0,_dim-1),control_rows[0:-1]),rdn_prm,replace=False) # Chooses variables from the set of 
-                # unknowns depending on several parameters.
-                for randomised_parameter_counter in randomised_parameters:
-                    b[randomised_parameter_counter] = numpy.random.randint(parameters_bounds[randomised_parameter_counter,0],parameters_bounds[randomised_parameter_counter,1]+1)
-                    non_randomised_parameters = numpy.delete(numpy.arange(0,_dim-1),randomised_parameter_counter)
 
-            
+# matrix_gen_parallel spreads the generation of a stack of matrices over a
+# process pool.
+def matrix_gen_parallel(count, dimension = 2, det_value = 1, lower_bound = -9, upper_bound = 10, rdn_prm = 0, attempts=200, first_k=0, sampler='auto',
+                        seed = None, workers = None, chunksize = 1, executor = None, method = 'cofactor'):
+    """Randomize a stack of matrices with the determinant value as parameter, using several processes.
     
-            sol_attempts += 1
-
-            if sol_attempts >= attempts: # Restart function and generate new random rows if too
-                # many attemps are done.
-                # print('Maximum number of attempts reached, restarting function...')
-                break
-            
-            while b[non_randomised_parameters[0]] <= parameters_bounds[non_randomised_parameters[0],1]:
-                sol_test = True
-                for row in control_rows:
-                    
-                    a = -sys_of_eq[row, :] @ b
-
-                    if upper_bound-1 < a or a < lower_bound: # Test if the calculated solution 
-                        # is within bounds.
-                        sol_test = False
-        
-                if sol_test:
-                    solutions[sol_counter, :] = -sys_of_eq @ b
-                    sol_counter += 1
-
-                    
-                    if sol_counter == solutions_size:
-                        solutions_size += 100
-                        solutions = numpy.append(solutions,numpy.zeros([100, _dim], int),axis=0)
-        
-                counter = numpy.size(non_randomised_parameters) - 1
-                while b[non_randomised_parameters[counter]] >= parameters_bounds[non_randomised_parameters[counter],1] and counter != 0:
-                    b[non_randomised_parameters[counter]] = parameters_bounds[non_randomised_parameters[counter],0]
-                    counter -= 1
-        
-                b[non_randomised_parameters[counter]] += 1
-            
-      
-        # Part 6 - Choose one solution and concatenate it with the rest of the randomized
-        # matrix rows.
-        
-        solutions = solutions[0:sol_counter, :]
-        
-        if sol_counter != 0:
-            sol_gen = numpy.random.randint(0, sol_counter)
-            sol_exists = True
-            solution = numpy.zeros([1,dimension],int)
-            solution[0,zero_cofactor] = numpy.random.randint(lower_bound, upper_bound, dimension - _dim)
-            solution[0,numpy.invert(zero_cofactor)] = solutions[sol_gen:sol_gen + 1, :] 
-
-            matrix = numpy.concatenate((solution, matrix_red))
-        
+    Every matrix gets its own numpy.random.Generator, spawned from numpy.random.SeedSequence(seed), so the 
+    output is reproducible from seed regardless of the number of workers. The matrices are
+    returned in order.
     
-    matrix[[0,rdn_row],:] = matrix[[rdn_row,0],:]
+    Parameters
+    ----------
+    count : int
+        Number of matrices.
+    dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, first_k, sampler : optional
+        As in matrix_gen.
+    seed : int or numpy.random.SeedSequence, optional
+        Seed of the whole run. If None, fresh entropy is used.
+    workers : int, optional
+        Number of worker processes. If 1, the matrices are generated in this process. 
+        If None, the number of processors is used.
+    chunksize : int, optional
+        Number of matrices sent to a worker at a time. Larger chunks reduce the 
+        communication overhead when the matrices are cheap to generate.
+    executor : concurrent.futures.Executor, optional
+        Executor to use instead of a new process pool, e.g. to reuse a pool between calls.
+    method : str, optional
+        As in matrix_gen.
     
-    return matrix
+    Returns
+    -------
+    out : numpy.ndarray
+        A numpy array with shape [count,dimension,dimension].
+    
+    Examples
+    --------
+    >>> (matrix_gen_parallel(8, 4, seed=1) == matrix_gen_parallel(8, 4, seed=1, workers=1)).all()
+    True"""
+    
+    if not type(count) is int or count < 0:
+        raise ValueError('count must be a non-negative integer')
+    if not type(chunksize) is int or chunksize <= 0:
+        raise ValueError('chunksize must be a positive integer')
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    parameters = (dimension, det_value, lower_bound, upper_bound, rdn_prm, attempts, first_k, sampler, method)
+    tasks = [(seed_sequence, parameters) for seed_sequence in seed.spawn(count)]
+    
+    if executor is not None:
+        matrices = list(executor.map(_parallel_task, tasks, chunksize=chunksize))
+    elif workers == 1:
+        matrices = [_parallel_task(task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            matrices = list(executor.map(_parallel_task, tasks, chunksize=chunksize))
+    size = max(dimension, 0) if type(dimension) is int else 0
+    return numpy.array(matrices, int).reshape(count, size, size)
+
+
+# _generate_batches generates the matrices of the command line in batches of
+# batch_size, with the seeds of matrix_gen_parallel, so the output for a given
+# seed does not depend on jobs or batch_size. With count None it never stops.
+def _generate_batches(count, parameters, seed, jobs, batch_size):
+    '\b'
+    seed = numpy.random.SeedSequence(seed)
+    executor = None
+    if jobs != 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs or None)
+    try:
+        generated = 0
+        while count is None or generated < count:
+            size = batch_size if count is None else min(batch_size, count - generated)
+            yield matrix_gen_parallel(size, *parameters, seed=seed, workers=1, executor=executor,
+                                      chunksize=max(1, size // 64))
+            generated += size
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+# _write_matrices writes a stack of matrices to a binary stream: LaTeX with an
+# empty line between the matrices, one JSON array per line, or the entries as
+# little-endian 64 bit integers in C order. first tells if no matrix has been
+# written before.
+def _write_matrices(stream, matrices, output_format, first=True):
+    '\b'
+    if output_format == 'raw':
+        stream.write(matrices.astype('<i8').tobytes())
+    elif output_format == 'json':
+        stream.write(''.join(json.dumps(matrix) + '\n' for matrix in matrices.tolist()).encode())
+    elif len(matrices) > 0:
+        stream.write((('' if first else '\n') + numpy2latex_batch(matrices, None) + '\n').encode())
+
 
 if __name__ == '__main__':
     import argparse
+    import os
     import sys
     
     _epilog='''examples:
@@ -709,7 +2709,12 @@ if __name__ == '__main__':
                           2 & 1 & -3 & 0 & 5 & 1 & -1 \\\\
                           -3 & 11 & -1 & -1 & -3 & 8 & 5 \\\\
                           9 & 4 & 6 & -2 & 9 & 6 & -3 \\\\
-                          -1 & 7 & 13 & 5 & 6 & -3 & 12'''
+                          -1 & 7 & 13 & 5 & 6 & -3 & 12
+  matrix_rdn_det.py 4 2 --count 1000 --format json --jobs 0 --seed 7
+                        Outputs 1000 matrices of dimension 4 with determinant 2, one JSON array per line, generated
+                        by all processors. The output is the same for every number of jobs.
+  matrix_rdn_det.py 3 --stream --format raw | head -c 7200
+                        Writes matrices of dimension 3 as 64 bit integers until the reader stops.'''
     parser = argparse.ArgumentParser(description='''                        Randomize a matrix with the determinant value as a parameter. The output is LaTeX compatible.
     
                         This can be used for e.g. teachers in linear algebra who want to create system of equations 
@@ -758,7 +2763,18 @@ if __name__ == '__main__':
             large (e.g. 7 or larger). Default value is 200.
     ''')
 
+    parser.add_argument('--count', type=int, default=1, help='number of matrices. Default is 1.')
+    parser.add_argument('--stream', action='store_true', help='write matrices until the output is closed')
+    parser.add_argument('--format', choices=['latex', 'json', 'raw'], default='latex', 
+                        help='latex (default) separates the matrices by an empty line, json writes one\n'
+                             'array per line and raw the entries as little-endian 64 bit integers')
+    parser.add_argument('--jobs', type=int, default=1, help='number of worker processes, 0 for one per processor. Default is 1.')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the output')
+    parser.add_argument('--batch', type=int, default=256, help='number of matrices generated and written at a time')
+
     args=parser.parse_args()
+    if args.count < 0 or args.jobs < 0 or args.batch <= 0:
+        parser.error('--count and --jobs must be non-negative and --batch positive')
 
     arguments = numpy.array([2,1,-9,10,0,200])
     
@@ -766,6 +2782,17 @@ if __name__ == '__main__':
     arguments[0:len(args.parameters)] = args.parameters 
 
 
-    a = matrix_gen(int(arguments[0]),int(arguments[1]),int(arguments[2]),int(arguments[3]),int(arguments[4]),int(arguments[5]))
-    sys.stdout.write(numpy2latex(a,_print=False)+'\n')
+    parameters = [int(argument) for argument in arguments]
+    output = sys.stdout.buffer
+    try:
+        for index, matrices in enumerate(_generate_batches(None if args.stream else args.count, parameters, args.seed,
+                                                           args.jobs, args.batch)):
+            _write_matrices(output, matrices, args.format, index == 0)
+            output.flush()
+    except BrokenPipeError:
+        # The reader stopped, e.g. head. Redirect stdout so that the exit does not fail
+        # when it is flushed.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except KeyboardInterrupt:
+        sys.exit(130)
 
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+' '
+# A pool of ready-made matrices for repeated requests with the same parameters.
+# https://github.com/andis854/matrix_rdn_det
+#
+# Every parameter set (dimension, det_value, lower_bound, upper_bound) has a queue
+# of matrices from matrix_gen. A background thread refills the queues of the most
+# recently used parameter sets, and the least recently used ones are dropped when
+# the matrices would take more memory than the budget.
+
+import collections
+import threading
+
+import numpy
+
+from matrix_rdn_det.matrix_rdn_det import matrix_gen
+
+
+class MatrixPool:
+    """Keep ready-made matrices from matrix_gen for repeated parameter sets.
+
+    Parameters
+    ----------
+    size : int, optional
+        Number of matrices kept ready per parameter set.
+    memory_budget : int, optional
+        Upper bound in bytes of the memory used by the kept matrices. When it is reached
+        the least recently used parameter sets are dropped.
+    rdn_prm, attempts, first_k, sampler : optional
+        Passed on to matrix_gen.
+    seed : None, int or numpy.random.SeedSequence, optional
+        Every matrix is generated with its own seed spawned from seed. The order in which
+        the matrices are handed out depends on the timing of the background thread.
+    background : bool, optional
+        If true (default), the queues are refilled by a background thread. Otherwise they
+        are only filled by warm and refill, and get generates a matrix in the calling
+        thread when the queue is empty.
+
+    Notes
+    -----
+    A parameter set is known to the pool once it is passed to get or warm. The pool can
+    be used from several threads, and as a context manager that closes it on exit.
+
+    Examples
+    --------
+    >>> with MatrixPool(size=4) as pool:
+    ...     pool.warm(3, 2, wait=True)
+    ...     matrix = pool.get(3, 2)"""
+
+    def __init__(self, size=8, memory_budget=2**24, rdn_prm=0, attempts=200, first_k=0, sampler='auto', seed=None,
+                 background=True):
+        if not type(size) is int or size <= 0:
+            raise ValueError('size must be a positive integer')
+        if not type(memory_budget) is int or memory_budget <= 0:
+            raise ValueError('memory_budget must be a positive integer')
+        self.size = size
+        self.memory_budget = memory_budget
+        self.background = background
+        self._options = {'rdn_prm': rdn_prm, 'attempts': attempts, 'first_k': first_k, 'sampler': sampler}
+        self._seed = seed if isinstance(seed, numpy.random.SeedSequence) else numpy.random.SeedSequence(seed)
+        # The parameter sets from the least to the most recently used.
+        self._queues = collections.OrderedDict()
+        self._memory = 0
+        self._counts = {'hits': 0, 'misses': 0, 'evictions': 0, 'generated': 0}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __len__(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def get(self, dimension=2, det_value=1, lower_bound=-9, upper_bound=10):
+        """Return a matrix from matrix_gen with the given parameters.
+
+        A ready matrix is taken from the queue of the parameter set if there is one.
+        Otherwise the matrix is generated in the calling thread. In both cases the queue
+        is refilled afterwards. Errors of matrix_gen are raised here and the parameter
+        set is then not kept."""
+        key = (dimension, det_value, lower_bound, upper_bound)
+        with self._condition:
+            self._check_open()
+            queue = self._queues.get(key)
+            if queue:
+                matrix = queue.popleft()
+                self._memory -= matrix.nbytes
+                self._counts['hits'] += 1
+                self._touch(key)
+                return matrix
+            self._counts['misses'] += 1
+            seed = self._seed.spawn(1)[0]
+        matrix = matrix_gen(*key, rng=seed, **self._options)
+        with self._condition:
+            self._counts['generated'] += 1
+            if not self._closed:
+                self._touch(key)
+        return matrix
+
+    def warm(self, dimension=2, det_value=1, lower_bound=-9, upper_bound=10, wait=False):
+        """Make the pool keep matrices with the given parameters.
+
+        Without a background thread the queue is filled in the calling thread. With one,
+        the queue is filled in the background and wait=True blocks until it is full (or
+        the parameter set is dropped again)."""
+        if not type(dimension) is int:
+            raise TypeError('Only integers are allowed for dimension')
+        key = (dimension, det_value, lower_bound, upper_bound)
+        with self._condition:
+            self._check_open()
+            self._touch(key)
+            if self.background:
+                while wait and not self._closed and key in self._queues and len(self._queues[key]) < self.size:
+                    self._condition.wait()
+                return
+        while self._refill_one(key):
+            pass
+
+    def refill(self):
+        """Fill every queue in the calling thread, from the most recently used parameter set."""
+        while True:
+            with self._condition:
+                key = self._next_key()
+            if key is None or not self._refill_one(key):
+                return
+
+    def clear(self):
+        """Drop all matrices and parameter sets."""
+        with self._condition:
+            self._queues.clear()
+            self._memory = 0
+            self._condition.notify_all()
+
+    def close(self):
+        """Stop the background thread and drop all matrices."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.clear()
+
+    @property
+    def stats(self):
+        """Counts of hits, misses, evictions and generated matrices, the memory used in bytes
+        and the number of ready matrices per parameter set."""
+        with self._condition:
+            stats = dict(self._counts)
+            stats['memory'] = self._memory
+            stats['ready'] = {key: len(queue) for key, queue in self._queues.items()}
+            return stats
+
+    # Raises if the pool is closed. Called with the lock held.
+    def _check_open(self):
+        '\b'
+        if self._closed:
+            raise RuntimeError('The pool is closed')
+
+    # Marks a parameter set as the most recently used and wakes the background thread.
+    # Called with the lock held.
+    def _touch(self, key):
+        '\b'
+        if key not in self._queues:
+            self._queues[key] = collections.deque()
+        self._queues.move_to_end(key)
+        if self.background and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='MatrixPool', daemon=True)
+            self._thread.start()
+        self._condition.notify_all()
+
+    # Drops the parameter sets used less recently than key until a matrix of nbytes
+    # fits in the budget. Returns False, without dropping anything, if it cannot fit.
+    # Called with the lock held.
+    def _make_room(self, key, nbytes):
+        '\b'
+        colder = []
+        free = self.memory_budget - self._memory
+        for other, queue in self._queues.items():
+            if free >= nbytes or other == key:
+                break
+            colder.append(other)
+            free += sum(matrix.nbytes for matrix in queue)
+        if free < nbytes:
+            return False
+        for other in colder:
+            self._memory -= sum(matrix.nbytes for matrix in self._queues.pop(other))
+            self._counts['evictions'] += 1
+        return True
+
+    # The most recently used parameter set with a queue that is not full and room for
+    # one more matrix, or None. Called with the lock held.
+    def _next_key(self):
+        '\b'
+        for key in reversed(self._queues):
+            if len(self._queues[key]) < self.size and self._make_room(key, key[0]**2 * numpy.dtype(int).itemsize):
+                return key
+        return None
+
+    # Adds one matrix to the queue of key. Returns False if the queue is full, the
+    # parameter set was dropped or the pool is closed.
+    def _refill_one(self, key):
+        '\b'
+        with self._condition:
+            queue = self._queues.get(key)
+            if self._closed or queue is None or len(queue) >= self.size:
+                return False
+            seed = self._seed.spawn(1)[0]
+        try:
+            matrix = matrix_gen(*key, rng=seed, **self._options)
+        except (TypeError, ValueError):
+            # Parameters that matrix_gen rejects are not kept.
+            with self._condition:
+                self._queues.pop(key, None)
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._counts['generated'] += 1
+            queue = self._queues.get(key)
+            if self._closed or queue is None or len(queue) >= self.size or not self._make_room(key, matrix.nbytes):
+                return False
+            queue.append(matrix)
+            self._memory += matrix.nbytes
+            self._condition.notify_all()
+            return True
+
+    # The loop of the background thread.
+    def _run(self):
+        '\b'
+        while True:
+            with self._condition:
+                key = self._next_key()
+                while key is None and not self._closed:
+                    self._condition.wait()
+                    key = self._next_key()
+                if self._closed:
+                    return
+            try:
+                self._refill_one(key)
+            except (TypeError, ValueError):
+                pass
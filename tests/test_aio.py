@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int
+from matrix_rdn_det.aio import AsyncMatrixGenerator
+
+
+def test_matrix_gen_and_batch():
+    async def main():
+        async with AsyncMatrixGenerator(workers=2) as generator:
+            matrix = await generator.matrix_gen(4, 3, rng=1)
+            matrices = await generator.matrix_gen_batch(5, 3, -2, rng=2)
+            return matrix, matrices, generator.stats
+
+    matrix, matrices, stats = asyncio.run(main())
+    assert det_int(matrix) == 3
+    assert matrices.shape == (5, 3, 3) and all(det_int(matrix) == -2 for matrix in matrices)
+    assert stats['submitted'] == 2 and stats['completed'] == 2 and stats['running'] == 0
+
+
+def test_concurrent_requests_are_coalesced():
+    async def main():
+        async with AsyncMatrixGenerator(workers=2) as generator:
+            results = await asyncio.gather(*[generator.matrix_gen(5, 7) for _ in range(4)],
+                                           generator.matrix_gen(dimension=5, det_value=7), generator.matrix_gen(5, 8))
+            return results, generator.stats
+
+    results, stats = asyncio.run(main())
+    assert stats['submitted'] == 2 and stats['coalesced'] == 4
+    assert all(numpy.array_equal(result, results[0]) for result in results[1:5])
+    assert results[0] is not results[1]
+    assert det_int(results[5]) == 8
+
+
+def test_backpressure():
+    async def main():
+        async with AsyncMatrixGenerator(workers=1, max_pending=2) as generator:
+            tasks = [asyncio.create_task(generator.matrix_gen(4, det_value)) for det_value in range(1, 7)]
+            await asyncio.sleep(0)
+            stats = generator.stats
+            await asyncio.gather(*tasks)
+            return stats, generator.stats
+
+    during, after = asyncio.run(main())
+    assert during['queued'] + during['running'] <= 2 and during['waiting'] == 4
+    assert after['completed'] == 6 and after['waiting'] == 0
+
+
+def test_cancelled_request_stops_the_job():
+    async def main():
+        async with AsyncMatrixGenerator(workers=1) as generator:
+            task = asyncio.create_task(generator.matrix_gen(10, 1, sampler='enumerate'))
+            while generator.stats['running'] == 0:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            start = time.perf_counter()
+            # The worker is free again once the job has stopped.
+            matrix = await generator.matrix_gen(3, 2)
+            return time.perf_counter() - start, matrix, generator.stats
+
+    seconds, matrix, stats = asyncio.run(main())
+    assert seconds < 5 and det_int(matrix) == 2
+    assert stats['cancelled'] == 1 and stats['completed'] == 1
+
+
+def test_errors_and_closing():
+    async def main():
+        generator = AsyncMatrixGenerator(workers=1)
+        with pytest.raises(ValueError):
+            await generator.matrix_gen(3, lower_bound=0, upper_bound=1)
+        with pytest.raises(TypeError):
+            await generator.matrix_gen(3, cancel=None)
+        await generator.close()
+        with pytest.raises(RuntimeError):
+            await generator.matrix_gen(3)
+
+    asyncio.run(main())
+    with pytest.raises(ValueError):
+        AsyncMatrixGenerator(max_pending=0)
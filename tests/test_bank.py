@@ -0,0 +1,48 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int, matrix_gen_parallel
+from matrix_rdn_det.bank import MatrixBank, write_bank
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'bank.mrd'
+    header = write_bank(path, 25, 4, det_value=3, seed=11, chunk=7)
+    assert header['dtype'] == '<i1'
+    with MatrixBank(path) as bank:
+        assert len(bank) == 25 and bank.header == header
+        assert isinstance(bank.matrices, numpy.memmap)
+        assert bank.matrices.dtype == numpy.int8
+        assert all(det_int(matrix) == 3 for matrix in bank)
+        expected = matrix_gen_parallel(25, 4, 3, seed=11, workers=1)
+        assert (bank.matrices == expected).all()
+        assert (bank[17] == expected[17]).all()
+
+
+def test_dtype_and_seed(tmp_path):
+    path = tmp_path / 'bank.mrd'
+    header = write_bank(path, 3, 3, det_value=5, lower_bound=-300, upper_bound=300)
+    assert header['dtype'] == '<i2'
+    with MatrixBank(path) as bank:
+        again = matrix_gen_parallel(3, 3, 5, -300, 300, workers=1,
+                                    seed=numpy.random.SeedSequence(bank.header['seed']))
+        assert (bank.matrices == again).all()
+        assert bank.matrices.min() >= -300 and bank.matrices.max() < 300
+
+    write_bank(path, 0, 3)
+    with MatrixBank(path) as bank:
+        assert len(bank) == 0 and bank.matrices.shape == (0, 3, 3)
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / 'bank.mrd'
+    write_bank(path, 4, 3, seed=1)
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])
+    with pytest.raises(ValueError):
+        MatrixBank(path)
+    path.write_bytes(b'not a bank' + data)
+    with pytest.raises(ValueError):
+        MatrixBank(path)
+    with pytest.raises(ValueError):
+        write_bank(path, 2, 0)
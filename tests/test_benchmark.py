@@ -0,0 +1,48 @@
+from matrix_rdn_det import benchmark
+
+CASES = [{'function': 'matrix_gen', 'dimension': 3, 'det_value': 2, 'lower_bound': -9, 'upper_bound': 10,
+          'rdn_prm': 0, 'attempts': 200},
+         {'function': 'det_int', 'dimension': 6, 'entry_bound': 9, 'method': 'auto'}]
+
+
+def test_run_benchmarks():
+    results = benchmark.run_benchmarks(CASES, repeat=3)
+    assert [result['name'] for result in results] == [benchmark.case_name(case) for case in CASES]
+    for result in results:
+        assert 0 <= result['median'] <= result['p95']
+        assert result['restarts'] >= 0 and result['peak_memory'] >= 0
+    assert results[1]['restarts'] == 0
+
+
+def test_baseline_round_trip_and_regressions(tmp_path):
+    results = benchmark.run_benchmarks(CASES, repeat=2)
+    path = tmp_path / 'baseline.json'
+    benchmark.save_baseline(results, path)
+    baseline = benchmark.load_baseline(path)
+    assert benchmark.find_regressions(results, baseline) == []
+
+    slower = [dict(result, median=result['median'] * 10 + 1, restarts=result['restarts'] + 5) for result in results]
+    regressions = benchmark.find_regressions(slower, baseline)
+    assert {(name, metric) for name, metric, _, _ in regressions} == (
+        {(result['name'], 'median') for result in results} | {(result['name'], 'restarts') for result in results})
+
+
+def test_default_cases_are_possible():
+    for case in benchmark.default_cases():
+        if case['function'] == 'matrix_gen':
+            bound = max(abs(case['lower_bound']), abs(case['upper_bound'] - 1))
+            assert case['det_value'] <= (case['dimension']**0.5 * bound)**case['dimension']
+    assert len(benchmark.default_cases(quick=True)) < len(benchmark.default_cases())
+
+
+def test_main_flags_regressions(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(benchmark, 'default_cases', lambda quick=False: CASES)
+    path = str(tmp_path / 'baseline.json')
+    assert benchmark.main(['--repeat', '2', '--save', path]) == 0
+    results = benchmark.load_baseline(path)
+    for result in results.values():
+        result['median'] = result['p95'] = 0
+        result['restarts'] = -1
+    benchmark.save_baseline(list(results.values()), path)
+    assert benchmark.main(['--repeat', '2', '--compare', path]) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
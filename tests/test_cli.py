@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+import numpy
+
+from matrix_rdn_det import det_int
+from matrix_rdn_det import matrix_rdn_det
+
+
+def run(*arguments):
+    return subprocess.run([sys.executable, matrix_rdn_det.__file__, *arguments], capture_output=True, check=True).stdout
+
+
+def test_single_latex_matrix():
+    lines = run('3', '2').decode().splitlines()
+    assert len(lines) == 3 and lines[0].endswith(' \\\\') and lines[0].count('&') == 2
+    matrix = numpy.array([[int(entry) for entry in line.strip(' \\').split('&')] for line in lines])
+    assert det_int(matrix) == 2
+
+
+def test_json_count_and_jobs():
+    output = run('4', '-3', '--count', '7', '--format', 'json', '--seed', '5', '--batch', '3')
+    matrices = [json.loads(line) for line in output.decode().splitlines()]
+    assert len(matrices) == 7 and all(det_int(numpy.array(matrix)) == -3 for matrix in matrices)
+    assert run('4', '-3', '--count', '7', '--format', 'json', '--seed', '5', '--jobs', '2') == output
+
+
+def test_raw_and_latex_stack():
+    output = run('3', '--count', '4', '--format', 'raw', '--seed', '1')
+    matrices = numpy.frombuffer(output, '<i8').reshape(4, 3, 3)
+    assert all(det_int(matrix) == 1 for matrix in matrices)
+    latex = run('3', '--count', '4', '--seed', '1').decode()
+    assert latex.count('\n\n') == 3
+    assert latex.split('\n\n') == [matrix_rdn_det.numpy2latex(matrix) for matrix in matrices[:3]] + [matrix_rdn_det.numpy2latex(matrices[3]) + '\n']
+
+
+def test_stream_stops_with_the_reader():
+    process = subprocess.Popen([sys.executable, matrix_rdn_det.__file__, '2', '--stream', '--format', 'raw'],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    data = process.stdout.read(2 * 2 * 8 * 100)
+    process.stdout.close()
+    assert process.wait(timeout=60) == 0 and process.stderr.read() == b''
+    assert len(data) == 3200
@@ -0,0 +1,87 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import cofactors_int, det_int, matrix_rdn_det
+
+
+def reference(matrix):
+    return [(-1)**column * det_int(numpy.delete(matrix, column, axis=1))
+            for column in range(numpy.size(matrix, axis=1))]
+
+
+def test_random_matrices():
+    rng = numpy.random.default_rng(5)
+    for dimension in range(2, 10):
+        for _ in range(5):
+            matrix = rng.integers(-9, 10, [dimension - 1, dimension])
+            assert list(cofactors_int(matrix)) == reference(matrix)
+
+
+def test_rank_deficient_matrices():
+    rng = numpy.random.default_rng(6)
+    for dimension in range(3, 8):
+        matrix = rng.integers(-9, 10, [dimension - 1, dimension])
+        matrix[-1] = 2 * matrix[0]
+        assert list(cofactors_int(matrix)) == [0] * dimension
+        matrix = rng.integers(-9, 10, [dimension - 1, dimension])
+        matrix[:, 0] = matrix[:, 1]
+        assert list(cofactors_int(matrix)) == reference(matrix)
+        matrix = rng.integers(-9, 10, [dimension - 1, dimension])
+        matrix[:, dimension // 2] = 0
+        assert list(cofactors_int(matrix)) == reference(matrix)
+
+
+def test_small_shapes():
+    assert list(cofactors_int(numpy.zeros([0, 1], int))) == [1]
+    assert list(cofactors_int(numpy.array([[3, 4]]))) == [4, -3]
+    assert list(cofactors_int(numpy.array([[1, 2, 3], [4, 5, 6]]))) == [-3, 6, -3]
+
+
+def test_big_entries():
+    matrix = numpy.array([[10**20, 1, 2], [3, 10**20, 5]], dtype=object)
+    cofactors = cofactors_int(matrix)
+    assert cofactors.dtype == object
+    assert list(cofactors) == reference(matrix)
+
+
+def test_invalid_shape():
+    with pytest.raises(TypeError):
+        cofactors_int(numpy.zeros([3, 3], int))
+
+
+def test_batch_matches_cofactors_int():
+    rng = numpy.random.default_rng(7)
+    for dimension in range(2, 8):
+        matrices = rng.integers(-3, 4, [40, dimension - 1, dimension])
+        matrices[0, -1] = 2 * matrices[0, 0]
+        matrices[1, :, 0] = 0
+        matrices[2, :, 1] = matrices[2, :, 0]
+        matrices[3, :] = 0
+        expected = [list(cofactors_int(matrix)) for matrix in matrices]
+        assert matrix_rdn_det._cofactors_batch(matrices).tolist() == expected
+    matrices = numpy.array([[[10**20, 1, 2], [3, 10**20, 5]], [[1, 2, 3], [4, 5, 6]]], dtype=object)
+    assert matrix_rdn_det._cofactors_batch(matrices).tolist() == [list(cofactors_int(matrix)) for matrix in matrices]
+
+
+def test_row_update_matches_cofactors_int():
+    rng = numpy.random.default_rng(8)
+    for dimension in range(2, 9):
+        for _ in range(5):
+            matrix = rng.integers(-9, 10, [dimension - 1, dimension])
+            row = int(rng.integers(0, dimension - 1))
+            cache = matrix_rdn_det._row_update_cache(matrix, row)
+            for _ in range(3):
+                matrix[row] = rng.integers(-9, 10, dimension)
+                assert list(matrix_rdn_det._updated_cofactors(cache, matrix[row])) == reference(matrix)
+    matrix = numpy.array([[10**20, 1, 2, 7], [3, 10**20, 5, 1], [1, 2, 3, 4]], dtype=object)
+    cache = matrix_rdn_det._row_update_cache(matrix, 2)
+    matrix[2] = [10**19, -3, 4, 5]
+    assert list(matrix_rdn_det._updated_cofactors(cache, matrix[2])) == reference(matrix)
+
+
+def test_row_update_of_dependent_rows():
+    matrix = numpy.array([[1, 2, 3, 4], [2, 4, 6, 8], [0, 1, 0, 1]])
+    assert matrix_rdn_det._row_update_cache(matrix, 2) is None
+    cache = matrix_rdn_det._row_update_cache(matrix, 0)
+    assert list(matrix_rdn_det._updated_cofactors(cache, [5, 1, 2, 3])) == reference(
+        numpy.array([[5, 1, 2, 3], [2, 4, 6, 8], [0, 1, 0, 1]]))
@@ -0,0 +1,108 @@
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int
+
+METHODS = ['auto', 'expansion', 'bareiss', 'modular']
+
+
+# Determinant by Gauss elimination over the rationals, used as reference.
+def det_fraction(matrix):
+    rows = [[Fraction(int(entry)) for entry in row] for row in numpy.asarray(matrix).tolist()]
+    dimension = len(rows)
+    determinant = Fraction(1)
+    for k in range(dimension):
+        pivot = next((row for row in range(k, dimension) if rows[row][k] != 0), None)
+        if pivot is None:
+            return 0
+        if pivot != k:
+            rows[k], rows[pivot] = rows[pivot], rows[k]
+            determinant = -determinant
+        determinant *= rows[k][k]
+        for row in range(k + 1, dimension):
+            factor = rows[row][k] / rows[k][k]
+            rows[row] = [entry - factor * pivot_entry for entry, pivot_entry in zip(rows[row], rows[k])]
+    return int(determinant)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_random_matrices(method):
+    rng = numpy.random.default_rng(1)
+    # Full expansion is factorial in the dimension.
+    for dimension in range(1, 7 if method == 'expansion' else 9):
+        for _ in range(5):
+            matrix = rng.integers(-9, 10, [dimension, dimension])
+            determinant = det_int(matrix, method)
+            assert type(determinant) is int
+            assert determinant == det_fraction(matrix)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_sparse_matrices(method):
+    rng = numpy.random.default_rng(2)
+    for dimension in range(2, 9):
+        matrix = rng.integers(-9, 10, [dimension, dimension])
+        matrix[rng.random([dimension, dimension]) < 0.7] = 0
+        assert det_int(matrix, method) == det_fraction(matrix)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_big_entries(method):
+    rng = numpy.random.default_rng(3)
+    matrix = numpy.array([[int(entry) * 10**17 + 12345 for entry in row]
+                          for row in rng.integers(-9, 10, [5, 5])], dtype=object)
+    assert det_int(matrix, method) == det_fraction(matrix)
+    matrix = rng.integers(-2**62, 2**62, [4, 4])
+    assert det_int(matrix, method) == det_fraction(matrix)
+
+
+def test_large_dimension_auto():
+    rng = numpy.random.default_rng(4)
+    matrix = rng.integers(-9, 10, [24, 24])
+    assert det_int(matrix) == det_fraction(matrix)
+
+
+def test_modular_sign_correction():
+    # The residues of a negative determinant are positive, so the CRT result
+    # has to be moved to the symmetric range.
+    matrix = numpy.array([[0, 1], [1, 0]])
+    assert det_int(matrix, 'modular') == -1
+    matrix = numpy.diag([-10**12, 10**12, 10**12])
+    assert det_int(matrix, 'modular') == -10**36
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_singular_and_zero_row(method):
+    singular = numpy.array([[1, 2, 3, 4], [2, 4, 6, 8], [1, 0, 1, 0], [3, 1, 4, 1]])
+    assert det_int(singular, method) == 0
+    zero_row = numpy.array([[1, 2, 3, 4], [0, 0, 0, 0], [1, 0, 1, 0], [3, 1, 4, 1]])
+    assert det_int(zero_row, method) == 0
+    zero_column = zero_row.T.copy()
+    assert det_int(zero_column, method) == 0
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_small_dimensions(method):
+    assert det_int(numpy.zeros([0, 0], int), method) == 1
+    assert det_int(numpy.array([[5]]), method) == 5
+    assert det_int(numpy.array([[2, 1], [7, 5]]), method) == 3
+
+
+def test_invalid_input():
+    with pytest.raises(TypeError):
+        det_int(numpy.zeros([2, 3], int))
+    with pytest.raises(ValueError):
+        det_int(numpy.array([[5]]), method='nonsense')
+
+
+def test_expansion_recurses_with_expansion(monkeypatch):
+    from matrix_rdn_det import matrix_rdn_det
+
+    def fail(*arguments):
+        raise AssertionError('Bareiss used by method=\'expansion\'')
+    monkeypatch.setattr(matrix_rdn_det, '_det_bareiss', fail)
+    monkeypatch.setattr(matrix_rdn_det, '_det_modular', fail)
+    matrix = numpy.random.default_rng(13).integers(-9, 10, [6, 6])
+    assert det_int(matrix, 'expansion') == det_fraction(matrix)
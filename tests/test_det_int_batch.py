@@ -0,0 +1,51 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int, det_int_batch, matrix_gen_batch
+
+
+@pytest.mark.parametrize('dimension', range(0, 9))
+def test_matches_det_int(dimension):
+    rng = numpy.random.default_rng(dimension)
+    matrices = rng.integers(-9, 10, [50, dimension, dimension])
+    if dimension >= 2:
+        matrices[0, 1] = matrices[0, 0]
+        matrices[1, :, 0] = 0
+    determinants = det_int_batch(matrices)
+    assert determinants.shape == (50,)
+    assert determinants.tolist() == [det_int(matrix) for matrix in matrices]
+
+
+@pytest.mark.parametrize('dimension', [2, 3, 4, 6])
+def test_big_entries(dimension):
+    rng = numpy.random.default_rng(10 + dimension)
+    matrices = rng.integers(-2**40, 2**40, [20, dimension, dimension])
+    determinants = det_int_batch(matrices)
+    assert determinants.dtype == object
+    assert determinants.tolist() == [det_int(matrix) for matrix in matrices]
+    matrices = numpy.array([[[10**30, 1], [2, 10**30]]], dtype=object)
+    assert det_int_batch(matrices).tolist() == [10**60 - 2]
+
+
+def test_minors_beyond_int64():
+    # The entries fit in numpy.int64, but the minors of the elimination do not.
+    rng = numpy.random.default_rng(20)
+    matrices = rng.integers(-1000, 1001, [20, 9, 9])
+    assert det_int_batch(matrices).tolist() == [det_int(matrix) for matrix in matrices]
+
+
+def test_generated_matrices():
+    matrices = matrix_gen_batch(30, 4, det_value=-7, rng=3)
+    determinants = det_int_batch(matrices)
+    assert determinants.dtype == numpy.int64
+    assert (determinants == -7).all()
+
+
+def test_empty_stack_and_invalid_input():
+    assert det_int_batch(numpy.zeros([0, 3, 3], int)).shape == (0,)
+    with pytest.raises(TypeError):
+        det_int_batch(numpy.zeros([2, 3, 4], int))
+    with pytest.raises(TypeError):
+        det_int_batch(numpy.zeros([3, 3], int))
+    with pytest.raises(TypeError):
+        det_int_batch(numpy.zeros([2, 3, 3]))
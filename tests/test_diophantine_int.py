@@ -0,0 +1,72 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int, diophantine_int
+
+
+def check(coefficients, value):
+    particular, basis = diophantine_int(numpy.array(coefficients, dtype=object), value)
+    assert basis.shape == (len(coefficients) - 1, len(coefficients))
+    assert sum(int(c) * int(x) for c, x in zip(coefficients, particular)) == value
+    assert all(sum(int(c) * int(x) for c, x in zip(coefficients, vector)) == 0 for vector in basis)
+    # The basis spans every homogeneous solution: the Gram determinant of the 
+    # lattice of homogeneous solutions is |c|**2 / gcd(c)**2.
+    divisor = numpy.gcd.reduce([abs(int(c)) for c in coefficients])
+    gram = numpy.array([[sum(int(x) * int(y) for x, y in zip(u, v)) for v in basis] for u in basis], dtype=object)
+    gram = gram.reshape(len(basis), len(basis))
+    assert det_int(gram) == sum(int(c)**2 for c in coefficients) // divisor**2
+    # LLL-reduced: the product of the squared lengths is at most 2**((k-1)*k/2) times
+    # the Gram determinant for k basis vectors.
+    size = len(basis)
+    assert numpy.prod([gram[i, i] for i in range(size)], dtype=object) <= 2**((size - 1) * size // 2) * det_int(gram)
+    return particular, basis
+
+
+def test_random_equations():
+    rng = numpy.random.default_rng(16)
+    for size in range(1, 9):
+        for _ in range(10):
+            coefficients = rng.integers(-10**6, 10**6, size)
+            coefficients[rng.integers(0, size)] = rng.integers(1, 100)
+            divisor = numpy.gcd.reduce(coefficients)
+            check(list(coefficients), int(divisor) * int(rng.integers(-50, 50)))
+
+
+def test_zero_coefficients():
+    particular, basis = check([0, 3, 0], 6)
+    assert particular.tolist() == [0, 2, 0]
+    check([0, 0, -7, 14], 21)
+
+
+def test_reduced_basis_is_short():
+    particular, basis = check([5, 7, 8], 1)
+    assert max(abs(basis).max(), abs(particular).max()) <= 3
+    particular, basis = check([10**6 + 3, 10**6 + 5, 10**6 + 9], 1)
+    assert sorted(abs(basis[0]).tolist()) == [1, 2, 3]
+    assert abs(particular).max() < 10**6
+
+
+def test_big_coefficients():
+    coefficients = [10**30 + 1, 10**30, 7]
+    particular, basis = check(coefficients, 10**20)
+    assert particular.dtype == object or basis.dtype == object
+
+
+
+def test_coefficients_beyond_the_float_range():
+    # The extended Euclid gives a particular solution far beyond 1e308, which is rounded
+    # towards the origin in several steps.
+    coefficients = [3**700 + 1, 5**500, 7**400, 2**1100 + 3]
+    particular, basis = check(coefficients, 1)
+    assert max(abs(int(entry)) for entry in particular) < 2**400
+
+def test_no_solution():
+    assert diophantine_int(numpy.array([2, 4]), 3) is None
+    assert diophantine_int(numpy.array([6, 10, 14]), 1) is None
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        diophantine_int(numpy.array([0, 0]), 0)
+    with pytest.raises(TypeError):
+        diophantine_int(numpy.array([[1, 2]]), 1)
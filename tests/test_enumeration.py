@@ -0,0 +1,149 @@
+import itertools
+
+import numpy
+
+from matrix_rdn_det import matrix_rdn_det
+
+
+def brute_force(sys_of_eq, b, parameters_bounds, free_parameters, control_rows, lower_bound, upper_bound):
+    solutions = []
+    ranges = [range(parameters_bounds[parameter, 0], parameters_bounds[parameter, 1] + 1) for parameter in free_parameters]
+    for values in itertools.product(*ranges):
+        parameters = b.copy()
+        parameters[free_parameters] = values
+        solution = -sys_of_eq @ parameters
+        if all(lower_bound <= solution[row] < upper_bound for row in control_rows):
+            solutions.append(solution)
+    return numpy.array(solutions, int).reshape(-1, numpy.size(sys_of_eq, axis=0))
+
+
+def feasible_solutions(sys_of_eq, parameters_bounds, control_rows, lower_bound, upper_bound):
+    boxes = matrix_rdn_det._feasible_boxes(sys_of_eq, parameters_bounds, control_rows, lower_bound, upper_bound)
+    blocks = list(matrix_rdn_det._feasible_blocks(sys_of_eq, boxes, control_rows, lower_bound, upper_bound))
+    if not blocks:
+        return numpy.zeros([0, numpy.size(sys_of_eq, axis=0)], int)
+    return numpy.concatenate(blocks)
+
+
+def test_blocks_match_brute_force(monkeypatch):
+    monkeypatch.setattr(matrix_rdn_det, '_ENUMERATION_BLOCK_BYTES', 200)
+    rng = numpy.random.default_rng(8)
+    for _ in range(20):
+        sys_of_eq = rng.integers(-3, 4, [4, 4])
+        parameters_bounds = numpy.sort(rng.integers(-4, 5, [3, 2]), axis=1)
+        b = numpy.append(parameters_bounds[:, 0], [1])
+        control_rows = numpy.array([1, 3])
+        expected = brute_force(sys_of_eq, b, parameters_bounds, numpy.arange(0, 3), control_rows, -5, 6)
+        solutions = feasible_solutions(sys_of_eq, parameters_bounds, control_rows, -5, 6)
+        assert sorted(map(tuple, solutions)) == sorted(map(tuple, expected))
+
+
+def test_split_boxes_match_brute_force(monkeypatch):
+    # Small leaves, so that the box is split many times.
+    monkeypatch.setattr(matrix_rdn_det, '_SPLIT_MAX_VOLUME', 7)
+    rng = numpy.random.default_rng(13)
+    for _ in range(20):
+        sys_of_eq = rng.integers(-3, 4, [4, 4])
+        parameters_bounds = numpy.array([[-5, 5]] * 3)
+        b = numpy.append(parameters_bounds[:, 0], [1])
+        control_rows = numpy.arange(0, 4)
+        expected = brute_force(sys_of_eq, b, parameters_bounds, numpy.arange(0, 3), control_rows, -4, 5)
+        solutions = feasible_solutions(sys_of_eq, parameters_bounds, control_rows, -4, 5)
+        assert sorted(map(tuple, solutions)) == sorted(map(tuple, expected))
+
+
+def test_empty_box():
+    sys_of_eq = numpy.eye(3, dtype=int)
+    parameters_bounds = numpy.array([[1, 0], [0, 2]])
+    solutions = feasible_solutions(sys_of_eq, parameters_bounds, numpy.array([2]), -9, 10)
+    assert solutions.shape == (0, 3)
+
+
+def test_reservoir_pick_is_uniform(monkeypatch):
+    # Blocks of 4 parameter vectors, 12 solutions spread over several blocks.
+    monkeypatch.setattr(matrix_rdn_det, '_ENUMERATION_BLOCK_BYTES', 8 * 4 * 4)
+    sys_of_eq = -numpy.eye(3, dtype=int)
+    parameters_bounds = numpy.array([[0, 3], [0, 2]])
+    rng = numpy.random.default_rng(9)
+    counts = {}
+    for _ in range(6000):
+        solution, sol_counter = matrix_rdn_det._pick_solution(
+            sys_of_eq, [parameters_bounds], numpy.array([2]), -9, 10, rng)
+        counts[tuple(solution)] = counts.get(tuple(solution), 0) + 1
+    assert sol_counter == 12
+    assert len(counts) == 12
+    assert min(counts.values()) > 400 and max(counts.values()) < 600
+
+
+def test_first_k_stops_early():
+    sys_of_eq = -numpy.eye(3, dtype=int)
+    parameters_bounds = numpy.array([[0, 3], [0, 2]])
+    rng = numpy.random.default_rng(10)
+    for _ in range(50):
+        solution, sol_counter = matrix_rdn_det._pick_solution(
+            sys_of_eq, [parameters_bounds], numpy.array([2]), -9, 10, rng, first_k=2)
+        assert sol_counter == 2
+        assert tuple(solution) in {(0, 0, 1), (0, 1, 1)}
+
+
+def test_tighten_bounds_keeps_every_solution():
+    rng = numpy.random.default_rng(11)
+    for _ in range(30):
+        sys_of_eq = rng.integers(-3, 4, [4, 4])
+        parameters_bounds = numpy.array([[-6, 6]] * 3)
+        control_rows = numpy.arange(0, 4)
+        b = numpy.append(parameters_bounds[:, 0], [1])
+        expected = brute_force(sys_of_eq, b, parameters_bounds, numpy.arange(0, 3), control_rows, -4, 5)
+        tightened = matrix_rdn_det._tighten_bounds(sys_of_eq, parameters_bounds, control_rows, -4, 5)
+        if tightened is None:
+            assert numpy.size(expected) == 0
+            continue
+        assert (tightened[:, 0] >= parameters_bounds[:, 0]).all() and (tightened[:, 1] <= parameters_bounds[:, 1]).all()
+        b = numpy.append(tightened[:, 0], [1])
+        solutions = brute_force(sys_of_eq, b, tightened, numpy.arange(0, 3), control_rows, -4, 5)
+        assert sorted(map(tuple, solutions)) == sorted(map(tuple, expected))
+
+
+def test_rejection_sampler_is_uniform(monkeypatch):
+    monkeypatch.setattr(matrix_rdn_det, '_ENUMERATION_BLOCK_BYTES', 8 * 4 * 16)
+    monkeypatch.setattr(matrix_rdn_det, '_REJECTION_MIN_VOLUME', 0)
+    sys_of_eq = numpy.array([[-1, 0, 0], [0, -1, 0], [-1, -1, 0]])
+    parameters_bounds = numpy.array([[0, 3], [0, 3]])
+    rng = numpy.random.default_rng(12)
+    counts = {}
+    for _ in range(5000):
+        solution = matrix_rdn_det._sample_solution(
+            sys_of_eq, parameters_bounds, numpy.array([2]), 0, 4, rng)
+        counts[tuple(solution)] = counts.get(tuple(solution), 0) + 1
+    # The solutions are the 10 vectors with a_1 + a_2 <= 3.
+    assert len(counts) == 10
+    assert min(counts.values()) > 400 and max(counts.values()) < 600
+
+
+def test_rejection_sampler_splits_the_box(monkeypatch):
+    # A single solution in a box of 2**20 vectors, found after the box is split.
+    monkeypatch.setattr(matrix_rdn_det, '_REJECTION_MAX_DRAWS', 2**10)
+    monkeypatch.setattr(matrix_rdn_det, '_REJECTION_MIN_VOLUME', 2**8)
+    sys_of_eq = numpy.array([[-1, 0, 0], [0, -1, 0], [-1, -1, 0]])
+    parameters_bounds = numpy.array([[0, 2**10 - 1], [0, 2**10 - 1]])
+    rng = numpy.random.default_rng(15)
+    solution = matrix_rdn_det._sample_solution(sys_of_eq, parameters_bounds, numpy.array([2]), 2046, 2047, rng)
+    assert solution.tolist() == [1023, 1023, 2046]
+
+
+def test_rejection_sampler_without_solutions(monkeypatch):
+    monkeypatch.setattr(matrix_rdn_det, '_REJECTION_MIN_VOLUME', 0)
+    sys_of_eq = numpy.array([[-1, 0, 0], [0, -1, 0], [-1, -1, 0]])
+    parameters_bounds = numpy.array([[0, 3], [0, 3]])
+    rng = numpy.random.default_rng(14)
+    assert matrix_rdn_det._sample_solution(sys_of_eq, parameters_bounds, numpy.array([2]), -5, 0, rng) is None
+
+
+def test_checked_sys_of_eq():
+    sys_of_eq = numpy.array([[2, -3, 1], [1, 4, -2]])
+    bounds = numpy.array([[-5, 5], [0, 3]])
+    assert matrix_rdn_det._checked_sys_of_eq(sys_of_eq, bounds, -9, 10).dtype == numpy.int64
+    # Terms like 2**40 * 2**30 overflow numpy.int64, so Python ints are used.
+    checked = matrix_rdn_det._checked_sys_of_eq(sys_of_eq * 2**40, bounds * 2**30, -9, 10)
+    assert checked.dtype == object and checked.tolist() == (sys_of_eq * 2**40).tolist()
+    assert matrix_rdn_det._checked_sys_of_eq(sys_of_eq, bounds, -2**62, 2**62).dtype == object
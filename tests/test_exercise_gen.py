@@ -0,0 +1,39 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int, exercise_gen, numpy2latex_batch
+
+
+@pytest.mark.parametrize('sampler', ['auto', 'enumerate', 'rejection'])
+def test_exercises_within_bounds(sampler):
+    matrices, solutions, rhs = exercise_gen(30, 3, 2, rng=4, sampler=sampler, x_lower_bound=-3, x_upper_bound=4,
+                                            b_lower_bound=-10, b_upper_bound=11)
+    assert matrices.shape == (30, 3, 3) and solutions.shape == rhs.shape == (30, 3)
+    assert all(det_int(matrix) == 2 for matrix in matrices)
+    assert (numpy.einsum('aij,aj->ai', matrices, solutions) == rhs).all()
+    assert solutions.min() >= -3 and solutions.max() <= 3
+    assert rhs.min() >= -10 and rhs.max() <= 10
+
+
+def test_solutions_are_uniform():
+    # With A = I every x in the box is a solution, so every x should be drawn.
+    matrices, solutions, rhs = exercise_gen(2000, 1, 1, x_lower_bound=0, x_upper_bound=4, rng=5)
+    counts = numpy.bincount(solutions[:, 0], minlength=4)
+    assert (rhs == solutions).all() and counts.min() > 400
+
+
+def test_exercises_render_and_fail():
+    matrices, solutions, rhs = exercise_gen(2, 2, rng=6)
+    assert numpy2latex_batch(matrices, 'augmented', rhs).count('\\left(') == 2
+    assert exercise_gen(0, 4)[0].shape == (0, 4, 4)
+    with pytest.raises(ValueError):
+        exercise_gen(1, 3, b_lower_bound=1000, b_upper_bound=1001)
+    with pytest.raises(ValueError):
+        exercise_gen(1, 3, x_lower_bound=2, x_upper_bound=2)
+
+
+def test_products_beyond_int64():
+    # A @ x can exceed numpy.int64 during the search although b is within its bounds.
+    matrices, solutions, rhs = exercise_gen(5, 3, lower_bound=-2**41, upper_bound=2**41, x_lower_bound=-2**21,
+                                            x_upper_bound=2**21, b_lower_bound=-2**62, b_upper_bound=2**62, rng=0)
+    assert (numpy.einsum('aij,aj->ai', matrices.astype(object), solutions.astype(object)) == rhs).all()
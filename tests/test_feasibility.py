@@ -0,0 +1,58 @@
+import itertools
+
+import numpy
+import pytest
+
+from matrix_rdn_det import cofactors_int, estimate_solutions, feasibility, matrix_gen, matrix_gen_batch
+
+
+def count_solutions(cofactors, det_value, lower_bound, upper_bound):
+    rows = numpy.array(list(itertools.product(range(lower_bound, upper_bound), repeat=numpy.size(cofactors))))
+    return int(numpy.count_nonzero(rows @ cofactors == det_value))
+
+
+def test_zero_estimate_means_no_solution():
+    rng = numpy.random.default_rng(4)
+    for _ in range(150):
+        dimension = int(rng.integers(2, 5))
+        cofactors = cofactors_int(rng.integers(-3, 4, [dimension - 1, dimension]))
+        for det_value in [1, int(rng.integers(-40, 41)), int(numpy.abs(cofactors).sum() * 3)]:
+            if estimate_solutions(cofactors, det_value, -3, 4) == 0:
+                assert count_solutions(cofactors, det_value, -3, 4) == 0
+
+
+def test_estimate_is_close():
+    cofactors = numpy.array([3, -5, 7, 2])
+    exact = count_solutions(cofactors, 4, -4, 5)
+    assert 0.5 * exact <= estimate_solutions(cofactors, 4, -4, 5) <= 2 * exact
+    assert estimate_solutions(numpy.array([2, 4, 6]), 3) == 0
+    assert estimate_solutions(numpy.array([1, 1, 1]), 28) == 0
+    estimates = estimate_solutions(numpy.array([[1, 1, 1], [2, 4, 6]]), 3)
+    assert estimates.shape == (2,) and estimates[0] > 0 and estimates[1] == 0
+
+
+def test_feasibility_report():
+    report = feasibility(4, 20000, rng=1)
+    assert report['hadamard_bound'] == 104976 and report['possible']
+    assert 0 < report['success_rate'] < 1
+    assert report['expected_draws'] == pytest.approx(1 / report['success_rate'])
+    assert feasibility(3, 1, rng=1)['success_rate'] > 0.5
+    report = feasibility(4, 200000)
+    assert not report['possible'] and report['expected_draws'] == float('inf')
+    with pytest.raises(ValueError):
+        feasibility(1, 1)
+
+
+def test_matrix_gen_rejects_impossible_determinants():
+    with pytest.raises(ValueError):
+        matrix_gen(4, 200000)
+    with pytest.raises(ValueError):
+        matrix_gen_batch(3, 2, -163)
+    assert abs(int(round(numpy.linalg.det(matrix_gen(2, 162, rng=1))))) == 162
+
+
+def test_hopeless_rows_are_skipped():
+    stats = {}
+    matrix_gen(4, 20000, rng=0, stats=stats)
+    assert stats['restart_reasons']['hopeless'] > 0
+    assert sum(stats['restart_reasons'].values()) == stats['restarts']
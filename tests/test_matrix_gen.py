@@ -0,0 +1,149 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int, matrix_gen, matrix_gen_batch
+
+
+@pytest.mark.parametrize('dimension', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('det_value', [1, -1, 3, 0])
+def test_determinant_and_bounds(dimension, det_value):
+    matrix = matrix_gen(dimension, det_value)
+    assert matrix.shape == (dimension, dimension)
+    assert det_int(matrix) == det_value
+    assert matrix.min() >= -9 and matrix.max() <= 9
+
+
+def test_custom_bounds():
+    matrix = matrix_gen(4, 2, lower_bound=-4, upper_bound=6)
+    assert det_int(matrix) == 2
+    assert matrix.min() >= -4 and matrix.max() <= 5
+
+
+def test_random_parameters():
+    matrix = matrix_gen(6, 1, rdn_prm=3, attempts=100)
+    assert det_int(matrix) == 1
+
+
+def test_invalid_arguments():
+    assert matrix_gen(0).size == 0
+    with pytest.raises(TypeError):
+        matrix_gen(2.0)
+    with pytest.raises(ValueError):
+        matrix_gen(2, lower_bound=0, upper_bound=1)
+
+
+def test_seed_is_reproducible():
+    assert (matrix_gen(5, 2, rng=11) == matrix_gen(5, 2, rng=11)).all()
+    generator = numpy.random.default_rng(3)
+    first = matrix_gen(4, rng=generator)
+    second = matrix_gen(4, rng=generator)
+    assert (first == matrix_gen(4, rng=numpy.random.default_rng(3))).all()
+    assert not (first == second).all()
+
+
+def test_thread_pool_generation():
+    from concurrent.futures import ThreadPoolExecutor
+    seeds = list(range(16))
+    with ThreadPoolExecutor(4) as executor:
+        matrices = list(executor.map(lambda seed: matrix_gen(4, 3, rng=seed), seeds))
+    assert all((matrix == matrix_gen(4, 3, rng=seed)).all() for matrix, seed in zip(matrices, seeds))
+
+
+def test_first_k():
+    matrix = matrix_gen(6, 2, first_k=5, rng=4)
+    assert det_int(matrix) == 2
+    assert matrix.min() >= -9 and matrix.max() <= 9
+
+
+@pytest.mark.parametrize('sampler', ['enumerate', 'rejection'])
+def test_samplers(sampler):
+    matrix = matrix_gen(6, -3, sampler=sampler, rng=2)
+    assert det_int(matrix) == -3
+    assert matrix.min() >= -9 and matrix.max() <= 9
+    with pytest.raises(ValueError):
+        matrix_gen(3, sampler='nonsense')
+    with pytest.raises(ValueError):
+        matrix_gen(3, first_k=2, sampler='rejection')
+
+
+def test_stats_count_restarts():
+    stats = {}
+    matrix = matrix_gen(4, 5, rng=6, stats=stats)
+    assert det_int(matrix) == 5
+    assert type(stats['restarts']) is int and stats['restarts'] >= 0
+    matrix_gen(1, 3, stats=stats)
+    assert stats['restarts'] == 0
+
+
+def test_stats_record_the_phases():
+    stats = {}
+    matrix_gen(5, 7, rng=3, sampler='enumerate', stats=stats)
+    assert set(stats['time']) == {'part1', 'part2', 'part3', 'part4', 'part5', 'part6'}
+    assert all(seconds >= 0 for seconds in stats['time'].values())
+    assert sum(stats['restart_reasons'].values()) == stats['restarts']
+    assert stats['attempts'] >= 1
+    assert stats['sys_of_eq_shape'] == (5, 5)
+    assert 1 <= stats['solutions'] <= stats['box_volume']
+
+    matrix_gen(6, 3, rng=3, sampler='rejection', stats=stats)
+    assert stats['solutions'] is None
+
+
+def test_stats_callback():
+    received = []
+    matrix = matrix_gen(4, 2, rng=1, stats=received.append)
+    assert det_int(matrix) == 2
+    assert len(received) == 1 and received[0]['restarts'] >= 0
+
+
+@pytest.mark.parametrize('dimension, det_value', [(2, 5), (4, 0), (5, 30), (7, 1)])
+def test_row_retries(dimension, det_value):
+    stats = {}
+    matrix = matrix_gen(dimension, det_value, rng=dimension, retry='row', stats=stats)
+    assert det_int(matrix) == det_value
+    assert matrix.min() >= -9 and matrix.max() <= 9
+    assert sum(stats['restart_reasons'].values()) == stats['restarts']
+    with pytest.raises(ValueError):
+        matrix_gen(3, retry='nonsense')
+
+
+@pytest.mark.parametrize('dimension, det_value', [(2, 3), (3, -1), (6, 0), (8, 6), (30, -1)])
+def test_unimodular_method(dimension, det_value):
+    matrix = matrix_gen(dimension, det_value, rng=dimension, method='unimodular')
+    assert matrix.shape == (dimension, dimension)
+    assert det_int(matrix) == det_value
+    assert matrix.min() >= -9 and matrix.max() <= 9
+    matrix = matrix_gen(dimension, det_value, -2, 4, rng=dimension, method='unimodular')
+    assert det_int(matrix) == det_value
+    assert matrix.min() >= -2 and matrix.max() <= 3
+
+
+def test_unimodular_entries_compared_with_cofactor_method():
+    # The histograms of the entries of both methods are close in total variation, and the
+    # unimodular method leaves no trace of the diagonal it starts from.
+    histograms = []
+    for method in ('cofactor', 'unimodular'):
+        matrices = matrix_gen_batch(300, 4, -3, rng=5, method=method)
+        histograms.append(numpy.bincount(matrices.ravel() + 9, minlength=19) / matrices.size)
+        if method == 'unimodular':
+            diagonal = matrices[:, numpy.arange(4), numpy.arange(4)]
+            assert numpy.mean(diagonal == 0) < 0.15 and numpy.mean(matrices == 0) < 0.15
+    assert numpy.all(histograms[1] > 0.02)
+    assert numpy.abs(histograms[0] - histograms[1]).sum() / 2 < 0.2
+
+
+def test_unimodular_method_invalid():
+    with pytest.raises(ValueError):
+        matrix_gen(3, 11, method='unimodular')
+    with pytest.raises(ValueError):
+        matrix_gen(3, 1, 1, 5, method='unimodular')
+    with pytest.raises(ValueError):
+        matrix_gen(3, method='nonsense')
+
+
+@pytest.mark.parametrize('dimension, det_value, bound', [(5, 1, 2**40), (6, 3, 2**50), (4, 7, 2**61), (8, 5, 2**30)])
+def test_wide_bounds(dimension, det_value, bound):
+    for seed in range(2):
+        matrix = matrix_gen(dimension, det_value, -bound, bound, rng=seed)
+        assert det_int(matrix) == det_value
+        assert matrix.min() >= -bound and matrix.max() < bound
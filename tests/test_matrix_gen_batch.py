@@ -0,0 +1,30 @@
+import pytest
+
+from matrix_rdn_det import det_int, matrix_gen_batch
+
+
+@pytest.mark.parametrize('dimension,det_value', [(2, 1), (3, -2), (4, 3), (4, 0)])
+def test_determinants_and_bounds(dimension, det_value):
+    matrices = matrix_gen_batch(20, dimension, det_value, lower_bound=-5, upper_bound=7)
+    assert matrices.shape == (20, dimension, dimension)
+    assert all(det_int(matrix) == det_value for matrix in matrices)
+    assert matrices.min() >= -5 and matrices.max() <= 6
+
+
+def test_small_dimensions():
+    assert matrix_gen_batch(3, 1, 4).tolist() == [[[4]]] * 3
+    assert matrix_gen_batch(3, 0).shape == (3, 0, 0)
+    assert matrix_gen_batch(0, 3).shape == (0, 3, 3)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        matrix_gen_batch(-1, 3)
+    with pytest.raises(TypeError):
+        matrix_gen_batch(2, 3, 1.5)
+    with pytest.raises(ValueError):
+        matrix_gen_batch(2, 3, 1, 0, 1)
+
+
+def test_seed_is_reproducible():
+    assert (matrix_gen_batch(10, 4, rng=5) == matrix_gen_batch(10, 4, rng=5)).all()
@@ -0,0 +1,28 @@
+import numpy
+
+from matrix_rdn_det import det_int, matrix_gen, matrix_gen_parallel
+
+
+def test_reproducible_across_workers():
+    serial = matrix_gen_parallel(12, 4, 2, seed=7, workers=1)
+    parallel = matrix_gen_parallel(12, 4, 2, seed=7, workers=3, chunksize=2)
+    assert (serial == parallel).all()
+    assert all(det_int(matrix) == 2 for matrix in parallel)
+
+
+def test_seeds_differ():
+    first = matrix_gen_parallel(4, 4, seed=1, workers=1)
+    second = matrix_gen_parallel(4, 4, seed=2, workers=1)
+    assert not (first == second).all()
+    assert len({matrix.tobytes() for matrix in first}) == 4
+
+
+def test_shapes():
+    assert matrix_gen_parallel(0, 3, workers=1).shape == (0, 3, 3)
+    assert matrix_gen_parallel(2, 1, 5, workers=1).tolist() == [[[5]], [[5]]]
+
+
+def test_forwards_first_k_and_sampler():
+    serial = [matrix_gen(5, 2, first_k=3, sampler='enumerate', rng=numpy.random.default_rng(seed_sequence))
+              for seed_sequence in numpy.random.SeedSequence(5).spawn(3)]
+    assert (matrix_gen_parallel(3, 5, 2, first_k=3, sampler='enumerate', seed=5, workers=1) == serial).all()
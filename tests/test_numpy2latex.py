@@ -0,0 +1,49 @@
+import io
+
+import numpy
+import pytest
+
+from matrix_rdn_det import numpy2latex, numpy2latex_batch
+
+
+def test_numpy2latex():
+    assert numpy2latex(numpy.array([[4, -3], [5, 2], [-8, 5]])) == '4 & -3 \\\\\n5 & 2 \\\\\n-8 & 5'
+    assert numpy2latex(numpy.array([[10**30, -1]], dtype=object)) == str(10**30) + ' & -1'
+    assert numpy2latex(numpy.array([[]])) == ''
+    with pytest.raises(TypeError):
+        numpy2latex([[1]])
+    with pytest.raises(ValueError):
+        numpy2latex(numpy.array([1, 2]))
+
+
+def test_batch_matches_numpy2latex():
+    matrices = numpy.random.default_rng(0).integers(-99, 100, [10, 3, 4])
+    expected = [numpy2latex(matrix) for matrix in matrices]
+    assert numpy2latex_batch(matrices, None) == '\n\n'.join(expected)
+    assert numpy2latex_batch(list(matrices), 'bmatrix', separator='\n') == '\n'.join(
+        '\\begin{bmatrix}\n' + latex + '\n\\end{bmatrix}' for latex in expected)
+    assert numpy2latex_batch(matrices[:1], 'array') == '\\begin{array}{rrrr}\n' + expected[0] + '\n\\end{array}'
+    assert numpy2latex_batch(numpy.zeros([0, 2, 2], int)) == ''
+
+
+def test_augmented_systems_and_files(tmp_path, monkeypatch):
+    # Chunks of two matrices, so that the output is written in several parts.
+    monkeypatch.setattr('matrix_rdn_det.matrix_rdn_det._LATEX_CHUNK', 2)
+    matrices = numpy.array([[[2, 1], [1, 1]]] * 5)
+    rhs = numpy.array([[3, 2]] * 5)
+    expected = '\n\n'.join(['\\left(\\begin{array}{rr|r}\n2 & 1 & 3 \\\\\n1 & 1 & 2\n\\end{array}\\right)'] * 5)
+    assert numpy2latex_batch(matrices, 'augmented', rhs) == expected
+    buffer = io.StringIO()
+    assert numpy2latex_batch(matrices, 'augmented', rhs, file=buffer) is None
+    assert buffer.getvalue() == expected
+    numpy2latex_batch(matrices, 'augmented', rhs, file=tmp_path / 'systems.tex')
+    assert (tmp_path / 'systems.tex').read_text() == expected
+
+    with pytest.raises(ValueError):
+        numpy2latex_batch(matrices, 'augmented')
+    with pytest.raises(ValueError):
+        numpy2latex_batch(matrices, 'pmatrix', rhs)
+    with pytest.raises(ValueError):
+        numpy2latex_batch(matrices, 'augmented', rhs[:, :1])
+    with pytest.raises(ValueError):
+        numpy2latex_batch(matrices, 'table')
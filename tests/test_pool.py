@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from matrix_rdn_det import det_int
+from matrix_rdn_det.pool import MatrixPool
+
+
+def test_get_and_warm_without_thread():
+    with MatrixPool(size=3, seed=1, background=False) as pool:
+        matrix = pool.get(3, 2)
+        assert det_int(matrix) == 2
+        assert pool.stats['misses'] == 1 and len(pool) == 0
+        pool.warm(3, 2)
+        assert len(pool) == 3
+        for _ in range(3):
+            matrix = pool.get(3, 2)
+            assert det_int(matrix) == 2 and matrix.min() >= -9 and matrix.max() <= 9
+        assert pool.stats['hits'] == 3 and len(pool) == 0
+        pool.refill()
+        assert pool.stats['ready'] == {(3, 2, -9, 10): 3}
+
+
+def test_least_recently_used_is_evicted():
+    # Room for four 3x3 matrices.
+    budget = 4 * 9 * pool_itemsize()
+    with MatrixPool(size=3, memory_budget=budget, seed=2, background=False) as pool:
+        pool.warm(3, 1)
+        pool.warm(3, 5)
+        stats = pool.stats
+        assert stats['ready'] == {(3, 5, -9, 10): 3}
+        assert stats['evictions'] == 1 and stats['memory'] <= budget
+        pool.get(3, 1)
+        pool.refill()
+        stats = pool.stats
+        assert stats['ready'] == {(3, 1, -9, 10): 3} and stats['evictions'] == 2
+
+
+def pool_itemsize():
+    with MatrixPool(size=1, background=False) as pool:
+        return pool.get(1, 1).itemsize
+
+
+def test_background_refill():
+    with MatrixPool(size=4, seed=3) as pool:
+        pool.warm(4, 3, wait=True)
+        assert pool.stats['ready'] == {(4, 3, -9, 10): 4}
+        matrix = pool.get(4, 3)
+        assert det_int(matrix) == 3
+        deadline = time.monotonic() + 30
+        while len(pool) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(pool) == 4
+    with pytest.raises(RuntimeError):
+        pool.get(4, 3)
+
+
+def test_invalid_parameters():
+    with MatrixPool(background=False) as pool:
+        with pytest.raises(ValueError):
+            pool.get(3, 1, 0, 1)
+        with pytest.raises(ValueError):
+            pool.warm(3, 1, 0, 1)
+        assert pool.stats['ready'] == {}
+    with pytest.raises(ValueError):
+        MatrixPool(size=0)
@@ -0,0 +1,64 @@
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from matrix_rdn_det import inverse_int, matrix_gen_batch, solve_int
+
+
+def check_solution(matrix, rhs, numerator, denominator):
+    assert denominator > 0
+    solution = [[Fraction(int(entry), int(denominator)) for entry in row] for row in numpy.reshape(numerator, (len(rhs), -1)).tolist()]
+    rhs = numpy.reshape(rhs, (len(rhs), -1)).tolist()
+    for row, rhs_row in zip(matrix.tolist(), rhs):
+        for column, value in enumerate(rhs_row):
+            assert sum(entry * solution[index][column] for index, entry in enumerate(row)) == value
+
+
+@pytest.mark.parametrize('dimension', [1, 2, 4, 7])
+def test_batch_matches_single(dimension):
+    rng = numpy.random.default_rng(dimension)
+    matrices = matrix_gen_batch(20, dimension, -6, rng=rng)
+    rhs = rng.integers(-9, 10, [20, dimension])
+    numerators, denominators = solve_int(matrices, rhs)
+    assert numerators.shape == (20, dimension) and denominators.shape == (20,)
+    for matrix, vector, numerator, denominator in zip(matrices, rhs, numerators, denominators):
+        single = solve_int(matrix, vector)
+        assert (single[0] == numerator).all() and single[1] == denominator
+        check_solution(matrix, vector, numerator, denominator)
+        # The denominator is the smallest possible one.
+        assert numpy.gcd.reduce(numpy.append(numerator, denominator)) == 1
+
+
+def test_inverse():
+    numerator, denominator = inverse_int(numpy.array([[2, 1], [1, 3]]))
+    assert (numerator == [[3, -1], [-1, 2]]).all() and denominator == 5
+    matrices = matrix_gen_batch(10, 5, 1, rng=3)
+    numerators, denominators = inverse_int(matrices)
+    assert (denominators == 1).all()
+    assert (numpy.einsum('aij,ajk->aik', matrices, numerators) == numpy.eye(5, dtype=int)).all()
+    numerator, denominator = inverse_int(numpy.zeros([0, 0], int))
+    assert numerator.shape == (0, 0) and denominator == 1
+
+
+def test_large_entries_and_several_right_hand_sides():
+    rng = numpy.random.default_rng(4)
+    matrix = rng.integers(-10**12, 10**12, [6, 6])
+    rhs = rng.integers(-10**12, 10**12, [6, 3])
+    numerator, denominator = solve_int(matrix, rhs)
+    check_solution(matrix, rhs, numerator, denominator)
+    numerators, denominators = solve_int(matrix[None], rhs[None])
+    assert (numerators[0] == numerator).all() and denominators[0] == denominator
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        inverse_int(numpy.array([[1, 2], [2, 4]]))
+    with pytest.raises(ValueError):
+        inverse_int(numpy.array([[[1, 0], [0, 1]], [[1, 2], [2, 4]]]))
+    with pytest.raises(TypeError):
+        inverse_int(numpy.ones([2, 3], int))
+    with pytest.raises(TypeError):
+        solve_int(numpy.eye(2, dtype=int), numpy.ones(3, int))
+    with pytest.raises(TypeError):
+        solve_int(numpy.eye(2, dtype=int), numpy.array([0.5, 1]))
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import numpy
+import pytest
+
+from matrix_rdn_det import GenerationCancelled, GenerationTimeout, det_int, matrix_gen, matrix_gen_batch
+
+
+def test_expired_timeout_raises():
+    with pytest.raises(GenerationTimeout):
+        matrix_gen(5, 3, timeout=0)
+    with pytest.raises(TimeoutError):
+        matrix_gen_batch(4, 5, 3, timeout=0)
+
+
+def test_long_enumeration_returns_partial_result():
+    stats = {}
+    start = time.perf_counter()
+    matrix = matrix_gen(10, 1, rng=0, sampler='enumerate', timeout=0.3, stats=stats)
+    assert time.perf_counter() - start < 5
+    assert det_int(matrix) == 1
+    assert stats['partial'] and stats['solutions'] > 0
+
+
+def test_generous_timeout_changes_nothing():
+    stats = {}
+    matrix = matrix_gen(4, 7, rng=5, timeout=60, stats=stats)
+    assert numpy.array_equal(matrix, matrix_gen(4, 7, rng=5))
+    assert not stats['partial']
+
+
+def test_cancellation():
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(GenerationCancelled):
+        matrix_gen(4, 2, cancel=cancel)
+    cancel = threading.Event()
+    timer = threading.Timer(0.2, cancel.set)
+    timer.start()
+    start = time.perf_counter()
+    with pytest.raises(GenerationCancelled):
+        matrix_gen_batch(10**5, 6, 5, cancel=cancel)
+    assert time.perf_counter() - start < 10
+    timer.join()
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        matrix_gen(3, timeout=-1)
+    with pytest.raises(TypeError):
+        matrix_gen(3, cancel=True)
@@ -0,0 +1,61 @@
+import numpy
+import pytest
+
+from matrix_rdn_det import det_int, det_int_batch, matrix_gen, matrix_gen_batch, zero_pattern
+
+
+def test_patterns():
+    assert (zero_pattern(4, 'band') == (numpy.abs(numpy.subtract.outer(range(4), range(4))) > 1)).all()
+    assert (zero_pattern(5, 'upper') == numpy.tril(numpy.ones([5, 5], bool), -1)).all()
+    assert (zero_pattern(5, 'lower') == numpy.triu(numpy.ones([5, 5], bool), 1)).all()
+    lower = zero_pattern(5, 'lower', blocks=[2, 3])
+    assert lower[:2, 2:].all() and not lower[2:, :2].any() and not lower[:2, :2].any()
+    rows = zero_pattern(6, 'rows', zeros_per_row=3, rng=1)
+    assert (rows.sum(axis=1) == 3).all()
+    with pytest.raises(ValueError):
+        zero_pattern(4, 'upper', blocks=[2, 1])
+    with pytest.raises(ValueError):
+        zero_pattern(4, 'rows', zeros_per_row=4)
+    with pytest.raises(ValueError):
+        zero_pattern(4, 'diagonal')
+
+
+@pytest.mark.parametrize('dimension, det_value, zeros', [
+    (5, 3, zero_pattern(5, 'band')),
+    (6, 12, zero_pattern(6, 'upper')),
+    (7, -5, zero_pattern(7, 'lower', blocks=[3, 4])),
+    (6, 2, zero_pattern(6, 'rows', zeros_per_row=2, rng=3)),
+    (5, 0, zero_pattern(5, 'band')),
+])
+def test_matrix_gen_with_zeros(dimension, det_value, zeros):
+    for seed in range(3):
+        matrix = matrix_gen(dimension, det_value, rng=seed, zeros=zeros)
+        assert det_int(matrix) == det_value
+        assert (matrix[zeros] == 0).all()
+        assert (-9 <= matrix).all() and (matrix < 10).all()
+
+
+def test_retry_row_and_batch():
+    zeros = zero_pattern(5, 'band', bandwidth=2)
+    matrix = matrix_gen(5, 7, rng=2, zeros=zeros, retry='row')
+    assert det_int(matrix) == 7 and (matrix[zeros] == 0).all()
+    matrices = matrix_gen_batch(4, 5, 7, rng=2, zeros=zeros)
+    assert (det_int_batch(matrices) == 7).all() and (matrices[:, zeros] == 0).all()
+
+
+def test_invalid_zeros():
+    singular = numpy.zeros([4, 4], bool)
+    singular[:, 0] = True
+    with pytest.raises(ValueError):
+        matrix_gen(4, 1, zeros=singular)
+    assert det_int(matrix_gen(4, 0, rng=1, zeros=singular)) == 0
+    with pytest.raises(ValueError):
+        matrix_gen(4, 1, 1, 10, zeros=zero_pattern(4, 'band'))
+    with pytest.raises(ValueError):
+        matrix_gen(4, 1, zeros=zero_pattern(4, 'band'), method='unimodular')
+    with pytest.raises(ValueError):
+        matrix_gen(4, 1, zeros=zero_pattern(3, 'band'))
+    with pytest.raises(ValueError): # The diagonal entries of a triangular matrix are at most 9.
+        matrix_gen(3, 9**3 + 1, zeros=zero_pattern(3, 'upper'))
+    with pytest.raises(ValueError): # 11 is prime and cannot be split over the diagonal.
+        matrix_gen(3, 11, zeros=zero_pattern(3, 'upper'))